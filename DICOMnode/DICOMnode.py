@@ -1,16 +1,34 @@
 import os
 import re
+import sys
+import errno
+import uuid
+import struct
 import time
 import subprocess
 import ctypes
 import threading
 import shutil
+import queue
+import heapq
 import configparser
+import itertools
+import atexit
+import logging
+import logging.handlers
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 from pydicom import dcmread
+from pydicom.tag import Tag
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.filereader import read_dataset
+from pydicom.filewriter import write_file_meta_info
 from pydicom.uid import (
-    ExplicitVRLittleEndian, ImplicitVRLittleEndian, DeflatedExplicitVRLittleEndian, ExplicitVRBigEndian
+    ExplicitVRLittleEndian, ImplicitVRLittleEndian, DeflatedExplicitVRLittleEndian, ExplicitVRBigEndian,
+    JPEGLSLossless, JPEGLosslessSV1, RLELossless, generate_uid
 )
 from pynetdicom import AE, evt
 from pynetdicom.sop_class import (
@@ -19,7 +37,6 @@ from pynetdicom.sop_class import (
     SpatialRegistrationStorage, DeformableSpatialRegistrationStorage,
     Verification
 )
-import concurrent.futures
 
 # Load configuration
 def load_config():
@@ -45,13 +62,33 @@ DESTINATION_DIR = config.get('Directories', 'destination_dir', fallback=r'D:\Inc
 INCOMING_DIR = os.path.join(DESTINATION_DIR, "incoming")
 ERROR_DIR = os.path.join(DESTINATION_DIR, "errors")
 EMF2SF_PATH = config.get('Tools', 'emf2sf_path', fallback=r'C:\dcm4che\bin')
+EMF2SF_SCRIPT = os.path.abspath(os.path.join(EMF2SF_PATH, "emf2sf.bat"))
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+# Logging: handle_store & Co. stellen nur Records in die Queue,
+# Formatierung und Ausgabe auf stdout übernimmt der QueueListener-Thread
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread (in-process queue only)."""
+    def prepare(self, record):
+        return record
+
+logger = logging.getLogger('DICOMnode')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+log_queue = queue.Queue(-1)
+logger.addHandler(DeferredQueueHandler(log_queue))
+log_stream_handler = logging.StreamHandler(sys.stdout)
+log_stream_handler.setFormatter(logging.Formatter('%(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 # Set window title
 ctypes.windll.kernel32.SetConsoleTitleW(WINDOW_TITLE)
 
 # Load trusted AE titles from config
 trusted_ae_string = config.get('Security', 'trusted_ae_titles', fallback='MRMULTI,TR_SEND,VARIAN,MYQASRS,RTPLANNING,TRUSTED_AE_2')
-TRUSTED_AE_TITLES = [ae.strip() for ae in trusted_ae_string.split(',')]
+TRUSTED_AE_TITLES = frozenset(ae.strip().upper() for ae in trusted_ae_string.split(',') if ae.strip())
 
 # Load AE mappings from config
 AE_MAPPINGS = {}
@@ -61,7 +98,7 @@ if config.has_section('AE_Mappings'):
 
 def is_trusted_ae(requestor_ae_title):
     """Überprüfe, ob der AE-Titel vertrauenswürdig ist."""
-    return requestor_ae_title in TRUSTED_AE_TITLES
+    return requestor_ae_title.strip().upper() in TRUSTED_AE_TITLES
 
 def handle_echo(event):
     """Handle incoming C-ECHO (Verification) requests."""
@@ -81,21 +118,44 @@ os.makedirs(DESTINATION_DIR, exist_ok=True)
 os.makedirs(INCOMING_DIR, exist_ok=True)
 os.makedirs(ERROR_DIR, exist_ok=True)
 
+# Cache bereits angelegter Ordner, um wiederholte makedirs-Syscalls zu vermeiden
+ENSURED_DIRS_MAX = 4096
+_ensured_dirs = OrderedDict()
+_ensured_dirs_lock = threading.Lock()
+
+def ensure_dir(path):
+    """Create a directory once and remember it; repeated calls are a set lookup."""
+    with _ensured_dirs_lock:
+        if path in _ensured_dirs:
+            _ensured_dirs.move_to_end(path)
+            return
+    os.makedirs(path, exist_ok=True)
+    with _ensured_dirs_lock:
+        _ensured_dirs[path] = None
+        if len(_ensured_dirs) > ENSURED_DIRS_MAX:
+            _ensured_dirs.popitem(last=False)  # Ältesten Eintrag verwerfen
+
+def forget_dir(path):
+    """Drop a directory from the ensure_dir cache after it was removed."""
+    with _ensured_dirs_lock:
+        _ensured_dirs.pop(path, None)
+
+# AE-Title (upper) -> bereits aufgelöstes Incoming-Verzeichnis, einmalig beim Start berechnet
+AE_DIR_CACHE = {
+    ae: (mapped_dir if os.path.isabs(mapped_dir) else os.path.join(DESTINATION_DIR, mapped_dir))
+    for ae, mapped_dir in AE_MAPPINGS.items()
+}
+
 def get_incoming_dir_for_ae(ae_title):
     """Return the incoming directory based on the AE title of the requesting device."""
-    # Use configured AE mappings
-    ae_title_upper = ae_title.upper()
-    if ae_title_upper in AE_MAPPINGS:
-        mapped_dir = AE_MAPPINGS[ae_title_upper]
-        # If it's a relative path, make it relative to DESTINATION_DIR
-        if not os.path.isabs(mapped_dir):
-            return os.path.join(DESTINATION_DIR, mapped_dir)
-        return mapped_dir
-    
-    # Standard fallback to 'incoming' folder
-    return os.path.join(DESTINATION_DIR, "incoming")
+    # Relative mappings are resolved against DESTINATION_DIR, unknown AEs fall back to 'incoming'
+    return AE_DIR_CACHE.get(ae_title.upper(), INCOMING_DIR)
 
 
+# Vorkompilierte Muster für die Bereinigung von Tags und Ordnernamen
+_INVALID_CHARS_RE = re.compile(r'[^\w\s_^-]')
+_DUP_SEP_RE = re.compile(r'[_-]{2,}')
+_SANITIZE_RE = re.compile(r'[<>:"/\\|?*^]')
 
 def correct_dicom_tag(name):
     """
@@ -103,18 +163,17 @@ def correct_dicom_tag(name):
     Gibt den bereinigten Namen nur zurück, wenn Änderungen vorgenommen wurden.
     """
     # Schritt 1: Versuche, ungültige Zeichen zu ignorieren oder zu ersetzen
-    try:
-        # Versuche, den String korrekt zu dekodieren (in UTF-8)
-        original_name = name
+    # Nur Surrogate sind nicht als UTF-8 kodierbar - reine ASCII-Namen (Normalfall) überspringen den Round-Trip
+    original_name = name
+    if not name.isascii() and any(0xD800 <= ord(c) <= 0xDFFF for c in name):
+        logger.warning("Warnung: Zeichenkodierung für '%s' fehlerhaft. Bereinige Zeichen.", name)
         name = name.encode('utf-8', 'replace').decode('utf-8', 'replace')
-    except UnicodeEncodeError:
-        print(f"Warnung: Zeichenkodierung für '{name}' fehlerhaft. Bereinige Zeichen.")
 
     # Schritt 2: Entferne ungültige Zeichen, aber behalte ^ und andere erlaubte Zeichen
-    cleaned_name = re.sub(r'[^\w\s_^-]', '', name)
+    cleaned_name = _INVALID_CHARS_RE.sub('', name)
     
     # Optional: Entferne doppelte oder unerwünschte Unterstriche/Bindestriche
-    cleaned_name = re.sub(r'[_-]{2,}', '_', cleaned_name)  # Ersetze doppelte Unterstriche/Bindestriche
+    cleaned_name = _DUP_SEP_RE.sub('_', cleaned_name)  # Ersetze doppelte Unterstriche/Bindestriche
     cleaned_name = cleaned_name.strip('_')  # Entferne führende/folgende Unterstriche
     
     # Schritt 3: Nur zurückgeben, wenn der Name sich geändert hat
@@ -126,7 +185,7 @@ def correct_dicom_tag(name):
 
 def sanitize_folder_name(name):
     """Sanitize folder name to remove invalid characters."""
-    return re.sub(r'[<>:"/\\|?*^]', '_', name)  # Replace invalid characters with underscores
+    return _SANITIZE_RE.sub('_', name)  # Replace invalid characters with underscores
 
 def create_subfolder(ds, base_folder, modality, date):
     """Create a subfolder based on StudyID, SeriesID, SeriesDescription, and image count."""
@@ -150,15 +209,46 @@ def create_subfolder(ds, base_folder, modality, date):
         else:
             folder_name = f"{date}_{study_id}_{series_id}_{series_description}_{image_count}"
         folder_path = os.path.join(base_folder, modality, folder_name)
-        os.makedirs(folder_path, exist_ok=True)
+        ensure_dir(folder_path)
         return folder_path
     except Exception as e:
-        print(f"Could not create subfolder: {str(e)}. Saving in base folder.")
+        logger.warning("Could not create subfolder: %s. Saving in base folder.", e)
         return base_folder
 
-# Konstanter Executor für parallelisierte Aufgaben
-max_workers = config.getint('FolderWatcher', 'max_workers', fallback=4)
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+# Begrenzte Schreib-Queue mit festen Writer-Threads statt einem Task pro Datei
+max_workers = config.getint('FolderWatcher', 'max_workers', fallback=2)
+WRITE_QUEUE_SIZE = 256
+WRITE_BATCH_SIZE = 64
+write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+
+def dicom_writer_worker():
+    """Drain the write queue in batches, creating each destination folder once per batch."""
+    while True:
+        batch = [write_queue.get()]
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(write_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # Nach Zielordner gruppieren, damit jeder Ordner nur einmal angelegt wird
+        by_folder = {}
+        for item in batch:
+            by_folder.setdefault(item[3], []).append(item)
+
+        for destination_folder, items in by_folder.items():
+            ensure_dir(destination_folder)
+            for ds, file_path, modality, _, raw_dataset in items:
+                process_and_save_dicom(ds, file_path, modality, destination_folder, raw_dataset)
+
+        for _ in batch:
+            write_queue.task_done()
+
+for _ in range(max(1, max_workers)):
+    threading.Thread(target=dicom_writer_worker, daemon=True).start()
+
+MODALITY_TAG = Tag(0x0008, 0x0060)
+SOP_CLASS_UID_TAG = Tag(0x0008, 0x0016)
 
 tags_to_process = [
     (0x0040, 0x0254)  # PerformedProcedureStepDescription
@@ -166,30 +256,110 @@ tags_to_process = [
     #(0x0008, 0x103E)   # SeriesDescription
 ]
 
-def handle_store(event):
-    """Handle incoming DICOM C-STORE requests."""
-    ds = event.dataset
+# Tags, die handle_store für Ordner- und Dateinamen benötigt
+HEADER_KEYWORDS = [
+    'SOPClassUID', 'SOPInstanceUID', 'InstanceCreationDate', 'InstanceCreationTime',
+    'SeriesDate', 'ContentDate', 'SeriesTime', 'AcquisitionTime', 'ContentTime',
+    'Modality', 'SeriesDescription', 'PatientName', 'PatientID', 'StudyID',
+    'SeriesNumber', 'NumberOfFrames', 'PerformedProcedureStepDescription',
+    'ReferencedRTPlanSequence'
+]
+HEADER_TAGS = [Tag(keyword) for keyword in HEADER_KEYWORDS]
+LAST_HEADER_TAG = max(HEADER_TAGS)
+
+# (Tag, Keyword, Default) der Werte, die handle_store in einem Durchlauf ausliest;
+# REQUIRED: fehlt der Wert, wird wie bei ds.Keyword ein AttributeError ausgelöst (-> ERROR_DIR)
+REQUIRED = object()
+HEADER_VALUES = tuple((Tag(keyword), keyword, default) for keyword, default in (
+    ('PatientID', 'UNKNOWN_PATIENT'),
+    ('Modality', 'UNKNOWN_MODALITY'),
+    ('SOPInstanceUID', REQUIRED),
+    ('SeriesDescription', 'NoDescription'),
+    ('InstanceCreationDate', None),
+    ('ContentDate', None),
+    ('SeriesDate', None),
+    ('InstanceCreationTime', None),
+    ('ContentTime', None),
+    ('SeriesTime', None),
+    ('AcquisitionTime', None),
+))
+
+def read_header_values(ds):
+    """Return {keyword: value} for HEADER_VALUES using one ds.get per tag.
+
+    Raises AttributeError if a REQUIRED value is missing.
+    """
+    values = {}
+    for tag, keyword, default in HEADER_VALUES:
+        element = ds.get(tag)
+        if element is not None:
+            values[keyword] = element.value
+        elif default is REQUIRED:
+            raise AttributeError(f"Dataset has no {keyword}")
+        else:
+            values[keyword] = default
+    return values
+
+def read_received_header(event):
+    """Decode only the header tags needed for sorting from the received C-STORE bytes."""
+    transfer_syntax = event.context.transfer_syntax
+    if transfer_syntax.is_deflated:
+        # Deflated data has to be inflated completely anyway
+        ds = event.dataset
+    else:
+        raw = event.request.DataSet
+        raw.seek(0)
+        ds = read_dataset(raw, transfer_syntax.is_implicit_VR, transfer_syntax.is_little_endian,
+                          stop_when=lambda tag, vr, length: tag > LAST_HEADER_TAG,
+                          specific_tags=HEADER_TAGS)
+        raw.seek(0)
     ds.file_meta = event.file_meta
+    return ds
+
+def write_received_file(file_path, file_meta, raw_dataset):
+    """Write the received encoded dataset unchanged behind a preamble and the file meta."""
+    with open(file_path, 'wb') as f:
+        f.write(b'\x00' * 128)
+        f.write(b'DICM')
+        write_file_meta_info(f, file_meta)
+        f.write(raw_dataset)
+
+def save_received_dicom(ds, file_path, raw_dataset):
+    """Save the raw received bytes, or re-encode ds if tags were corrected."""
+    if raw_dataset is None:
+        ds.save_as(file_path, write_like_original=False)
+    else:
+        write_received_file(file_path, ds.file_meta, raw_dataset)
+
+def handle_store(event):
+    """Handle incoming DICOM C-STORE requests.
+
+    Only the header is decoded for sorting; unless a tag has to be corrected, the
+    received bytes are written to disk without decoding PixelData.
+    """
+    ds = read_received_header(event)
     try:
         # Extract patient ID and modality, including differentiation for MR types
         requestor_ae_title = event.assoc.requestor.ae_title
-        print(f"Request received from AE Title: {requestor_ae_title}")
+        logger.info("Request received from AE Title: %s", requestor_ae_title)
 
         # Dynamically set incoming directory based on AE Title
         incoming_dir = get_incoming_dir_for_ae(requestor_ae_title)
-        os.makedirs(incoming_dir, exist_ok=True)
+        ensure_dir(incoming_dir)
 
-        patient_id = sanitize_folder_name(getattr(ds, 'PatientID', 'UNKNOWN_PATIENT'))
+        values = read_header_values(ds)
+        patient_id = sanitize_folder_name(values['PatientID'])
         #patient_name_element = ds.get((0x0010, 0x0010), None)
         #patient_name = sanitize_folder_name((str(patient_name_element.value) if patient_name_element else 'UNKNOWN_PATIENT'))
         # Holen des Patientennamens und Bereinigung
         patient_name_element = ds.get((0x0010, 0x0010), None)  # DICOM Tag für Patient Name
+        corrections = {}  # Nur bei geänderten Tags muss das Dataset dekodiert und neu kodiert werden
         if patient_name_element:
             corrected_name = correct_dicom_tag(str(patient_name_element.value))
             if corrected_name:  # Nur ändern, wenn der Name korrigiert wurde
-                ds.PatientName = corrected_name  # Aktualisiere den Namen im Dataset
+                corrections[(0x0010, 0x0010)] = corrected_name
                 patient_name = corrected_name  # Verwende den bereinigten Namen
-                print(f"Patientenname geändert zu: {corrected_name}")
+                logger.info("Patientenname geändert zu: %s", corrected_name)
             else:
                 patient_name = str(patient_name_element.value)  # Verwende den ursprünglichen Namen
         else:
@@ -197,40 +367,54 @@ def handle_store(event):
         
         # Bereinigung von zusätzlichen Tags in einer Schleife
         for tag in tags_to_process:
-            if tag in ds:
-                element = ds[tag]  # Holen des DICOM-Elements
-                if isinstance(element.value, str):  # Nur Strings bereinigen
-                    print(element.value)
-                    corrected_value = correct_dicom_tag(element.value)
-                    if corrected_value:
-                        print(f"Korrigiere Tag {element.name}: '{element.value}' zu '{corrected_value}'")
-                        ds[tag].value = corrected_value  # Aktualisiere den Wert im Dataset
-
+            element = ds.get(tag)  # Holen des DICOM-Elements (ein Lookup statt 'in' + [])
+            if element is not None and isinstance(element.value, str):  # Nur Strings bereinigen
+                logger.debug("%s", element.value)
+                corrected_value = correct_dicom_tag(element.value)
+                if corrected_value:
+                    logger.info("Korrigiere Tag %s: '%s' zu '%s'", element.name, element.value, corrected_value)
+                    corrections[tag] = corrected_value
+
+        if corrections:
+            # Vollständiges Dataset dekodieren und korrigierte Werte übernehmen
+            full_ds = event.dataset
+            full_ds.file_meta = event.file_meta
+            for tag, value in corrections.items():
+                element = full_ds.get(tag)
+                if element is not None:
+                    element.value = value  # Wert direkt am DataElement aktualisieren
+            ds = full_ds
+            raw_dataset = None
+        else:
+            raw_dataset = event.request.DataSet.getvalue()
 
-        patient_name = sanitize_folder_name(patient_name)
-        modality = getattr(ds, 'Modality', 'UNKNOWN_MODALITY')
+        # correct_dicom_tag lässt nur [\w\s_^-] übrig, für den Ordnernamen fehlt nur noch das ^
+        patient_name = patient_name.replace('^', '_')
+        patient_folder = os.path.join(incoming_dir, f"{patient_id}_{patient_name}")
+        modality = values['Modality']
 
         # Check if modality is MR, CT, or PET to decide on folder creation
         needs_subfolder = modality in ['MR', 'CT', 'PT']  # PT is used for PET images
 
         # Extract date with priority: InstanceCreationDate -> ContentDate -> 'UNKNOWN_DATE'
-        instance_creation_date = getattr(ds, 'InstanceCreationDate', None)
-        content_date = getattr(ds, 'ContentDate', None)
-        series_date = getattr(ds, 'SeriesDate', None)
-        series_descr = getattr(ds, 'SeriesDescription', 'NoDescription')
-        sopUID = ds.SOPInstanceUID
+        instance_creation_date = values['InstanceCreationDate']
+        content_date = values['ContentDate']
+        series_date = values['SeriesDate']
+        series_descr = values['SeriesDescription']
+        sop_instance_uid = values['SOPInstanceUID']
+        sopUID = sop_instance_uid
         date_used = series_date or content_date or instance_creation_date or 'UNKNOWN_DATE'
 
         # Extract time with priority: InstanceCreationTime -> ContentTime -> '000000'
-        instance_creation_time = getattr(ds, 'InstanceCreationTime', None)
-        content_time = getattr(ds, 'ContentTime', None)
-        series_time = getattr(ds, 'SeriesTime', None)
-        acquisition_time = getattr(ds, 'AcquisitionTime', None)
+        instance_creation_time = values['InstanceCreationTime']
+        content_time = values['ContentTime']
+        series_time = values['SeriesTime']
+        acquisition_time = values['AcquisitionTime']
         time_used = (series_time or acquisition_time or content_time or instance_creation_time or '000000').split('.')[0]  # Ignore milliseconds if present
 
         # Create a destination folder, with subfolders only for MR, CT, and PET
         if needs_subfolder:
-            destination_folder = create_subfolder(ds, os.path.join(incoming_dir, patient_id+'_'+patient_name), modality, date_used)
+            destination_folder = create_subfolder(ds, patient_folder, modality, date_used)
         elif 'iba_SRS' in incoming_dir:
             if 'DOSE' in modality:
                 sequence = getattr(ds, 'ReferencedRTPlanSequence',None)
@@ -239,52 +423,64 @@ def handle_store(event):
                         sopUIDd = getattr(item,'ReferencedSOPInstanceUID',None)
                         if sopUIDd:
                             sopUID = getattr(item,'ReferencedSOPInstanceUID',None)
-            destination_folder = os.path.join(incoming_dir, patient_id+'_'+patient_name, sopUID)
-            os.makedirs(destination_folder, exist_ok=True)
+            destination_folder = os.path.join(patient_folder, sopUID)
+            ensure_dir(destination_folder)
         else:
-            destination_folder = os.path.join(incoming_dir, patient_id+'_'+patient_name, modality)
-            os.makedirs(destination_folder, exist_ok=True)
+            destination_folder = os.path.join(patient_folder, modality)
+            ensure_dir(destination_folder)
         
         # Create a unique filename based on SOPInstanceUID, date, and time
-        filename = f"{modality}_{date_used}{time_used}_{ds.SOPInstanceUID}.dcm"
+        filename = f"{modality}_{date_used}{time_used}_{sop_instance_uid}.dcm"
         if 'iba_SRS' in incoming_dir:
-            filename = f"{series_descr}_{date_used}{time_used}_{ds.SOPInstanceUID}.dcm"
+            filename = f"{series_descr}_{date_used}{time_used}_{sop_instance_uid}.dcm"
             
         file_path = os.path.join(destination_folder, filename)
 
-        # Save the DICOM file (parallelized for enhanced MR)
-        executor.submit(process_and_save_dicom, ds, file_path, modality, destination_folder)
+        # Save the DICOM file via the bounded writer queue
+        write_queue.put((ds, file_path, modality, destination_folder, raw_dataset))
 
     except Exception as e:
         # Handle errors by moving the file to the error folder
         error_filename = f"error_{event.request.AffectedSOPInstanceUID}.dcm"
         error_path = os.path.join(ERROR_DIR, error_filename)
-        ds.save_as(error_path, write_like_original=False)
-        print(f"Error processing file: {error_path} | Error: {str(e)}")
+        write_received_file(error_path, event.file_meta, event.request.DataSet.getvalue())
+        logger.error("Error processing file: %s | Error: %s", error_path, e)
 
     return 0x0000  # Success status
 
-def process_and_save_dicom(ds, file_path, modality, destination_folder):
-    """Process and save DICOM file, including enhanced MR conversion."""
+def process_and_save_dicom(ds, file_path, modality, destination_folder, raw_dataset=None):
+    """Process and save DICOM file, including enhanced MR conversion.
+
+    If raw_dataset is given it is written as received and ds only holds the header;
+    otherwise ds is the full (corrected) dataset and gets re-encoded.
+    """
     try:
         # Debug: Prüfe PixelData für RTDOSE
-        if modality == "RTDOSE":
-            if hasattr(ds, "PixelData"):
-                print(f"[DEBUG] RTDOSE PixelData length: {len(ds.PixelData)} bytes")
+        if modality == "RTDOSE" and logger.isEnabledFor(logging.DEBUG):
+            if raw_dataset is not None:
+                logger.debug("[DEBUG] RTDOSE received dataset length: %d bytes", len(raw_dataset))
+            elif hasattr(ds, "PixelData"):
+                logger.debug("[DEBUG] RTDOSE PixelData length: %d bytes", len(ds.PixelData))
             else:
-                print(f"[DEBUG] RTDOSE: Kein PixelData im Dataset vorhanden!")
+                logger.debug("[DEBUG] RTDOSE: Kein PixelData im Dataset vorhanden!")
 
-        # Save the DICOM file
-        ds.save_as(file_path, write_like_original=False)
-        print(f"Received and sorted DICOM file: {file_path}")
+        # Save the DICOM file - re-encode only if tags were rewritten
+        try:
+            save_received_dicom(ds, file_path, raw_dataset)
+        except FileNotFoundError:
+            # Ordner wurde extern entfernt - Cache verwerfen und neu anlegen
+            forget_dir(destination_folder)
+            ensure_dir(destination_folder)
+            save_received_dicom(ds, file_path, raw_dataset)
+        logger.info("Received and sorted DICOM file: %s", file_path)
 
         # Debug: Prüfe Dateigröße nach dem Speichern
-        if modality == "RTDOSE":
+        if modality == "RTDOSE" and logger.isEnabledFor(logging.DEBUG):
             try:
                 file_size = os.path.getsize(file_path)
-                print(f"[DEBUG] RTDOSE gespeicherte Dateigröße: {file_size} bytes")
+                logger.debug("[DEBUG] RTDOSE gespeicherte Dateigröße: %d bytes", file_size)
             except Exception as e:
-                print(f"[DEBUG] Fehler beim Prüfen der Dateigröße: {e}")
+                logger.debug("[DEBUG] Fehler beim Prüfen der Dateigröße: %s", e)
 
         # If the file is Enhanced MR, convert it to Standard MR using emf2sf and handle registrations
         if ds.SOPClassUID in [EnhancedMRImageStorage, EnhancedMRColorImageStorage]:
@@ -294,19 +490,19 @@ def process_and_save_dicom(ds, file_path, modality, destination_folder):
 
                 # Move converted Standard MR files to the appropriate StandardMR subfolder
                 move_converted_files_to_standard_subfolder(file_path, ds)
-                print(f"Converted Enhanced MR file and moved to Standard MR subfolder.")
+                logger.info("Converted Enhanced MR file and moved to Standard MR subfolder.")
                 os.remove(file_path)
-                print(f"Deleted original Enhanced MR file: {file_path}")
+                logger.info("Deleted original Enhanced MR file: %s", file_path)
 
             except Exception as conv_error:
-                print(f"Error converting Enhanced MR file: {file_path} | Error: {str(conv_error)}")
+                logger.error("Error converting Enhanced MR file: %s | Error: %s", file_path, conv_error)
 
     except Exception as e:
         # Handle errors by moving the file to the error folder
         error_filename = f"error_{ds.SOPInstanceUID}.dcm"
         error_path = os.path.join(ERROR_DIR, error_filename)
-        ds.save_as(error_path, write_like_original=False)
-        print(f"Error processing file: {error_path} | Error: {str(e)}")
+        save_received_dicom(ds, error_path, raw_dataset)
+        logger.error("Error processing file: %s | Error: %s", error_path, e)
 
 
 
@@ -315,24 +511,25 @@ def convert_enhanced_mr_to_standard(input_path, output_dir):
     try:
         # Define the output directory for the conversion
         output_path = os.path.join(output_dir, 'converted')
-        os.makedirs(output_path, exist_ok=True)
+        ensure_dir(output_path)
 
         # Command to execute emf2sf conversion
         command = [
-            os.path.join(EMF2SF_PATH, "emf2sf.bat"),
+            EMF2SF_SCRIPT,
             "--out-dir", output_path,
             input_path
         ]
 
-        # Run the conversion command
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(f"MR-Conversion successful: {result.stdout}")
+        # Run the conversion command directly, without an extra cmd.exe shell or console window
+        result = subprocess.run(command, shell=False, check=True, capture_output=True, text=True,
+                                creationflags=CREATE_NO_WINDOW)
+        logger.info("MR-Conversion successful: %s", result.stdout)
 
     except subprocess.CalledProcessError as e:
-        print(f"MR-Conversion failed: {e.stderr}")
+        logger.error("MR-Conversion failed: %s", e.stderr)
         raise
     except Exception as e:
-        print(f"An unexpected error occurred: {str(e)}")
+        logger.error("An unexpected error occurred: %s", e)
         raise
 
 def move_converted_files_to_standard_subfolder(original_file_path, ds):
@@ -343,19 +540,23 @@ def move_converted_files_to_standard_subfolder(original_file_path, ds):
 
         # Find all converted files in the 'converted' directory
         converted_dir = os.path.join(os.path.dirname(original_file_path), 'converted')
-        for file_name in os.listdir(converted_dir):
-            converted_file_path = os.path.join(converted_dir, file_name)
-            new_file_path = os.path.join(destination_folder, file_name)
+        with os.scandir(converted_dir) as entries:
+            for entry in entries:
+                new_file_path = os.path.join(destination_folder, entry.name)
 
-            # Move the converted file to the StandardMR subfolder
-            os.replace(converted_file_path, new_file_path)
-            print(f"Moved converted file to StandardMR subfolder: {new_file_path}")
+                # Move the converted file to the StandardMR subfolder
+                os.replace(entry.path, new_file_path)
+                logger.info("Moved converted file to StandardMR subfolder: %s", new_file_path)
 
         # Clean up the temporary converted directory
-        os.rmdir(converted_dir)
+        try:
+            os.rmdir(converted_dir)
+            forget_dir(converted_dir)
+        except OSError as e:
+            logger.warning("Could not remove converted directory %s: %s", converted_dir, e)
 
     except Exception as e:
-        print(f"Error moving converted files to StandardMR subfolder: {str(e)}")
+        logger.error("Error moving converted files to StandardMR subfolder: %s", e)
 
 def start_receiver(ae_title, ip, port):
     """Start the DICOM receiver service."""
@@ -389,8 +590,125 @@ def start_receiver(ae_title, ip, port):
             print("Retrying in 10 seconds...")
             time.sleep(10)
 
+# Threads für das Einlesen der Header beim Sortieren eines Ordners (I/O-lastig)
+SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+LOSSLESS_TRANSFER_SYNTAXES = [JPEGLSLossless, JPEGLosslessSV1, RLELossless]
+COMPRESSIBLE_SOP_CLASSES = [CTImageStorage, MRImageStorage, PositronEmissionTomographyImageStorage, RTDoseStorage]
+RTPLAN_SOP_CLASS_UID = '1.2.840.10008.5.1.4.1.1.481.5'  # Erwartete SOP Class UID für ausgehende RTPLANs
+PROGRESS_LOG_INTERVAL = 1.0  # Sekunden zwischen zwei CT-Fortschrittsmeldungen beim Senden
+ASSOC_ATTEMPTS = 3  # Verbindungsversuche beim Ordnerstart, mit 2s/4s Pause dazwischen (Reconnect im Sendeloop: 1)
+MIN_INACTIVITY_TIMEOUT = 13.0  # Sekunden; kürzere inactivity_timeout-Werte (alte config.ini: 1) werden angehoben
+SCAN_TAGS = [MODALITY_TAG, SOP_CLASS_UID_TAG]  # Modalität zum Sortieren, SOP Class für die RTPLAN-Prüfung
+
+def iter_dcm_files(path):
+    """Yield the paths of all .dcm files below path (scandir, no extra stat per entry)."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                if entry.name.lower().endswith('.dcm'):
+                    yield entry.path
+            elif entry.is_dir(follow_symlinks=False):
+                yield from iter_dcm_files(entry.path)
+
+def list_watch_subdirs(watch_folder):
+    """Return the names of all subfolders of the watch folder except 'failed'."""
+    with os.scandir(watch_folder) as entries:
+        return [entry.name for entry in entries if entry.is_dir() and entry.name != "failed"]
+
+def remove_sent_file(file_path):
+    """Delete a file that was sent successfully; errors are only reported."""
+    try:
+        os.remove(file_path)
+    except OSError as e:
+        print(f"Could not delete sent file {file_path}: {str(e)}")
+
+# VRs mit 2 reservierten Bytes und 4-Byte-Länge im Explicit-VR-Encoding
+LONG_LENGTH_VRS = frozenset((b'OB', b'OD', b'OF', b'OL', b'OV', b'OW', b'SQ', b'SV', b'UC', b'UN', b'UR', b'UT', b'UV'))
+UNDEFINED_LENGTH = 0xFFFFFFFF
+IMPLICIT_VR_LITTLE_ENDIAN_UID = '1.2.840.10008.1.2'
+EXPLICIT_VR_BIG_ENDIAN_UID = '1.2.840.10008.1.2.2'
+DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN_UID = '1.2.840.10008.1.2.1.99'
+
+def peek_header(file_path):
+    """Return (Modality, SOPClassUID) read directly from the file, or None if pydicom is needed.
+
+    Reads the preamble, the file meta group (always explicit VR little endian) for the
+    transfer syntax and then the dataset elements up to (0008,0060). Missing preamble,
+    deflated syntax or undefined lengths return None.
+    """
+    with open(file_path, 'rb') as f:
+        preamble = f.read(132)
+        if len(preamble) < 132 or preamble[128:] != b'DICM':
+            return None
+
+        # File Meta Information lesen, um die Transfer Syntax zu bestimmen
+        transfer_syntax = None
+        while True:
+            position = f.tell()
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            group, element = struct.unpack('<HH', header[:4])
+            if group != 0x0002:
+                f.seek(position)
+                break
+            if header[4:6] in LONG_LENGTH_VRS:
+                length = struct.unpack('<L', f.read(4))[0]
+            else:
+                length = struct.unpack('<H', header[6:8])[0]
+            if length == UNDEFINED_LENGTH:
+                return None
+            value = f.read(length)
+            if element == 0x0010:
+                transfer_syntax = value.rstrip(b'\x00 ').decode('ascii', 'replace')
+
+        if transfer_syntax is None or transfer_syntax == DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN_UID:
+            return None
+        explicit_vr = transfer_syntax != IMPLICIT_VR_LITTLE_ENDIAN_UID
+        endian = '>' if transfer_syntax == EXPLICIT_VR_BIG_ENDIAN_UID else '<'
+
+        # Dataset bis einschließlich Modality lesen, alle anderen Werte überspringen
+        values = {}
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            group, element = struct.unpack(endian + 'HH', header[:4])
+            tag = (group << 16) | element
+            if tag > MODALITY_TAG:
+                break
+            if not explicit_vr:
+                length = struct.unpack(endian + 'L', header[4:8])[0]
+            elif header[4:6] in LONG_LENGTH_VRS:
+                length = struct.unpack(endian + 'L', f.read(4))[0]
+            else:
+                length = struct.unpack(endian + 'H', header[6:8])[0]
+            if length == UNDEFINED_LENGTH:
+                return None
+            if tag in (SOP_CLASS_UID_TAG, MODALITY_TAG):
+                values[tag] = f.read(length).rstrip(b'\x00 ').decode('ascii', 'replace')
+            else:
+                f.seek(length, 1)
+
+    return values.get(MODALITY_TAG), values.get(SOP_CLASS_UID_TAG)
+
+def read_modality_header(file_path):
+    """Return (file_path, modality, sop_class_uid, None) or (file_path, None, None, error).
+
+    Uses peek_header and falls back to a header-only dcmread for files it cannot parse.
+    """
+    try:
+        header = peek_header(file_path)
+        if header is None:
+            ds = dcmread(file_path, stop_before_pixels=True, specific_tags=SCAN_TAGS)
+            header = (getattr(ds, 'Modality', None), getattr(ds, 'SOPClassUID', None))
+        modality, sop_class_uid = header
+        return file_path, (modality if modality is not None else 'UNKNOWN'), sop_class_uid, None
+    except Exception as e:
+        return file_path, None, None, e
+
 class DICOMFolderWatcher(FileSystemEventHandler):
-    """Watches a folder for DICOM files and forwards them after 1 second of inactivity.
+    """Watches a folder for DICOM files and forwards them after inactivity_timeout seconds of inactivity.
     Processes folders one by one with files sent in modality order: CT -> RStruct -> RTPLAN -> RTDOSE.
     Failed files are moved to a 'failed' folder with logs. Files are deleted after sending.
     Empty folders (except 'failed') are deleted at the start of each processing round."""
@@ -400,19 +718,33 @@ class DICOMFolderWatcher(FileSystemEventHandler):
         self.target_aet = target_aet
         self.target_ip = target_ip
         self.target_port = target_port
-        self.pending_files = {}
         self.timer_lock = threading.Lock()
+        self.timer_cond = threading.Condition(self.timer_lock)
         self.ae = AE(ae_title=AE_TITLE)  # Use configured AE title
+        self.assoc = None                        # Association kept open across folders until idle
+        self.assoc_lock = threading.RLock()      # Guards assoc against the idle-release timer
+        self.assoc_idle_timer = None             # Timer releasing the association after assoc_idle_timeout
         self.processing_lock = threading.Lock()  # Lock for ensuring only one folder is processed at a time
         self.is_processing = False               # Flag to track if folder processing is ongoing
         self.last_heartbeat = time.time()        # Track last heartbeat time
         self.folder_activity = {}                # Track last activity time for each folder
-        self.folder_timers = {}                  # Timers for folder processing
+        self.folder_timers = {}                  # Folder -> deadline (monotonic) of the pending check
+        self.timer_heap = []                     # Min-heap of (deadline, is_job, key) for the scheduler thread
+        self.job_timers = {}                     # Periodic job name -> deadline (monotonic) of its next run
+        self.job_funcs = {}                      # Periodic job name -> callable run by the scheduler thread
+        self.rescan_dir_cache = {}               # Dir -> (mtime_ns, subdirs) of DICOM-free dirs seen by the rescan
+        self.last_processed_mtime = {}           # Folder -> st_mtime_ns after its last completed processing
+        self.delete_executor = ThreadPoolExecutor(max_workers=2)  # Deletes sent files after the send loop
         
         # Load timer intervals from config
         self.process_timer_interval = config.getfloat('FolderWatcher', 'process_timer_interval', fallback=10.0)
         self.heartbeat_interval = config.getfloat('FolderWatcher', 'heartbeat_interval', fallback=120.0)
-        self.inactivity_timeout = config.getfloat('FolderWatcher', 'inactivity_timeout', fallback=1.0)
+        self.inactivity_timeout = config.getfloat('FolderWatcher', 'inactivity_timeout', fallback=MIN_INACTIVITY_TIMEOUT)
+        if self.inactivity_timeout < MIN_INACTIVITY_TIMEOUT:
+            # The setting used to be ignored (folders always waited 13s); older configs still say 1
+            print(f"inactivity_timeout {self.inactivity_timeout:g}s is below {MIN_INACTIVITY_TIMEOUT:g}s, using {MIN_INACTIVITY_TIMEOUT:g}s")
+            self.inactivity_timeout = MIN_INACTIVITY_TIMEOUT
+        self.assoc_idle_timeout = config.getfloat('FolderWatcher', 'assoc_idle_timeout', fallback=30.0)
         
         # Add presentation contexts for DICOM storage
         self.ae.add_requested_context(CTImageStorage)
@@ -426,10 +758,20 @@ class DICOMFolderWatcher(FileSystemEventHandler):
         self.ae.add_requested_context(SpatialRegistrationStorage)
         self.ae.add_requested_context(DeformableSpatialRegistrationStorage)
         
+        # Separate contexts for lossless compressed files, so files already compressed on disk
+        # can be sent by path; uncompressed files keep using the default contexts above
+        for sop_class in COMPRESSIBLE_SOP_CLASSES:
+            for transfer_syntax in LOSSLESS_TRANSFER_SYNTAXES:
+                self.ae.add_requested_context(sop_class, transfer_syntax)
+        
         # Create failed folder if it doesn't exist
         self.failed_folder = os.path.join(self.watch_folder, "failed")
         os.makedirs(self.failed_folder, exist_ok=True)
         
+        # Temp folder for dose files that are sent without DICOM parsing
+        self.temp_dose_dir = os.path.join(self.watch_folder, "temp_dose_files")
+        os.makedirs(self.temp_dose_dir, exist_ok=True)
+        
         # Setup logging in failed folder
         self.log_file = os.path.join(self.failed_folder, "send_errors.log")
         
@@ -440,15 +782,15 @@ class DICOMFolderWatcher(FileSystemEventHandler):
         print(f"Heartbeat interval: {self.heartbeat_interval}s")
         print(f"Inactivity timeout: {self.inactivity_timeout}s")
         
-        # Start a timer to periodically process accumulated files
-        self.process_timer = threading.Timer(self.process_timer_interval, self.process_all_folders)
-        self.process_timer.daemon = True
-        self.process_timer.start()
+        # Single scheduler thread for all per-folder inactivity checks and periodic jobs
+        self.scheduler_thread = threading.Thread(target=self.folder_scheduler_loop, daemon=True)
+        self.scheduler_thread.start()
         
-        # Start heartbeat timer
-        self.heartbeat_timer = threading.Timer(self.heartbeat_interval, self.send_heartbeat)
-        self.heartbeat_timer.daemon = True
-        self.heartbeat_timer.start()
+        # Periodically process accumulated files
+        self.schedule_job('process_all_folders', self.process_timer_interval, self.process_all_folders)
+        
+        # Start heartbeat
+        self.schedule_job('heartbeat', self.heartbeat_interval, self.send_heartbeat)
         
         # Clean empty folders at startup
         self.cleanup_empty_folders()
@@ -462,38 +804,64 @@ class DICOMFolderWatcher(FileSystemEventHandler):
     def schedule_cleanup(self):
         """Schedule regular cleanup of empty folders."""
         self.cleanup_empty_folders()
-        threading.Timer(300.0, self.schedule_cleanup).start()  # alle 5 Minuten
+        self.schedule_job('cleanup', 300.0, self.schedule_cleanup)  # alle 5 Minuten
     
     def periodic_rescan(self):
         """Recheck all patient subfolders for DICOMs that were missed."""
         try:
-            for patient_folder in os.listdir(self.watch_folder):
-                patient_path = os.path.join(self.watch_folder, patient_folder)
-                if not os.path.isdir(patient_path) or patient_path == self.failed_folder:
-                    continue
+            seen_dirs = {}
+            with os.scandir(self.watch_folder) as entries:
+                patient_paths = [entry.path for entry in entries
+                                 if entry.is_dir() and entry.path != self.failed_folder]
 
+            for patient_path in patient_paths:
                 # Gibt es darunter .dcm-Dateien in beliebiger Tiefe?
-                found_dicom = False
-                for root, _, files in os.walk(patient_path):
-                    if any(f.lower().endswith(".dcm") for f in files):
-                        found_dicom = True
-                        break
-
-                if found_dicom:
+                if self.contains_dicom(patient_path, seen_dirs):
                     # Falls Ordner nicht bereits in Timer-Überwachung, erneut check starten
                     with self.timer_lock:
                         if patient_path not in self.folder_timers:
-                            retry_timer = threading.Timer(14.0, self.check_folder_for_processing, args=[patient_path])
-                            self.folder_timers[patient_path] = retry_timer
-                            retry_timer.start()
+                            self.schedule_folder_check(patient_path, 14.0)
                             print(f"[RESCAN] Requeued folder after delayed DICOM detection: {patient_path}")
 
         except Exception as e:
             print(f"Error during periodic rescan: {str(e)}")
             self.log_error("Error in periodic_rescan", e)
+        else:
+            # Nur noch existierende Ordner im Cache behalten
+            self.rescan_dir_cache = seen_dirs
 
         # Zeitgesteuert neu starten (alle 5 Minuten)
-        threading.Timer(300.0, self.periodic_rescan).start()
+        self.schedule_job('periodic_rescan', 300.0, self.periodic_rescan)
+    
+    def contains_dicom(self, root_path, seen_dirs):
+        """Return True as soon as a .dcm file is found below root_path.
+
+        Directory listings are cached by mtime in rescan_dir_cache, so unchanged
+        directories are not listed again on the next rescan.
+        """
+        stack = [root_path]
+        while stack:
+            dir_path = stack.pop()
+            try:
+                mtime = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+
+            cached = self.rescan_dir_cache.get(dir_path)
+            if cached and cached[0] == mtime:
+                subdirs = cached[1]
+            else:
+                subdirs = []
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith('.dcm'):
+                            # Nicht cachen - der Ordner wird beim nächsten Mal erneut geprüft
+                            return True
+            seen_dirs[dir_path] = (mtime, subdirs)
+            stack.extend(subdirs)
+        return False
     
     def on_created(self, event):
         if not event.is_directory and event.src_path.lower().endswith('.dcm'):
@@ -516,36 +884,70 @@ class DICOMFolderWatcher(FileSystemEventHandler):
             # Update folder activity timestamp
             self.folder_activity[parent_folder] = time.time()
             
-            # Cancel existing folder timer if there is one
-            if parent_folder in self.folder_timers and self.folder_timers[parent_folder].is_alive():
-                self.folder_timers[parent_folder].cancel()
-            
-            # Start new folder timer with 13 seconds inactivity delay
-            folder_timer = threading.Timer(13.0, self.check_folder_for_processing, args=[parent_folder])
-            self.folder_timers[parent_folder] = folder_timer
-            folder_timer.start()
-            
-            # For compatibility, still track the file itself
-            if file_path in self.pending_files:
-                self.pending_files[file_path].cancel()
-            
-            # No need to process individual files anymore
-            self.pending_files[file_path] = threading.Timer(13.0, lambda: None)
-            self.pending_files[file_path].start()
+            # Push the folder deadline back by the configured inactivity delay
+            self.schedule_folder_check(parent_folder, self.inactivity_timeout)
+    
+    def schedule_folder_check(self, folder_path, delay):
+        """(Re)schedule check_folder_for_processing for a folder. Caller must hold timer_lock."""
+        deadline = time.monotonic() + delay
+        self.folder_timers[folder_path] = deadline
+        heapq.heappush(self.timer_heap, (deadline, False, folder_path))
+        self.timer_cond.notify()
+    
+    def schedule_job(self, name, delay, func):
+        """(Re)schedule a periodic job on the scheduler thread; a newer schedule replaces the pending one."""
+        with self.timer_cond:
+            deadline = time.monotonic() + delay
+            self.job_timers[name] = deadline
+            self.job_funcs[name] = func
+            heapq.heappush(self.timer_heap, (deadline, True, name))
+            self.timer_cond.notify()
+    
+    def folder_scheduler_loop(self):
+        """Wait for the earliest deadline and dispatch the folder check or job; stale heap entries are skipped."""
+        while True:
+            with self.timer_cond:
+                while True:
+                    if not self.timer_heap:
+                        self.timer_cond.wait()
+                        continue
+                    deadline, is_job, key = self.timer_heap[0]
+                    timers = self.job_timers if is_job else self.folder_timers
+                    if timers.get(key) != deadline:
+                        # Deadline was pushed back or cancelled in the meantime
+                        heapq.heappop(self.timer_heap)
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        self.timer_cond.wait(remaining)
+                        continue
+                    heapq.heappop(self.timer_heap)
+                    del timers[key]
+                    break
+            if is_job:
+                try:
+                    self.job_funcs[key]()
+                except Exception as e:
+                    print(f"Error in scheduled job {key}: {str(e)}")
+                    self.log_error(f"Error in scheduled job: {key}", e)
+            else:
+                self.check_folder_for_processing(key)
     
     def check_folder_for_processing(self, folder_path):
         """Check if a folder is ready for processing after inactivity period."""
         try:
-            # Remove from folder timers
-            with self.timer_lock:
-                if folder_path in self.folder_timers:
-                    del self.folder_timers[folder_path]
-            
             # Check if folder exists
-            if not os.path.exists(folder_path):
+            try:
+                current_mtime = os.stat(folder_path).st_mtime_ns
+            except FileNotFoundError:
+                self.last_processed_mtime.pop(folder_path, None)
+                return
+
+            # Nothing was added or removed since the last processing round
+            if self.last_processed_mtime.get(folder_path) == current_mtime:
                 return
                 
-            print(f"Folder {folder_path} has been inactive for 13 seconds, scheduling for processing")
+            print(f"Folder {folder_path} has been inactive for {self.inactivity_timeout:g} seconds, scheduling for processing")
             
             # Schedule folder processing
             self.schedule_folder_processing(folder_path)
@@ -582,8 +984,7 @@ class DICOMFolderWatcher(FileSystemEventHandler):
             #self.cleanup_empty_folders()
             
             # Get all subdirectories in the watch folder
-            subdirs = [d for d in os.listdir(self.watch_folder) 
-                      if os.path.isdir(os.path.join(self.watch_folder, d)) and d != "failed"]
+            subdirs = list_watch_subdirs(self.watch_folder)
             
             if not subdirs:
                 #print("No folders to process.")
@@ -603,9 +1004,7 @@ class DICOMFolderWatcher(FileSystemEventHandler):
                 self.is_processing = False
                 
             # Schedule next processing round
-            self.process_timer = threading.Timer(10.0, self.process_all_folders)
-            self.process_timer.daemon = True
-            self.process_timer.start()
+            self.schedule_job('process_all_folders', 10.0, self.process_all_folders)
             
             # Check if we need to send a heartbeat
             self.check_heartbeat()
@@ -628,6 +1027,12 @@ class DICOMFolderWatcher(FileSystemEventHandler):
             print(f"Processing specific folder: {folder_path}")
             self.process_folder(folder_path)
             
+            # Remember the folder state so unchanged folders are not processed again
+            try:
+                self.last_processed_mtime[folder_path] = os.stat(folder_path).st_mtime_ns
+            except FileNotFoundError:
+                self.last_processed_mtime.pop(folder_path, None)
+            
             # Clean up empty folders after processing
             #self.cleanup_empty_folders()
                 
@@ -644,80 +1049,74 @@ class DICOMFolderWatcher(FileSystemEventHandler):
     def process_folder(self, folder_path):
         """Process a single folder, sending files in the correct modality order."""
 
+        folder_name = os.path.basename(folder_path)
         modality_order = ["CT", "RTSTRUCT", "RTPLAN", "RTDOSE"]
 
         # Collect all DICOM files in the folder
-        all_files = []
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                if file.lower().endswith('.dcm'):
-                    all_files.append(os.path.join(root, file))
+        # Nur die erste Datei vorab holen, um leere Ordner zu erkennen - der Rest wird gestreamt
+        dcm_files = iter_dcm_files(folder_path)
+        first_file = next(dcm_files, None)
 
-        if not all_files:
+        if first_file is None:
             print(f"No DICOM files found in folder: {folder_path}, rechecking after inactivity...")
 
             # Recheck after another 14s of inactivity
             with self.timer_lock:
-                if folder_path in self.folder_timers:
-                    self.folder_timers[folder_path].cancel()
-
-                retry_timer = threading.Timer(14.0, self.check_folder_for_processing, args=[folder_path])
-                self.folder_timers[folder_path] = retry_timer
-                retry_timer.start()
+                self.schedule_folder_check(folder_path, 14.0)
 
             return
 
         # Group files by modality
-        modality_files = {mod: [] for mod in modality_order}
+        modality_files = defaultdict(list)  # Listen nur für tatsächlich vorhandene Modalitäten
         other_files = []
 
-        for file_path in all_files:
-            try:
-                # Versuche die DICOM-Datei zu lesen
-                ds = dcmread(file_path)
-                modality = getattr(ds, 'Modality', 'UNKNOWN')
-
-                if modality == "RTSTRUCT":
-                    modality_files["RTSTRUCT"].append((file_path, ds))
-                elif modality == "CT":
-                    modality_files["CT"].append((file_path, ds))
-                elif modality == "RTPLAN":
-                    modality_files["RTPLAN"].append((file_path, ds))
-                elif modality == "RTDOSE":
-                    modality_files["RTDOSE"].append((file_path, ds))
+        # Header parallel einlesen, die Einsortierung erfolgt danach seriell in Dateireihenfolge.
+        # Die Association wird währenddessen im Hintergrund aufgebaut, damit sie beim Senden bereitsteht.
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS + 1) as executor:
+            assoc_future = executor.submit(self.get_assoc)
+            results = list(executor.map(read_modality_header, itertools.chain((first_file,), dcm_files)))
+        if assoc_future.exception() is not None:
+            print(f"Association setup during header scan failed: {assoc_future.exception()}")
+        # The prefetch already went through the backoff - if it failed, the send tries only once more
+        prefetch_ok = assoc_future.exception() is None and assoc_future.result().is_established
+        assoc_attempts = ASSOC_ATTEMPTS if prefetch_ok else 1
+
+        raw_dose_files = {}  # Original path -> temp copy of dose files without readable header
+
+        for file_path, modality, sop_class_uid, e in results:
+            if e is None:
+                # Nur Pfad, Modalität und SOP Class behalten
+                entry = (file_path, modality, sop_class_uid)
+
+                if modality in modality_order:
+                    modality_files[modality].append(entry)
                 else:
-                    other_files.append((file_path, ds))
+                    other_files.append(entry)
 
-            except Exception as e:
+            else:
                 print(f"Error reading DICOM file {file_path}: {str(e)}")
                 
                 # Prüfe, ob es sich um eine Dosisdatei handeln könnte (basierend auf Dateinamen)
-                filename_lower = os.path.basename(file_path).lower()
+                file_name = os.path.basename(file_path)
+                filename_lower = file_name.lower()
                 if "dose" in filename_lower or "rtdose" in filename_lower:
                     print(f"Datei könnte eine Dosisdatei sein, wird direkt ohne DICOM-Parsing gesendet: {file_path}")
                     try:
-                        # Kopiere die Datei in einen temporären Ordner für die direkte Übertragung
-                        import shutil
-                        import tempfile
-                        
-                        # Erstelle einen temporären Ordner, falls er nicht existiert
-                        temp_dir = os.path.join(self.watch_folder, "temp_dose_files")
-                        os.makedirs(temp_dir, exist_ok=True)
-                        
+                        # Lege die Datei im temporären Ordner für die direkte Übertragung ab
                         # Generiere einen eindeutigen Dateinamen
-                        temp_file = os.path.join(temp_dir, f"dose_{int(time.time())}_{os.path.basename(file_path)}")
+                        temp_file = os.path.join(self.temp_dose_dir, f"dose_{uuid.uuid4().hex}_{file_name}")
                         
-                        # Kopiere die Originaldatei
-                        shutil.copy2(file_path, temp_file)
+                        # Hardlink auf dem gleichen Volume, sonst Kopie der Originaldatei
+                        try:
+                            os.link(file_path, temp_file)
+                        except OSError:
+                            shutil.copy2(file_path, temp_file)
                         
-                        # Erstelle ein minimales Dataset nur für die Gruppierung
-                        ds = Dataset()
-                        ds.Modality = "RTDOSE"
-                        ds._is_raw_dose_file = True  # Spezielle Markierung
-                        ds._raw_dose_path = temp_file  # Speichere den Pfad zur kopierten Datei
+                        # Merke den Pfad zur kopierten Datei für den Versand
+                        raw_dose_files[file_path] = temp_file
                         
                         # Füge die Datei zur RTDOSE-Liste hinzu
-                        modality_files["RTDOSE"].append((file_path, ds))
+                        modality_files["RTDOSE"].append((file_path, "RTDOSE", None))
                         print(f"Dosisdatei zur direkten Übertragung vorbereitet: {file_path} -> {temp_file}")
                     except Exception as dose_error:
                         print(f"Fehler beim Vorbereiten der Dosisdatei: {str(dose_error)}")
@@ -730,47 +1129,61 @@ class DICOMFolderWatcher(FileSystemEventHandler):
         # Erstelle eine sortierte Liste aller Dateien in der gewünschten Modalitätsreihenfolge
         ordered_files = []
         for modality in modality_order:
-            if modality_files[modality]:
-                file_count = len(modality_files[modality])
+            bucket = modality_files.get(modality)
+            if bucket:
+                file_count = len(bucket)
                 if modality == "CT":
-                    print(f"Hinzufügen von {file_count} CT-Files aus Folder {os.path.basename(folder_path)}")
+                    print(f"Hinzufügen von {file_count} CT-Files aus Folder {folder_name}")
                 else:
                     print(f"Hinzufügen von {file_count} {modality} files")
-                ordered_files.extend(modality_files[modality])
+                ordered_files += bucket
         
         # Füge alle übrigen Dateien am Ende hinzu
         if other_files:
             print(f"Hinzufügen von {len(other_files)} files mit anderen Modalitäten")
-            ordered_files.extend(other_files)
+            ordered_files += other_files
             
         # Sende alle Dateien in einer einzigen Association
         if ordered_files:
-            print(f"Sende {len(ordered_files)} Dateien aus Ordner {os.path.basename(folder_path)} in einer Association...")
-            self.send_all_dicom_files(ordered_files, folder_name=os.path.basename(folder_path))
+            print(f"Sende {len(ordered_files)} Dateien aus Ordner {folder_name} in einer Association...")
+            self.send_all_dicom_files(ordered_files, folder_name=folder_name,
+                                      raw_dose_files=raw_dose_files, assoc_attempts=assoc_attempts)
+        else:
+            # Nichts zu senden - die vorab aufgebaute Association nach Leerlauf freigeben
+            self.schedule_assoc_release()
 
     
-    def send_all_dicom_files(self, file_dataset_pairs, folder_name=""):
-        """Send all DICOM files from a folder in a single association while maintaining order."""
-        if not file_dataset_pairs:
+    def send_all_dicom_files(self, file_entries, folder_name="", raw_dose_files=None, assoc_attempts=ASSOC_ATTEMPTS):
+        """Send all DICOM files from a folder in a single association while maintaining order.
+
+        file_entries are (file_path, modality, sop_class_uid) tuples from the header pass;
+        raw_dose_files maps paths of unreadable dose files to their temp copy.
+        assoc_attempts is passed to get_assoc (1 when the prefetch already failed).
+        """
+        if not file_entries:
             return
             
-        file_count = len(file_dataset_pairs)
+        raw_dose_files = raw_dose_files or {}
+        file_count = len(file_entries)
         success_count = 0
         failed_files = []
+        sent_paths = []  # Deleted after the send loop (the association stays open for the next folder)
         
         # Track statistics by modality
         modality_stats = {}
+        last_progress_log = float('-inf')
         
         try:
-            # Establish a single association for ALL files
+            # Use a single association for ALL files
             print(f"Establishing association with {self.target_aet} for {file_count} DICOM files from {folder_name}")
-            assoc = self.ae.associate(self.target_ip, self.target_port, ae_title=self.target_aet)
+            assoc = self.get_assoc(attempts=assoc_attempts)
             
             if assoc.is_established:
                 # Send all datasets in a single association, maintaining order
-                for i, (file_path, ds) in enumerate(file_dataset_pairs):
+                for i, (file_path, modality, current_sop_class_uid) in enumerate(file_entries):
                     try:
-                        modality = getattr(ds, 'Modality', 'UNKNOWN')
+                        basename = os.path.basename(file_path)
+                        raw_file_path = raw_dose_files.get(file_path)
                         
                         # Update statistics for this modality
                         if modality not in modality_stats:
@@ -778,26 +1191,24 @@ class DICOMFolderWatcher(FileSystemEventHandler):
                         modality_stats[modality]['total'] += 1
                         
                         # Fix SOP Class UID for RTPLAN files to ensure compatibility
-                        if modality == "RTPLAN":
-                            correct_sop_class_uid = '1.2.840.10008.5.1.4.1.1.481.5'
-                            current_sop_class_uid = getattr(ds, 'SOPClassUID', None)
-                            if current_sop_class_uid != correct_sop_class_uid:
-                                print(f"Korrigiere SOP Class UID für RTPLAN: {current_sop_class_uid} -> {correct_sop_class_uid}")
-                                ds.SOPClassUID = correct_sop_class_uid
+                        # (the sorting pass read SOPClassUID; only a plan that needs fixing is read in full)
+                        corrected_ds = None
+                        if modality == "RTPLAN" and raw_file_path is None:
+                            if current_sop_class_uid != RTPLAN_SOP_CLASS_UID:
+                                print(f"Korrigiere SOP Class UID für RTPLAN: {current_sop_class_uid} -> {RTPLAN_SOP_CLASS_UID}")
+                                corrected_ds = dcmread(file_path)
+                                corrected_ds.SOPClassUID = RTPLAN_SOP_CLASS_UID
                         
-                        # Only print detailed progress for non-CT files or at intervals for CT
-                        if modality != "CT" or i % 10 == 0:
-                            print(f"Sending {modality} file {i+1}/{file_count}: {os.path.basename(file_path)}")
+                        # Log every non-CT file, CT progress at most once per PROGRESS_LOG_INTERVAL
+                        now = time.monotonic()
+                        if modality != "CT" or now - last_progress_log >= PROGRESS_LOG_INTERVAL:
+                            last_progress_log = now
+                            logger.info("Sending %s file %d/%d: %s", modality, i + 1, file_count, basename)
                         
                         # Sende das Dataset - für Dosisdateien mit fehlendem Header verwende direkten Dateizugriff
-                        if hasattr(ds, '_is_raw_dose_file') and ds._is_raw_dose_file and modality == "RTDOSE":
-                            raw_file_path = ds._raw_dose_path
+                        if raw_file_path is not None:
                             print(f"Sende Dosisdatei direkt vom Dateisystem: {os.path.basename(raw_file_path)}")
                             
-                            # Erstelle ein neues DICOM-Dataset mit den notwendigen Attributen
-                            from pydicom.dataset import Dataset, FileMetaDataset
-                            from pydicom.uid import generate_uid, ImplicitVRLittleEndian
-                            
                             # Erstelle ein neues Dataset für die Dosisdatei
                             temp_ds = Dataset()
                             temp_ds.file_meta = FileMetaDataset()
@@ -816,25 +1227,39 @@ class DICOMFolderWatcher(FileSystemEventHandler):
                             # Der zweite Parameter gibt den Pfad zur Datei an, die gesendet werden soll
                             status = assoc.send_c_store(temp_ds, raw_file_path)
                             print(f"Dosisdatei direkt gesendet: {raw_file_path}")
+                        elif corrected_ds is not None:
+                            status = assoc.send_c_store(corrected_ds)
                         else:
-                            # Normaler Sendevorgang für alle anderen Dateien
-                            status = assoc.send_c_store(ds)
+                            # Datei direkt vom Pfad senden - pynetdicom liest die kodierten
+                            # Bytes ohne Dekodierung und Neukodierung des Datasets
+                            status = assoc.send_c_store(file_path)
                         
                         if status and status.Status == 0x0000:  # Success
                             success_count += 1
                             modality_stats[modality]['success'] += 1
-                            os.remove(file_path)  # Delete after successful send
+                            sent_paths.append(file_path)  # Deleted once the send loop is done
                         else:
-                            error_msg = f"Failed to send: {os.path.basename(file_path)} - Status: {status.Status if status else 'unknown'}"
+                            error_msg = f"Failed to send: {basename} - Status: {status.Status if status else 'unknown'}"
                             print(error_msg)
                             failed_files.append((file_path, error_msg))
                     except Exception as e:
-                        error_msg = f"Error sending DICOM file {os.path.basename(file_path)}: {str(e)}"
+                        error_msg = f"Error sending DICOM file {basename}: {str(e)}"
                         print(error_msg)
                         failed_files.append((file_path, error_msg))
+
+                        # Association was aborted - reconnect once for the remaining files
+                        if not assoc.is_established:
+                            print(f"Association with {self.target_aet} lost, re-establishing...")
+                            assoc = self.get_assoc(attempts=1)
+                            if not assoc.is_established:
+                                # Target unreachable - fail the rest of the folder at once
+                                error_msg = f"Association with {self.target_aet} lost, could not re-establish"
+                                print(error_msg)
+                                failed_files += [(entry[0], error_msg) for entry in file_entries[i + 1:]]
+                                break
                         
-                # Release association after all files are processed
-                assoc.release()
+                # Keep the association for the next folder, it is released once idle
+                self.schedule_assoc_release()
                 print(f"Transfer complete: {success_count} of {file_count} files successfully sent from {folder_name}")
                 
                 # Print statistics by modality
@@ -845,20 +1270,75 @@ class DICOMFolderWatcher(FileSystemEventHandler):
                 error_msg = f"Failed to establish association with {self.target_aet}"
                 print(error_msg)
                 # Move all files to failed
-                failed_files = [(file_path, error_msg) for file_path, _ in file_dataset_pairs]
+                failed_files = [(entry[0], error_msg) for entry in file_entries]
                 
         except Exception as e:
             error_msg = f"Transfer error: {str(e)}"
             print(error_msg)
+            # Drop the association, the next folder opens a fresh one
+            self.release_assoc()
             # Move all remaining files to failed
-            failed_files = [(file_path, error_msg) for file_path, _ in file_dataset_pairs]
+            sent = set(sent_paths)
+            failed_files = [(entry[0], error_msg) for entry in file_entries if entry[0] not in sent]
+            
+        # Delete sent files concurrently, off the send loop
+        if sent_paths:
+            list(self.delete_executor.map(remove_sent_file, sent_paths))
             
         # Move failed files to the failed folder
-        for file_path, error_msg in failed_files:
-            self.move_to_failed(file_path, error_msg)
+        self.move_many_to_failed(failed_files)
             
         return success_count
         
+    def get_assoc(self, attempts=ASSOC_ATTEMPTS):
+        """Return the open association to the target, associating only if there is none.
+
+        A pending idle release is cancelled. A failed association is retried up to
+        attempts times with 2**attempt s backoff; reconnects inside a send loop pass 1.
+        """
+        with self.assoc_lock:
+            if self.assoc_idle_timer is not None:
+                self.assoc_idle_timer.cancel()
+                self.assoc_idle_timer = None
+            if self.assoc is None or not self.assoc.is_established:
+                for attempt in range(attempts):
+                    if attempt:
+                        time.sleep(2 ** attempt)
+                    self.assoc = self.ae.associate(self.target_ip, self.target_port, ae_title=self.target_aet)
+                    if self.assoc.is_established:
+                        break
+            return self.assoc
+    
+    def release_assoc(self):
+        """Release the association to the target if it is still open."""
+        with self.assoc_lock:
+            if self.assoc_idle_timer is not None:
+                self.assoc_idle_timer.cancel()
+                self.assoc_idle_timer = None
+            if self.assoc is not None and self.assoc.is_established:
+                self.assoc.release()
+            self.assoc = None
+    
+    def schedule_assoc_release(self):
+        """Keep the association open for the next folder; release it after assoc_idle_timeout."""
+        with self.assoc_lock:
+            if self.assoc is None:
+                return
+            if self.assoc_idle_timer is not None:
+                self.assoc_idle_timer.cancel()
+            self.assoc_idle_timer = threading.Timer(self.assoc_idle_timeout, self.release_idle_assoc)
+            self.assoc_idle_timer.daemon = True
+            self.assoc_idle_timer.start()
+    
+    def release_idle_assoc(self):
+        """Idle timer callback: release only if no get_assoc() took the association meanwhile."""
+        with self.assoc_lock:
+            if self.assoc_idle_timer is not threading.current_thread():
+                return
+            self.assoc_idle_timer = None
+            print(f"Association with {self.target_aet} idle for {self.assoc_idle_timeout:g} seconds, releasing")
+            self.release_assoc()
+        
     def send_dicom_batch(self, file_dataset_pairs, modality=None, folder_name=""):
         """Send multiple DICOM files in a single association (legacy method, kept for compatibility)."""
         if not file_dataset_pairs:
@@ -883,8 +1363,8 @@ class DICOMFolderWatcher(FileSystemEventHandler):
                         elif modality != "CT":
                             print(f"Sending {os.path.basename(file_path)} ({i+1}/{file_count})")
                             
-                        # Send the dataset
-                        status = assoc.send_c_store(ds)
+                        # Send the encoded file from disk, ds is not re-encoded
+                        status = assoc.send_c_store(file_path)
                         
                         if status and status.Status == 0x0000:  # Success
                             success_count += 1
@@ -914,8 +1394,7 @@ class DICOMFolderWatcher(FileSystemEventHandler):
             failed_files = [(file_path, error_msg) for file_path, _ in file_dataset_pairs]
             
         # Move failed files to the failed folder
-        for file_path, error_msg in failed_files:
-            self.move_to_failed(file_path, error_msg)
+        self.move_many_to_failed(failed_files)
             
         return success_count
         
@@ -930,8 +1409,8 @@ class DICOMFolderWatcher(FileSystemEventHandler):
             assoc = self.ae.associate(self.target_ip, self.target_port, ae_title=self.target_aet)
             
             if assoc.is_established:
-                # Send the dataset
-                status = assoc.send_c_store(ds)
+                # Send the encoded file from disk, ds is not re-encoded
+                status = assoc.send_c_store(file_path)
                 
                 if status and status.Status == 0x0000:  # Success
                     if modality != "CT" or is_summary:
@@ -960,60 +1439,92 @@ class DICOMFolderWatcher(FileSystemEventHandler):
     
     def move_to_failed(self, file_path, error_message):
         """Move a file to the failed folder and log the error."""
-        try:
-            # Create a unique filename to avoid overwriting existing files
-            basename = os.path.basename(file_path)
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            new_filename = f"{timestamp}_{basename}"
-            destination = os.path.join(self.failed_folder, new_filename)
-            
-            # Move the file
-            shutil.copy2(file_path, destination)  # Use copy2 to preserve metadata
-            os.remove(file_path)  # Remove the original
-            
-            # Log the error
-            self.log_error(f"Failed file moved to {destination}", error_message)
-            print(f"Moved failed file to: {destination}")
-        except Exception as e:
-            print(f"Error moving file to failed folder: {str(e)}")
+        self.move_many_to_failed([(file_path, error_message)])
+        
+    def move_many_to_failed(self, failed_files):
+        """Move (file_path, error_message) pairs to the failed folder and log them with one log file write."""
+        if not failed_files:
+            return
+        
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        log_lines = []
+        for file_path, error_message in failed_files:
+            try:
+                # Create a unique filename to avoid overwriting existing files
+                destination = os.path.join(self.failed_folder, f"{timestamp}_{os.path.basename(file_path)}")
+                
+                # Move the file - rename on the same volume, copy only across volumes
+                try:
+                    os.replace(file_path, destination)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.copy2(file_path, destination)  # Use copy2 to preserve metadata
+                    os.remove(file_path)  # Remove the original
+                
+                log_lines.append(self.format_log_line(f"Failed file moved to {destination}", error_message))
+                print(f"Moved failed file to: {destination}")
+            except Exception as e:
+                print(f"Error moving file to failed folder: {str(e)}")
+        
+        # Log all errors with a single open of the log file
+        self.write_log_lines(log_lines)
             
-    def log_error(self, context, error):
-        """Log error to the log file in the failed folder."""
+    def format_log_line(self, context, error):
+        """Format one line for the error log in the failed folder."""
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {context}: {str(error)}\n"
-        
+        return f"[{timestamp}] {context}: {str(error)}\n"
+            
+    def write_log_lines(self, log_lines):
+        """Append lines to the log file in the failed folder."""
+        if not log_lines:
+            return
         try:
             with open(self.log_file, 'a') as f:
-                f.write(log_message)
+                f.writelines(log_lines)
         except Exception as e:
             print(f"Error writing to log file: {str(e)}")
             
+    def log_error(self, context, error):
+        """Log error to the log file in the failed folder."""
+        self.write_log_lines([self.format_log_line(context, error)])
+            
     def cleanup_empty_folders(self):
         """Delete empty folders in the watch directory (excluding the failed folder) if older than 3 minutes."""
+        deleted = self.remove_empty_dirs(self.watch_folder, time.time())
+
+        if deleted > 0:
+            print(f"Cleaned up {deleted} empty folders")
+    
+    def remove_empty_dirs(self, dir_path, now):
+        """Bottom-up scandir pass below dir_path; returns the number of deleted empty folders."""
         deleted = 0
-        now = time.time()
+        try:
+            with os.scandir(dir_path) as entries:
+                subdirs = [entry for entry in entries if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return 0
 
-        for root, dirs, files in os.walk(self.watch_folder, topdown=False):  # Bottom-up traversal
-            for dir_name in dirs:
-                dir_path = os.path.join(root, dir_name)
+        for entry in subdirs:
+            deleted += self.remove_empty_dirs(entry.path, now)
 
-                # Skip the failed folder
-                if dir_path == self.failed_folder:
-                    continue
+            # Skip the failed folder and the dose temp folder
+            if entry.path == self.failed_folder or entry.path == self.temp_dose_dir:
+                continue
 
-                # Check if folder is empty and older than 3 minutes
-                if not os.listdir(dir_path):
-                    try:
-                        last_modified = os.path.getmtime(dir_path)
-                        if now - last_modified > 180:  # older than 3 minutes
-                            os.rmdir(dir_path)
-                            deleted += 1
-                            print(f"Deleted empty folder: {dir_path}")
-                    except Exception as e:
-                        print(f"Error deleting empty folder {dir_path}: {str(e)}")
+            # Check if folder is empty and older than 3 minutes (mtime from the cached DirEntry stat)
+            try:
+                with os.scandir(entry.path) as children:
+                    if next(children, None) is not None:
+                        continue
+                if now - entry.stat(follow_symlinks=False).st_mtime > 180:  # older than 3 minutes
+                    os.rmdir(entry.path)
+                    deleted += 1
+                    print(f"Deleted empty folder: {entry.path}")
+            except Exception as e:
+                print(f"Error deleting empty folder {entry.path}: {str(e)}")
 
-        if deleted > 0:
-            print(f"Cleaned up {deleted} empty folders")
+        return deleted
             
     def send_heartbeat(self):
         """Send a heartbeat message with timestamp and reschedule next heartbeat."""
@@ -1024,10 +1535,8 @@ class DICOMFolderWatcher(FileSystemEventHandler):
         # Update last heartbeat time
         self.last_heartbeat = current_time
         
-        # Schedule next heartbeat
-        self.heartbeat_timer = threading.Timer(120.0, self.send_heartbeat)
-        self.heartbeat_timer.daemon = True
-        self.heartbeat_timer.start()
+        # Schedule next heartbeat (replaces a pending one, so check_heartbeat never starts a second chain)
+        self.schedule_job('heartbeat', 120.0, self.send_heartbeat)
         
     def check_heartbeat(self):
         """Check if it's time to send a heartbeat."""
@@ -1041,8 +1550,7 @@ class DICOMFolderWatcher(FileSystemEventHandler):
             print("Checking for existing folders in the watch directory...")
             
             # Get all subdirectories in the watch folder
-            subdirs = [d for d in os.listdir(self.watch_folder) 
-                      if os.path.isdir(os.path.join(self.watch_folder, d)) and d != "failed"]
+            subdirs = list_watch_subdirs(self.watch_folder)
             
             if not subdirs:
                 print("No existing folders to process.")
@@ -1057,15 +1565,70 @@ class DICOMFolderWatcher(FileSystemEventHandler):
                 # Trigger "simulierte" Dateibewegung, um die Inaktivitätslogik anzustoßen
                 with self.timer_lock:
                     if folder_path not in self.folder_timers:
-                        folder_timer = threading.Timer(14.0, self.check_folder_for_processing, args=[folder_path])
-                        self.folder_timers[folder_path] = folder_timer
-                        folder_timer.start()
+                        self.schedule_folder_check(folder_path, 14.0)
                         print(f"Initial folder scheduled for processing after 14s inactivity: {folder_path}")
                 
         except Exception as e:
             print(f"Error during initial folder processing: {str(e)}")
             self.log_error("Error during initial folder processing", e)
 
+DRIVE_REMOTE = 4  # Rückgabewert von GetDriveTypeW für Netzlaufwerke
+NETWORK_FS_TYPES = {'cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'fuse.sshfs'}
+
+def get_mount_fstype(path):
+    """Return the filesystem type of the mount containing path (POSIX, from /proc/mounts)."""
+    path = os.path.realpath(path)
+    best_mount, best_type = '', None
+    try:
+        with open('/proc/mounts') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                prefix = mount_point.rstrip('/') + '/'
+                if (path == mount_point or path.startswith(prefix)) and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        return None
+    return best_type
+
+def is_network_path(path):
+    """Return True if path is a UNC path or lies on a mapped network drive or network mount."""
+    if path.startswith('\\\\') or path.startswith('//'):
+        return True
+    if os.name != 'nt':
+        return get_mount_fstype(path) in NETWORK_FS_TYPES
+    drive = os.path.splitdrive(os.path.abspath(path))[0]
+    if not drive:
+        return False
+    try:
+        return ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == DRIVE_REMOTE
+    except Exception:
+        return False
+
+def create_observer(watch_folder):
+    """Create a native or polling observer according to [FolderWatcher] observer_mode.
+
+    ``auto`` polls on network shares, where native change notifications drop
+    events under bursts, and uses the native observer everywhere else.
+    """
+    observer_mode = config.get('FolderWatcher', 'observer_mode', fallback='auto').strip().lower()
+    poll_interval = config.getfloat('FolderWatcher', 'poll_interval', fallback=10.0)
+
+    use_polling = observer_mode == 'polling' or (observer_mode == 'auto' and is_network_path(watch_folder))
+    if use_polling:
+        print(f"Using polling observer (interval {poll_interval}s) for: {watch_folder}")
+        return PollingObserver(timeout=poll_interval)
+    try:
+        # Linux: der Watcher braucht keine zusammengeführten Move-Events, daher ohne Puffer-Verzögerung
+        from watchdog.observers.inotify_buffer import InotifyBuffer
+        InotifyBuffer.delay = 0
+    except ImportError:
+        pass
+    print(f"Using native observer for: {watch_folder}")
+    return Observer()
+
 def start_folder_watcher(watch_folder=None, target_aet=None, target_ip=None, target_port=None):
     """Start the folder watcher in a separate thread."""
     # Use config values if not provided
@@ -1083,7 +1646,7 @@ def start_folder_watcher(watch_folder=None, target_aet=None, target_ip=None, tar
         print(f"Created watch folder: {watch_folder}")
     
     event_handler = DICOMFolderWatcher(watch_folder, target_aet, target_ip, target_port)
-    observer = Observer()
+    observer = create_observer(watch_folder)
     observer.schedule(event_handler, watch_folder, recursive=True)
     observer.start()
     
@@ -1112,7 +1675,7 @@ if __name__ == "__main__":
     print(f"Receive Port: {RECEIVE_PORT}")
     print(f"Destination Directory: {DESTINATION_DIR}")
     print(f"Watch Folder: {args.watch_folder}")
-    print(f"Trusted AE Titles: {', '.join(TRUSTED_AE_TITLES)}")
+    print(f"Trusted AE Titles: {', '.join(sorted(TRUSTED_AE_TITLES))}")
     
     # Start folder watcher in background thread
     watcher_thread = threading.Thread(target=start_folder_watcher, args=(args.watch_folder,))
@@ -10,13 +10,21 @@ und sendet sie an verschiedene DICOM-Knoten.
 
 import os
 import sys
+import errno
+import struct
 import time
 import logging
 import threading
 import shutil
+import queue
+import tempfile
+import itertools
+import subprocess
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, defaultdict, deque, namedtuple
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import re
 
 # PyDICOM-Bibliotheken
@@ -33,6 +41,8 @@ from pynetdicom.sop_class import (
     UID
 )
 from pydicom.uid import ImplicitVRLittleEndian, ExplicitVRLittleEndian
+from pydicom.filewriter import write_file_meta_info
+from pydicom.errors import InvalidDicomError
 # Eigene RTPLAN UID definieren
 MyPrivateRTPlanStorage = UID('1.2.246.352.70.1.70')
 
@@ -40,9 +50,561 @@ MyPrivateRTPlanStorage = UID('1.2.246.352.70.1.70')
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from rules_manager import RulesManager
+
 # Logging-Konfiguration
 logger = logging.getLogger('DICOM-Processor')
 
+# Header-Tags, die der Import zum Gruppieren liest (Dateien selbst werden nur kopiert)
+IMPORT_HEADER_TAGS = [
+    'Modality', 'PatientID', 'PatientName', 'SOPInstanceUID', 'StudyInstanceUID',
+    'FrameOfReferenceUID', 'RTPlanLabel', 'SeriesDescription', 'StudyDescription',
+    'ReferencedRTPlanSequence', 'SourceApplicationEntityTitle',
+]
+
+# Threads für das parallele Header-Lesen (I/O-gebunden, v.a. auf Netzlaufwerken)
+HEADER_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Höchstens so viele Lesevorgänge gleichzeitig in Arbeit, wenn die Pfade aus einem Generator kommen
+HEADER_READ_WINDOW = HEADER_READ_WORKERS * 4
+# Threads für paralleles Löschen (überschreibbar per settings.ini: [General] delete_parallelism)
+DELETE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Pro gruppiertem Plan einmal bestimmt, für das Verschieben und die Weiterleitungsregeln
+PlanInfo = namedtuple('PlanInfo', 'plan_file_path plan_name source_ae plan_folder')
+
+# Maximal wartende empfangene Datasets, bevor handle_store blockiert
+STORE_QUEUE_SIZE = 256
+# So viele wartende Datasets schreibt der Store-Thread am Stück
+STORE_BATCH_SIZE = 32
+
+# Empfangene Datasets ab dieser Größe werden blockweise statt in einem Stück geschrieben
+STREAM_WRITE_BLOCK = 1 << 20
+
+# Zeichen, die in Ordner- und Dateinamen durch '_' ersetzt werden
+UNSAFE_PATH_CHARS = re.compile(r'[^\w\-_. ]')
+# Doppelpunkt und Schrägstrich werden vorher zu '-'
+PATH_SEPARATOR_TRANS = str.maketrans({':': '-', '/': '-'})
+
+
+@lru_cache(maxsize=4096)
+def _sanitize_path_component(name):
+    """Gecachte Bereinigung - Patientenname, ID und Planname wiederholen sich pro Serie."""
+    return UNSAFE_PATH_CHARS.sub('_', name.translate(PATH_SEPARATOR_TRANS)).strip()
+
+
+# Direktes Lesen der Gruppierungs-Tags ohne pydicom (Fallback: dcmread)
+LONG_LENGTH_VRS = frozenset((b'OB', b'OD', b'OF', b'OL', b'OV', b'OW', b'SQ', b'SV', b'UC', b'UN', b'UR', b'UT', b'UV'))
+UNDEFINED_LENGTH = 0xFFFFFFFF
+ITEM_TAG = 0xFFFEE000
+ITEM_DELIMITATION_TAG = 0xFFFEE00D
+SEQUENCE_DELIMITATION_TAG = 0xFFFEE0DD
+SOURCE_AE_TAG = 0x00020016
+TRANSFER_SYNTAX_TAG = 0x00020010
+REFERENCED_RT_PLAN_SEQUENCE_TAG = 0x300C0002
+REFERENCED_SOP_INSTANCE_UID_TAG = 0x00081155
+SOP_INSTANCE_UID_TAG = 0x00080018
+MODALITY_TAG = 0x00080060
+PATIENT_NAME_TAG = 0x00100010
+PATIENT_ID_TAG = 0x00100020
+STUDY_INSTANCE_UID_TAG = 0x0020000D
+FRAME_OF_REFERENCE_UID_TAG = 0x00200052
+RT_PLAN_LABEL_TAG = 0x300A0002
+SOP_CLASS_UID_TAG = 0x00080016
+RECEIVED_HEADER_TAGS = {
+    SOP_INSTANCE_UID_TAG: ('sop_instance_uid', "unknown"),
+    MODALITY_TAG: ('modality', "UNKNOWN"),
+    PATIENT_NAME_TAG: ('patient_name', "unknown"),
+    PATIENT_ID_TAG: ('patient_id', "unknown"),
+    STUDY_INSTANCE_UID_TAG: ('study_uid', "unknown"),
+    FRAME_OF_REFERENCE_UID_TAG: ('frame_ref_uid', "unknown"),
+    RT_PLAN_LABEL_TAG: ('plan_label', "unknown"),
+}
+IMPLICIT_VR_LITTLE_ENDIAN_UID = '1.2.840.10008.1.2'
+EXPLICIT_VR_BIG_ENDIAN_UID = '1.2.840.10008.1.2.2'
+DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN_UID = '1.2.840.10008.1.2.1.99'
+
+
+def _set_windows_timer_resolution(enable):
+    """Setzt unter Windows die Timer-Auflösung auf 1 ms (bzw. gibt sie wieder frei).
+    
+    Die Standardauflösung von 15,6 ms bremst pynetdicom-Schleifen mit kurzen Wartezeiten.
+    Die erhöhte Auflösung gilt systemweit und kostet Energie, daher nur solange der Empfänger läuft.
+    """
+    if sys.platform != 'win32':
+        return False
+    try:
+        import ctypes
+        winmm = ctypes.WinDLL('winmm')
+        result = winmm.timeBeginPeriod(1) if enable else winmm.timeEndPeriod(1)
+        return result == 0  # TIMERR_NOERROR
+    except Exception as e:
+        logger.warning(f"Timer-Auflösung konnte nicht geändert werden: {str(e)}")
+        return False
+
+
+FICLONE = 0x40049409  # ioctl für Reflinks (btrfs/XFS)
+
+
+def _reflink(src_path, dest_path):
+    """Klont die Datenblöcke von src_path nach dest_path (Linux, Copy-on-Write-Dateisysteme)
+    
+    Returns:
+        bool: True bei Erfolg; sonst existiert dest_path danach nicht
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src_path, 'rb') as src, open(dest_path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        return False
+    shutil.copystat(src_path, dest_path)
+    return True
+
+
+def _kernel_copy(src_path, dest_path):
+    """Kopiert eine Datei im Kernel (inkl. Metadaten wie copy2)
+    
+    copy_file_range ermöglicht serverseitiges Kopieren auf NFS 4.2/SMB3. Ohne copy_file_range
+    (Windows, macOS) oder wenn es gleich am Anfang scheitert, übernimmt shutil.copy2
+    (unter Linux selbst per sendfile); ein abgebrochener Rest wird blockweise kopiert.
+    """
+    if not hasattr(os, 'copy_file_range'):
+        shutil.copy2(src_path, dest_path)
+        return
+    src_fd = os.open(src_path, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            size = os.fstat(src_fd).st_size
+            offset = 0
+            try:
+                while offset < size:
+                    copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+                    if copied == 0:
+                        break
+                    offset += copied
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSUP, errno.EXDEV):
+                    raise
+            if 0 < offset < size:
+                # Rest klassisch kopieren, kurze Schreibvorgänge fortsetzen
+                os.lseek(src_fd, offset, os.SEEK_SET)
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                while True:
+                    chunk = os.read(src_fd, STREAM_WRITE_BLOCK)
+                    if not chunk:
+                        break
+                    view = memoryview(chunk)
+                    while view:
+                        view = view[os.write(dst_fd, view):]
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    if offset == 0 and size > 0:
+        shutil.copy2(src_path, dest_path)
+        return
+    shutil.copystat(src_path, dest_path)
+
+
+# Ab dieser Anzahl Einträge löscht ein externer Prozess schneller als shutil.rmtree
+FAST_RMTREE_MIN_ENTRIES = 1000
+# Zeichen, die cmd.exe trotz Anführungszeichen auswertet - solche Pfade nie an rd übergeben
+CMD_SPECIAL_CHARS = frozenset('&|<>^%!"')
+
+
+def _count_entries(path, limit):
+    """Zählt Einträge unterhalb von path, bricht bei limit ab"""
+    count = 0
+    stack = [path]
+    while stack and count < limit:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    count += 1
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError:
+            pass
+    return count
+
+
+def _fast_rmtree(path):
+    """Löscht einen Ordnerbaum - große Bäume mit einem Aufruf von rm -rf bzw. rd /s /q.
+    
+    Kleine Bäume, fehlende Programme und alles, was danach noch übrig ist, erledigt
+    shutil.rmtree; dessen Fehler (z.B. PermissionError) werden weitergereicht.
+    """
+    if _count_entries(path, FAST_RMTREE_MIN_ENTRIES) >= FAST_RMTREE_MIN_ENTRIES:
+        command = None
+        kwargs = {}
+        if sys.platform == 'win32':
+            if not CMD_SPECIAL_CHARS.intersection(path):
+                command = ['cmd', '/c', 'rd', '/s', '/q', path]
+                kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        else:
+            command = ['rm', '-rf', '--', path]
+        if command:
+            try:
+                subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False, **kwargs)
+            except OSError as e:
+                logger.debug(f"Externes Löschen nicht möglich, verwende shutil.rmtree: {str(e)}")
+    if os.path.lexists(path):
+        shutil.rmtree(path)
+
+
+def _safe_unlink(file_path, dir_fd=None):
+    """Löscht eine Datei mit bis zu drei Versuchen (Windows: Datei evtl. noch kurz gesperrt)
+    
+    Args:
+        dir_fd (int): Optional geöffneter Elternordner - dann unlinkat mit dem Dateinamen,
+                      ohne den vollständigen Pfad erneut aufzulösen
+    
+    Returns:
+        tuple: (file_path, gelöscht, Fehlermeldung oder None) - fehlende Dateien gelten nicht als Fehler
+    """
+    target = file_path if dir_fd is None else os.path.basename(file_path)
+    try:
+        for attempt in range(3):
+            try:
+                os.remove(target, dir_fd=dir_fd)
+                return file_path, True, None
+            except FileNotFoundError:
+                return file_path, False, None
+            except PermissionError:
+                # Kurze Pause und erneuter Versuch
+                time.sleep(0.1)
+        return file_path, False, "Datei konnte nicht gelöscht werden nach mehreren Versuchen"
+    except Exception as e:
+        return file_path, False, f"Konnte Datei {file_path} nicht löschen: {str(e)}"
+
+
+def _unlink_many(file_paths, max_workers=DELETE_WORKERS):
+    """Löscht viele Dateien parallel, Ergebnisse wie _safe_unlink in der Reihenfolge von file_paths
+    
+    Wo das System unlinkat kennt (Linux/macOS), wird jeder Elternordner nur einmal geöffnet.
+    """
+    file_paths = list(file_paths)
+    dir_fds = {}
+    try:
+        if os.remove in os.supports_dir_fd:
+            for parent in {os.path.dirname(file_path) for file_path in file_paths}:
+                try:
+                    dir_fds[parent] = os.open(parent, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+                except OSError:
+                    pass  # Ordner fehlt/gesperrt - diese Dateien über den vollen Pfad löschen
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            yield from executor.map(
+                lambda file_path: _safe_unlink(file_path, dir_fds.get(os.path.dirname(file_path))),
+                file_paths)
+    finally:
+        for fd in dir_fds.values():
+            os.close(fd)
+
+
+def _remove_empty_dirs(path):
+    """Entfernt leere Unterordner von path von unten nach oben, path selbst bleibt bestehen.
+    
+    Ein scandir pro Ordner (kein listdir/exists); wo möglich rmdir relativ zum geöffneten Ordner.
+    Dateien werden nie gelöscht.
+    
+    Returns:
+        bool: True, wenn path danach leer ist
+    """
+    empty = True
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry)
+            else:
+                empty = False
+    if not subdirs:
+        return empty
+    dir_fd = None
+    if os.rmdir in os.supports_dir_fd:
+        try:
+            dir_fd = os.open(path, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+        except OSError:
+            dir_fd = None
+    try:
+        for entry in subdirs:
+            if not _remove_empty_dirs(entry.path):
+                empty = False
+                continue
+            try:
+                if dir_fd is None:
+                    os.rmdir(entry.path)
+                else:
+                    os.rmdir(entry.name, dir_fd=dir_fd)
+                logger.info(f"Leerer Ordner entfernt: {entry.path}")
+            except OSError as e:
+                logger.warning(f"Konnte leeren Ordner {entry.path} nicht entfernen: {str(e)}")
+                empty = False
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    return empty
+
+
+@lru_cache(maxsize=None)
+def _case_variants(suffix):
+    """Alle Schreibweisen einer Endung als Tupel für str.endswith - kein lower() pro Datei"""
+    variants = ['']
+    for char in suffix:
+        variants = [variant + c for variant in variants for c in {char.lower(), char.upper()}]
+    return tuple(variants)
+
+
+def _iter_files(path, suffix=None):
+    """Liefert rekursiv alle Dateipfade unterhalb von path (scandir, kein stat pro Eintrag)
+    
+    Args:
+        suffix (str): Optional nur Dateien mit dieser Endung (Groß-/Kleinschreibung egal)
+    """
+    suffixes = _case_variants(suffix) if suffix is not None else None
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path, suffix)
+            elif suffixes is None or entry.name.endswith(suffixes):
+                yield entry.path
+
+
+# Import und Empfang benennen Plan-Dateien nach Modalität (CT.<UID>.dcm, RTSTRUCT_<Name>.dcm, ...).
+# RTPLAN fehlt bewusst: vor dem Senden wird dessen SOP Class UID geprüft, der Header wird also ohnehin gelesen
+NAMED_MODALITIES = frozenset(("CT", "RTSTRUCT", "RTDOSE"))
+
+
+def _modality_from_name(file_name):
+    """Modalität aus dem Dateinamen (nur NAMED_MODALITIES), sonst None"""
+    modality = 'CT' if file_name.startswith('CT.') else file_name.split('_', 1)[0]
+    return modality if modality in NAMED_MODALITIES else None
+
+
+def _ensure_dir(path):
+    """Legt einen Ordner an - im Normalfall (Ordner oder Elternordner existiert) mit einem Systemaufruf.
+    
+    Bewusst ohne Cache: Plan-Ordner werden nach dem Senden gelöscht und müssen dann neu entstehen.
+    """
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        os.makedirs(path, exist_ok=True)
+
+
+def _read_element_header(f, explicit_vr, endian):
+    """Liest Tag und Länge des nächsten Elements, Item-Tags haben nie eine VR"""
+    header = f.read(8)
+    if len(header) < 8:
+        raise EOFError
+    group, element = struct.unpack(endian + 'HH', header[:4])
+    tag = (group << 16) | element
+    if not explicit_vr or group == 0xFFFE:
+        return tag, struct.unpack(endian + 'L', header[4:8])[0]
+    if header[4:6] in LONG_LENGTH_VRS:
+        return tag, struct.unpack(endian + 'L', f.read(4))[0]
+    return tag, struct.unpack(endian + 'H', header[6:8])[0]
+
+
+def _skip_until(f, delimiter, explicit_vr, endian):
+    """Überspringt Elemente bis zum Delimiter einer Sequenz bzw. eines Items undefinierter Länge"""
+    while True:
+        tag, length = _read_element_header(f, explicit_vr, endian)
+        if tag == delimiter:
+            return
+        if length == UNDEFINED_LENGTH:
+            _skip_until(f, ITEM_DELIMITATION_TAG if tag == ITEM_TAG else SEQUENCE_DELIMITATION_TAG, explicit_vr, endian)
+        else:
+            f.seek(length, 1)
+
+
+def _decode_value(raw):
+    # Nicht-ASCII (Zeichensätze) bleibt pydicom überlassen
+    return raw.decode('ascii').strip(' \x00')
+
+
+def _peek_received_header(file_path):
+    """Liest die Gruppierungs-Tags direkt aus dem Elementstrom einer empfangenen Datei
+    
+    Überspringt alle anderen Werte und endet nach der ReferencedRTPlanSequence.
+    Gibt None zurück, wenn die Datei nicht so gelesen werden kann (dann dcmread).
+    """
+    values = {}
+    try:
+        with open(file_path, 'rb') as f:
+            preamble = f.read(132)
+            if len(preamble) < 132 or preamble[128:] != b'DICM':
+                return None
+
+            # File Meta (immer Explicit VR Little Endian): Transfer Syntax und Quell-AE
+            while True:
+                position = f.tell()
+                tag, length = _read_element_header(f, True, '<')
+                if tag >> 16 != 0x0002:
+                    f.seek(position)
+                    break
+                if length == UNDEFINED_LENGTH:
+                    return None
+                if tag in (TRANSFER_SYNTAX_TAG, SOURCE_AE_TAG):
+                    values[tag] = _decode_value(f.read(length))
+                else:
+                    f.seek(length, 1)
+
+            transfer_syntax = values.get(TRANSFER_SYNTAX_TAG)
+            if transfer_syntax is None or transfer_syntax == DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN_UID:
+                return None
+            explicit_vr = transfer_syntax != IMPLICIT_VR_LITTLE_ENDIAN_UID
+            endian = '>' if transfer_syntax == EXPLICIT_VR_BIG_ENDIAN_UID else '<'
+
+            # Dataset bis einschließlich ReferencedRTPlanSequence
+            while True:
+                try:
+                    tag, length = _read_element_header(f, explicit_vr, endian)
+                except EOFError:
+                    break
+                if tag > REFERENCED_RT_PLAN_SEQUENCE_TAG:
+                    break
+                if tag == REFERENCED_RT_PLAN_SEQUENCE_TAG:
+                    # Nur das erste Item bis zur ReferencedSOPInstanceUID lesen
+                    item_tag, _ = _read_element_header(f, explicit_vr, endian)
+                    while item_tag == ITEM_TAG:
+                        tag, length = _read_element_header(f, explicit_vr, endian)
+                        if tag > REFERENCED_SOP_INSTANCE_UID_TAG:
+                            break
+                        if length == UNDEFINED_LENGTH:
+                            _skip_until(f, SEQUENCE_DELIMITATION_TAG, explicit_vr, endian)
+                        elif tag == REFERENCED_SOP_INSTANCE_UID_TAG:
+                            values[tag] = _decode_value(f.read(length))
+                            break
+                        else:
+                            f.seek(length, 1)
+                    break
+                if length == UNDEFINED_LENGTH:
+                    _skip_until(f, SEQUENCE_DELIMITATION_TAG, explicit_vr, endian)
+                elif tag in RECEIVED_HEADER_TAGS:
+                    values[tag] = _decode_value(f.read(length))
+                else:
+                    f.seek(length, 1)
+    except (EOFError, struct.error, UnicodeDecodeError):
+        return None
+
+    header = {key: values.get(tag, default) for tag, (key, default) in RECEIVED_HEADER_TAGS.items()}
+    header['ref_plan_uid'] = values.get(REFERENCED_SOP_INSTANCE_UID_TAG) or None
+    header['source_ae'] = values.get(SOURCE_AE_TAG) or "UNKNOWN"
+    return header
+
+
+def _parse_received_header(file_path):
+    """Liest die für die Gruppierung benötigten Header-Werte einer empfangenen Datei
+    
+    Gibt nur Strings zurück, kein Dataset.
+    
+    Returns:
+        tuple: (file_path, header_dict, None) oder (file_path, None, Fehlermeldung)
+    """
+    try:
+        header = _peek_received_header(file_path)
+        if header is not None:
+            return file_path, header, None
+        ds = _dcmread(file_path, stop_before_pixels=True)
+        try:
+            ref_plan_uid = _referenced_plan_uid(ds)
+            if ref_plan_uid is not None:
+                ref_plan_uid = str(ref_plan_uid)
+        except Exception:
+            ref_plan_uid = None
+        # AE-Titel der Quelle, ggf. aus den Metadaten
+        source_ae = _tag_value(ds, SOURCE_AE_TAG, "UNKNOWN")
+        if not source_ae or source_ae == "UNKNOWN":
+            file_meta = getattr(ds, "file_meta", None)
+            if file_meta is not None and SOURCE_AE_TAG in file_meta:
+                source_ae = file_meta[SOURCE_AE_TAG].value
+        header = {key: str(_tag_value(ds, tag, default)) for tag, (key, default) in RECEIVED_HEADER_TAGS.items()}
+        header['ref_plan_uid'] = ref_plan_uid
+        header['source_ae'] = str(source_ae)
+        return file_path, header, None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+def _is_dicom(file_path):
+    """Schnelltest vor dem Parsen: 'DICM' nach der Preamble oder ein roher Datensatz ohne Preamble
+    
+    Rohe Datensätze (wie sie dcmread mit force=True liest) beginnen mit Gruppe 0x0002 oder 0x0008.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(132)
+    if head[128:132] == b'DICM':
+        return True
+    return len(head) >= 8 and head[:2] in (b'\x02\x00', b'\x08\x00')
+
+
+def _dcmread(file_path, **kwargs):
+    """dcmread zuerst ohne force - Dateien mit Preamble brauchen keine Heuristik.
+    
+    Nur wenn die Preamble fehlt (InvalidDicomError), wird mit force=True erneut gelesen.
+    """
+    try:
+        return pydicom.dcmread(file_path, **kwargs)
+    except InvalidDicomError:
+        return pydicom.dcmread(file_path, force=True, **kwargs)
+
+
+def _read_dicom_header(file_path, specific_tags=None):
+    """Liest den Header einer DICOM-Datei ohne Pixel-Daten
+    
+    Returns:
+        tuple: (file_path, Dataset, None), (file_path, None, Exception)
+               oder (file_path, None, None) für Dateien, die kein DICOM sind
+    """
+    try:
+        if not _is_dicom(file_path):
+            return file_path, None, None
+        return file_path, _dcmread(file_path, stop_before_pixels=True,
+                                   specific_tags=specific_tags), None
+    except Exception as e:
+        return file_path, None, e
+
+
+def _tag_value(ds, tag, default):
+    """Wert eines Elements per Tag-Nummer - umgeht die Keyword-Auflösung von getattr(ds, "Keyword")"""
+    elem = ds.get(tag)
+    return default if elem is None else elem.value
+
+
+def _referenced_plan_uid(ds):
+    """Gibt ReferencedRTPlanSequence[0].ReferencedSOPInstanceUID zurück (None, wenn nicht vorhanden)"""
+    sequence = _tag_value(ds, REFERENCED_RT_PLAN_SEQUENCE_TAG, None)
+    if sequence:
+        return _tag_value(sequence[0], REFERENCED_SOP_INSTANCE_UID_TAG, None)
+    return None
+
+
+def _read_dicom_headers(file_paths, specific_tags=None):
+    """Liest die Header mehrerer Dateien parallel, Ergebnisse in der Reihenfolge von file_paths
+    
+    file_paths darf ein Generator sein: das Lesen beginnt, während der Ordner noch durchlaufen
+    wird, und es sind nie mehr als HEADER_READ_WINDOW Aufträge gleichzeitig offen.
+    """
+    with ThreadPoolExecutor(max_workers=HEADER_READ_WORKERS) as executor:
+        pending = deque()
+        for file_path in file_paths:
+            pending.append(executor.submit(_read_dicom_header, file_path, specific_tags))
+            if len(pending) >= HEADER_READ_WINDOW:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
 
 class DicomProcessor:
     """Hauptklasse für die Verarbeitung von DICOM-Dateien"""
@@ -62,6 +624,9 @@ class DicomProcessor:
         self.failed_folder = os.path.join(self.watch_folder, "failed")
         os.makedirs(self.failed_folder, exist_ok=True)
         
+        # 1-ms-Timer-Auflösung unter Windows, solange der Empfänger läuft
+        self._timer_resolution_active = False
+        
         # Watchdog-Komponenten
         self.observer = None
         self.event_handler = None
@@ -75,6 +640,39 @@ class DicomProcessor:
         self.pending_files = {}
         self.timer_lock = threading.Lock()
         
+        # Empfangspuffer je (PatientID, StudyInstanceUID); ein einzelner Thread leert
+        # jeden Puffer nach receive_flush_timeout Sekunden ohne neue Datei
+        self._receive_buffer_lock = threading.Lock()
+        self._receive_buffer = {}
+        self._receive_time = {}
+        self._receive_event = threading.Event()
+        self._receive_temp_dir_base = tempfile.mkdtemp(prefix="dicom_receive_")
+        self.receive_flush_timeout = 2.0
+        self._receive_flush_thread = threading.Thread(target=self._receive_flush_loop, daemon=True)
+        self._receive_flush_thread.start()
+        
+        # Empfangene Datasets schreibt ein eigener Thread, damit der Assoziations-Thread
+        # die C-STORE-Antwort sofort senden kann
+        self._store_queue = queue.Queue(maxsize=STORE_QUEUE_SIZE)
+        # Laufende Nummer für Temp-Dateinamen (der Temp-Ordner ist pro Prozess neu)
+        self._receive_seq = itertools.count()
+        self._store_thread = threading.Thread(target=self._store_worker, daemon=True)
+        self._store_thread.start()
+        
+        # Weiterleitungsregeln einmal laden; vor jeder Prüfung nur neu, wenn rules.ini geändert wurde
+        self.rules_manager = RulesManager()
+        
+        # Weiterleitungen nach dem Import laufen im Hintergrund, der Import ist davon unabhängig
+        self._forward_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="forward")
+        # Plan-Ordner mit laufender Weiterleitung (normierter Pfad -> Anzahl) - nicht löschen
+        self._forwards_in_flight = Counter()
+        self._forwards_lock = threading.Lock()
+        
+        # Sende-AE mit allen Presentation Contexts, beim ersten Senden einmal aufgebaut
+        self._send_ae = None
+        self._send_ae_title = None
+        self._send_ae_lock = threading.Lock()
+        
         # DICOM-Modalitätsreihenfolge für geordnetes Senden
         self.modality_order = {
             "CT": 1, 
@@ -117,6 +715,9 @@ class DicomProcessor:
                 evt_handlers=handlers
             )
             
+            if not self._timer_resolution_active:
+                self._timer_resolution_active = _set_windows_timer_resolution(True)
+            
             logger.info(f"DICOM-Empfänger gestartet auf Port {port}")
             return True
             
@@ -129,12 +730,14 @@ class DicomProcessor:
         if self.server:
             self.server.shutdown()
             self.server = None
+            if self._timer_resolution_active:
+                _set_windows_timer_resolution(False)
+                self._timer_resolution_active = False
             logger.info("DICOM-Empfänger gestoppt")
     
     def handle_store(self, event):
         """Handler für eingehende DICOM-Daten mit gepuffertem Empfang und Plan-Gruppierung."""
         try:
-            import threading, tempfile, uuid, time, os, pydicom
             ds = event.dataset
             ds.file_meta = event.file_meta
             
@@ -160,229 +763,257 @@ class DicomProcessor:
             modality = getattr(ds, "Modality", "unknown")
             buffer_key = (str(patient_id), str(study_uid))
 
-            # Setup buffer and locks
-            if not hasattr(self, '_receive_buffer_lock'):
-                self._receive_buffer_lock = threading.Lock()
-            if not hasattr(self, '_receive_buffer'):
-                self._receive_buffer = {}
-            if not hasattr(self, '_receive_time'):
-                self._receive_time = {}
-            if not hasattr(self, '_receive_temp_dir_base'):
-                self._receive_temp_dir_base = tempfile.mkdtemp(prefix="dicom_receive_")
-
-            buffer_lock = self._receive_buffer_lock
-            receive_buffer = self._receive_buffer
-            receive_time = self._receive_time
-            temp_dir_base = self._receive_temp_dir_base
-
-            # Save incoming file to temp dir
-            with buffer_lock:
-                key_dir = os.path.join(temp_dir_base, f"{patient_id}_{study_uid}")
-                os.makedirs(key_dir, exist_ok=True)
-                unique_name = f"{modality}_{uuid.uuid4().hex}.dcm"
-                temp_file_path = os.path.join(key_dir, unique_name)
-                
-                # Ensure SOPInstanceUID is present and properly set in file_meta
-                if not hasattr(ds, 'SOPInstanceUID') or not ds.SOPInstanceUID:
-                    if hasattr(ds.file_meta, 'MediaStorageSOPInstanceUID'):
-                        ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
-                    else:
-                        # Generate a new UID if none exists
-                        from pydicom.uid import generate_uid
-                        new_uid = generate_uid()
-                        ds.SOPInstanceUID = new_uid
-                        if hasattr(ds, 'file_meta'):
-                            ds.file_meta.MediaStorageSOPInstanceUID = new_uid
-                
-                # Ensure file_meta is complete
-                if not hasattr(ds, 'file_meta') or not ds.file_meta:
-                    ds.file_meta = pydicom.dataset.FileMetaDataset()
-                
-                # Ensure MediaStorageSOPInstanceUID matches SOPInstanceUID
-                if hasattr(ds, 'SOPInstanceUID') and ds.SOPInstanceUID:
-                    ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
-                
-                # Special handling for RTDOSE files to preserve pixel data
-                if modality == "RTDOSE":
-                    # For RTDOSE, write the raw bytes directly to preserve all data
-                    with open(temp_file_path, 'wb') as f:
-                        f.write(event.request.DataSet.getvalue())
-                    logger.info(f"RTDOSE received and saved directly: {temp_file_path} ({os.path.getsize(temp_file_path)} bytes)")
+            # Schreiben und Puffern übernimmt der Store-Thread
+            self._store_queue.put((buffer_key, modality, ds, event.request.DataSet))
+            return 0x0000  # Success
+        except Exception as e:
+            logger.error(f"Fehler beim Verarbeiten einer eingehenden DICOM-Datei: {str(e)}")
+            return 0xC001  # Failure
+
+    def _store_worker(self):
+        """Schreibt empfangene Datasets aus der Store-Queue in Chargen in den Temp-Ordner.
+        
+        Pro Charge wird jeder Puffer-Ordner einmal angelegt und die Puffersperre nur einmal genommen.
+        """
+        while True:
+            batch = [self._store_queue.get()]
+            while len(batch) < STORE_BATCH_SIZE:
+                try:
+                    batch.append(self._store_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            by_key = defaultdict(list)
+            for item in batch:
+                by_key[item[0]].append(item)
+            
+            stored = []
+            for buffer_key, items in by_key.items():
+                patient_id, study_uid = buffer_key
+                key_dir = os.path.join(self._receive_temp_dir_base, f"{patient_id}_{study_uid}")
+                # C-STORE wurde bereits mit Erfolg quittiert - was nicht gespeichert werden kann,
+                # landet unverändert in failed statt verloren zu gehen
+                try:
+                    _ensure_dir(key_dir)
+                except OSError as e:
+                    logger.error(f"Temp-Ordner {key_dir} konnte nicht angelegt werden: {str(e)}")
+                    for _, modality, ds, raw_stream in items:
+                        self._dump_received_to_failed(modality, ds, raw_stream, f"Temp-Ordner nicht anlegbar: {str(e)}")
+                    continue
+                for _, modality, ds, raw_stream in items:
+                    try:
+                        temp_file_path = self._persist_received(key_dir, modality, ds, raw_stream)
+                        if temp_file_path is not None:
+                            stored.append((buffer_key, temp_file_path))
+                    except Exception as e:
+                        logger.error(f"Fehler beim Speichern einer empfangenen DICOM-Datei ({modality}): {str(e)}")
+                        self._dump_received_to_failed(modality, ds, raw_stream, f"Speicherfehler: {str(e)}")
+            
+            # Nur das Eintragen in den Puffer braucht die Sperre, nicht das Schreiben
+            new_key = False
+            with self._receive_buffer_lock:
+                now = time.monotonic()
+                for buffer_key, temp_file_path in stored:
+                    if buffer_key not in self._receive_buffer:
+                        self._receive_buffer[buffer_key] = []
+                        new_key = True
+                    self._receive_buffer[buffer_key].append(temp_file_path)
+                    self._receive_time[buffer_key] = now
+            
+            # Nur ein neuer Puffer kann früher fällig werden - den Flush-Thread wecken
+            if new_key:
+                self._receive_event.set()
+
+    def _dump_received_to_failed(self, modality, ds, raw_stream, error_msg):
+        """Schreibt ein empfangenes Dataset, das nicht gespeichert werden konnte, direkt nach failed"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        dest_file = os.path.join(self.failed_folder, f"{timestamp}_{modality}_{next(self._receive_seq):08x}.dcm")
+        try:
+            _ensure_dir(self.failed_folder)
+            self._write_received_file(dest_file, ds.file_meta, raw_stream, enforce_standard=False)
+            with open(f"{dest_file}.error", 'w') as f:
+                f.write(f"{error_msg}\n")
+                f.write(f"Zeitpunkt: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            logger.info(f"Empfangenes Dataset nach failed geschrieben: {dest_file}")
+        except Exception as e:
+            logger.error(f"Empfangenes Dataset ({modality}) konnte auch nicht nach failed geschrieben werden: {str(e)}")
+
+    def _persist_received(self, key_dir, modality, ds, raw_stream):
+        """Speichert ein empfangenes Dataset im Temp-Ordner
+        
+        Returns:
+            str: Pfad der Temp-Datei, oder None wenn das Dataset nach failed verschoben wurde
+        """
+        unique_name = f"{modality}_{next(self._receive_seq):08x}.dcm"
+        temp_file_path = os.path.join(key_dir, unique_name)
+        
+        # Ensure SOPInstanceUID is present and properly set in file_meta
+        sop_uid_in_dataset = bool(getattr(ds, 'SOPInstanceUID', None))
+        if not sop_uid_in_dataset:
+            media_sop_uid = getattr(ds.file_meta, 'MediaStorageSOPInstanceUID', None)
+            if not media_sop_uid:
+                # Ohne jede Instanz-UID ist das Dataset fehlerhaft - unverändert nach failed
+                self._write_received_file(temp_file_path, ds.file_meta, raw_stream, enforce_standard=False)
+                self.move_to_failed(temp_file_path, "Empfangenes Dataset ohne SOPInstanceUID und MediaStorageSOPInstanceUID")
+                return None
+            ds.SOPInstanceUID = media_sop_uid
+        
+        # Ensure file_meta is complete
+        if not hasattr(ds, 'file_meta') or not ds.file_meta:
+            ds.file_meta = pydicom.dataset.FileMetaDataset()
+        
+        # Ensure MediaStorageSOPInstanceUID matches SOPInstanceUID
+        if hasattr(ds, 'SOPInstanceUID') and ds.SOPInstanceUID:
+            ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
+        
+        if sop_uid_in_dataset:
+            # Empfangene Bytes unverändert hinter Preamble und File Meta schreiben (kein Neukodieren)
+            self._write_received_file(temp_file_path, ds.file_meta, raw_stream)
+            if modality == "RTDOSE":
+                logger.info(f"RTDOSE received and saved directly: {temp_file_path} ({os.path.getsize(temp_file_path)} bytes)")
+        else:
+            # SOPInstanceUID wurde ergänzt - nur dann das Dataset neu kodieren
+            pydicom.dcmwrite(temp_file_path, ds, write_like_original=False)
+        return temp_file_path
+
+    def _write_received_file(self, file_path, file_meta, raw_stream, enforce_standard=True):
+        """Schreibt ein empfangenes, kodiertes Dataset unverändert hinter Preamble und File Meta.
+        
+        Große Datasets (z.B. RTDOSE-Gitter) werden in 1 MiB-Blöcken aus dem Empfangspuffer
+        kopiert, damit keine zweite Kopie des gesamten Inhalts im Speicher entsteht.
+        """
+        with open(file_path, 'wb', buffering=STREAM_WRITE_BLOCK) as f:
+            f.write(b'\x00' * 128)
+            f.write(b'DICM')
+            write_file_meta_info(f, file_meta, enforce_standard=enforce_standard)
+            raw_stream.seek(0, os.SEEK_END)
+            size = raw_stream.tell()
+            raw_stream.seek(0)
+            if size < STREAM_WRITE_BLOCK:
+                f.write(raw_stream.read())
+            else:
+                shutil.copyfileobj(raw_stream, f, STREAM_WRITE_BLOCK)
+
+    def _link_or_copy(self, src_path, dest_path):
+        """Hardlink auf dem gleichen Laufwerk, sonst Reflink oder Kopie (Quelle bleibt erhalten).
+        
+        Ein vorhandenes Ziel wird ersetzt. Es wird erst beim Konflikt entfernt - nie hineinkopieren,
+        denn es kann selbst ein Hardlink auf die Quelle aus einem früheren Import sein.
+        """
+        try:
+            os.link(src_path, dest_path)
+        except FileExistsError:
+            os.remove(dest_path)
+            self._link_or_copy(src_path, dest_path)
+        except OSError:
+            if not _reflink(src_path, dest_path):
+                _kernel_copy(src_path, dest_path)
+
+    def _move_dose_file(self, src_path, dest_path):
+        """Verschiebt eine RTDOSE-Datei byte-identisch, ohne sie durch Python-Puffer zu schleusen.
+        
+        Auf dem gleichen Laufwerk genügt ein Umbenennen. Über Laufwerksgrenzen kopiert der Kernel
+        (siehe _kernel_copy); danach wird die Quelle gelöscht.
+        """
+        try:
+            os.replace(src_path, dest_path)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        _kernel_copy(src_path, dest_path)
+        os.remove(src_path)
+
+    def _receive_flush_loop(self):
+        """Leert Empfangspuffer, die seit receive_flush_timeout Sekunden keine neue Datei erhalten haben."""
+        while True:
+            due_lists = []
+            with self._receive_buffer_lock:
+                now = time.monotonic()
+                for buffer_key, last_time in list(self._receive_time.items()):
+                    if now - last_time >= self.receive_flush_timeout:
+                        due_lists.append(self._receive_buffer.pop(buffer_key, []))
+                        del self._receive_time[buffer_key]
+                # Bis zum nächsten fälligen Puffer schlafen (oder bis ein neuer Puffer angelegt wird)
+                if self._receive_time:
+                    wait_time = min(self._receive_time.values()) + self.receive_flush_timeout - now
                 else:
-                    # For other modalities, use pydicom with write_like_original=False
-                    pydicom.dcmwrite(temp_file_path, ds, write_like_original=False)
-                
-                if buffer_key not in receive_buffer:
-                    receive_buffer[buffer_key] = []
-                receive_buffer[buffer_key].append(temp_file_path)
-                receive_time[buffer_key] = time.time()
-
-            # Start/refresh inactivity timer thread for this buffer key
-            def flush_buffer_after_timeout(buffer_key, timeout=2.0):
-                time.sleep(timeout)
-                with buffer_lock:
-                    now = time.time()
-                    last_time = receive_time.get(buffer_key, 0)
-                    if now - last_time < timeout - 0.1:
-                        return
-                    file_list = receive_buffer.pop(buffer_key, [])
-                    receive_time.pop(buffer_key, None)
+                    wait_time = None
+                self._receive_event.clear()
+
+            for file_list in due_lists:
                 if not file_list:
-                    return
+                    continue
                 try:
                     self._group_and_move_received_files(file_list)
                 except Exception as e:
                     logger.error(f"Fehler beim Gruppieren und Verschieben empfangener DICOM-Dateien: {str(e)}")
 
-            flush_thread_name = f"flush_buffer_{patient_id}_{study_uid}"
-            if hasattr(self, f'_{flush_thread_name}_thread'):
-                old_thread = getattr(self, f'_{flush_thread_name}_thread')
-                if old_thread.is_alive():
-                    pass
-            flush_thread = threading.Thread(target=flush_buffer_after_timeout, args=(buffer_key,), daemon=True)
-            setattr(self, f'_{flush_thread_name}_thread', flush_thread)
-            flush_thread.start()
-
-            return 0x0000  # Success
-        except Exception as e:
-            logger.error(f"Fehler beim Verarbeiten einer eingehenden DICOM-Datei: {str(e)}")
-            return 0xC001  # Failure
+            if not due_lists:
+                self._receive_event.wait(wait_time)
 
     def _group_and_move_received_files(self, file_list):
         """Group and move received DICOM files into unified plan folder, mimicking import logic."""
-        import shutil
-        import pydicom
-        file_data = {}
-        plan_files = []
-        ct_files = []
-        structure_files = []
-        other_files = []
-        for file_path in file_list:
-            try:
-                ds = pydicom.dcmread(file_path, force=True, stop_before_pixels=True)
-                modality = getattr(ds, "Modality", "UNKNOWN")
-                file_data[file_path] = {
-                    'ds': ds,
-                    'modality': modality,
-                    'patient_id': getattr(ds, "PatientID", "unknown"),
-                    'patient_name': getattr(ds, "PatientName", "unknown"),
-                    'sop_instance_uid': getattr(ds, "SOPInstanceUID", "unknown")
-                }
-                if modality == "RTPLAN":
-                    plan_files.append(file_path)
-                elif modality == "CT":
-                    ct_files.append(file_path)
-                elif modality == "RTSTRUCT":
-                    structure_files.append(file_path)
-                else:
-                    other_files.append(file_path)
-            except Exception as e:
-                logger.error(f"Fehler beim Lesen von DICOM-Datei {file_path}: {str(e)}")
-                continue
         # --- Grouping logic as in process_import_folder ---
-        plan_ref_map = {}
-        frame_ref_map = {}
-        for plan_file in plan_files:
-            plan_ds = file_data[plan_file]['ds']
-            plan_sop_uid = getattr(plan_ds, "SOPInstanceUID", "unknown")
-            plan_ref_map[plan_sop_uid] = []
-            for dose_file in other_files:
-                dose_ds = file_data[dose_file]['ds']
-                try:
-                    dose_ref_uid = None
-                    if hasattr(dose_ds, "ReferencedRTPlanSequence") and dose_ds.ReferencedRTPlanSequence and hasattr(dose_ds.ReferencedRTPlanSequence[0], "ReferencedSOPInstanceUID"):
-                        dose_ref_uid = dose_ds.ReferencedRTPlanSequence[0].ReferencedSOPInstanceUID
-                except Exception as e:
-                    dose_ref_uid = None
-                if dose_ref_uid == plan_sop_uid:
-                    plan_ref_map[plan_sop_uid].append(dose_file)
-            frame_ref_uid = getattr(plan_ds, "FrameOfReferenceUID", "unknown")
-            frame_ref_map[frame_ref_uid] = []
-            for ct_file in ct_files:
-                ct_ds = file_data[ct_file]['ds']
-                ct_frame_ref_uid = getattr(ct_ds, "FrameOfReferenceUID", "unknown")
-                if ct_frame_ref_uid == frame_ref_uid:
-                    frame_ref_map[frame_ref_uid].append(ct_file)
-            for struct_file in structure_files:
-                struct_ds = file_data[struct_file]['ds']
-                struct_frame_ref_uid = getattr(struct_ds, "FrameOfReferenceUID", "unknown")
-                if struct_frame_ref_uid == frame_ref_uid:
-                    frame_ref_map[frame_ref_uid].append(struct_file)
+        # Indizes direkt beim Header-Lesen aufbauen, danach keine Lookups pro Datei mehr
+        # (die Header-Peeks sind billig genug für den Flush-Thread, kein Prozess-Pool)
+        plan_entries = []                    # (Pfad, Header) der Pläne
+        dose_by_plan = defaultdict(list)     # ReferencedSOPInstanceUID -> Pfade
+        ct_by_frame = defaultdict(list)      # FrameOfReferenceUID -> (Pfad, SOPInstanceUID)
+        struct_by_frame = defaultdict(list)  # FrameOfReferenceUID -> Pfade
+        for file_path, header, error in map(_parse_received_header, file_list):
+            if error is not None:
+                logger.error(f"Fehler beim Lesen von DICOM-Datei {file_path}: {error}")
+                continue
+            modality = header['modality']
+            if modality == "RTPLAN":
+                plan_entries.append((file_path, header))
+            elif modality == "CT":
+                ct_by_frame[header['frame_ref_uid']].append((file_path, header['sop_instance_uid']))
+            elif modality == "RTSTRUCT":
+                struct_by_frame[header['frame_ref_uid']].append(file_path)
+            elif header['ref_plan_uid'] is not None:
+                dose_by_plan[header['ref_plan_uid']].append(file_path)
         # --- Move grouped files to unified plan folder ---
-        for plan_file_path in plan_files:
+        grouped_plans = []
+        moved_files = set()  # bereits aus dem Temp-Ordner verschobene Dateien
+        for plan_file_path, plan_data in plan_entries:
             try:
-                plan_ds = file_data[plan_file_path]['ds']
-                patient_id = getattr(plan_ds, "PatientID", "unknown")
-                patient_name = getattr(plan_ds, "PatientName", "unknown")
-                plan_name = getattr(plan_ds, "RTPlanLabel", "unknown")
-                study_id = getattr(plan_ds, "StudyInstanceUID", "unknown").split('.')[-1]
+                patient_id = plan_data['patient_id']
+                patient_name = plan_data['patient_name']
+                plan_name = plan_data['plan_label']
+                study_id = plan_data['study_uid'].rsplit('.', 1)[-1]
                 safe_patient_name = self.sanitize_path_component(patient_name)
                 safe_patient_id = self.sanitize_path_component(patient_id)
                 safe_plan_name = self.sanitize_path_component(plan_name)
                 safe_study_id = self.sanitize_path_component(study_id)
                 patient_folder = os.path.join(self.watch_folder, f"{safe_patient_name} ({safe_patient_id})")
                 plan_folder = os.path.join(patient_folder, f"{safe_plan_name}_{safe_study_id}")
-                os.makedirs(plan_folder, exist_ok=True)
+                _ensure_dir(plan_folder)
+                grouped_plans.append(PlanInfo(plan_file_path, plan_name, plan_data['source_ae'], plan_folder))
                 # Plan-Datei
                 plan_filename = f"RTPLAN_{safe_plan_name}.dcm"
                 dest_path = os.path.join(plan_folder, plan_filename)
-                if os.path.exists(dest_path):
-                    os.remove(dest_path)
                 
-                # Speichere den AE-Titel der Quelle für spätere Weiterleitungsregeln
-                source_ae = getattr(plan_ds, "SourceApplicationEntityTitle", "UNKNOWN")
-                if not source_ae or source_ae == "UNKNOWN":
-                    # Versuche, den AE-Titel aus den Metadaten zu holen
-                    if hasattr(plan_ds, "file_meta") and hasattr(plan_ds.file_meta, "SourceApplicationEntityTitle"):
-                        source_ae = plan_ds.file_meta.SourceApplicationEntityTitle
-                    
-                # Ensure SOPInstanceUID is preserved when moving the file
-                # Instead of moving, read the file, ensure UIDs, and write to destination
+                # SOPInstanceUID wurde bereits in handle_store geprüft - Datei nur umbenennen
+                # (os.replace überschreibt ein vorhandenes Ziel, keine Existenzprüfung nötig)
                 try:
-                    # Read with force=True but don't skip pixels to preserve RTPLAN data
-                    ds = pydicom.dcmread(plan_file_path, force=True, stop_before_pixels=False)
-                    
-                    # Ensure SOPInstanceUID is present
-                    if not hasattr(ds, 'SOPInstanceUID') or not ds.SOPInstanceUID:
-                        if hasattr(ds.file_meta, 'MediaStorageSOPInstanceUID'):
-                            ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
-                        else:
-                            # Generate a new UID if none exists
-                            from pydicom.uid import generate_uid
-                            new_uid = generate_uid()
-                            ds.SOPInstanceUID = new_uid
-                            if hasattr(ds, 'file_meta'):
-                                ds.file_meta.MediaStorageSOPInstanceUID = new_uid
-                    
-                    # Ensure file_meta is complete
-                    if not hasattr(ds, 'file_meta') or not ds.file_meta:
-                        ds.file_meta = pydicom.dataset.FileMetaDataset()
-                    
-                    # Ensure MediaStorageSOPInstanceUID matches SOPInstanceUID
-                    if hasattr(ds, 'SOPInstanceUID') and ds.SOPInstanceUID:
-                        ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
-                    
-                    # Write with explicit file_meta and preserve original pixel data
-                    pydicom.dcmwrite(dest_path, ds, write_like_original=False)
-                    os.remove(plan_file_path)  # Remove the original file after successful write
-                except Exception as e:
-                    logger.error(f"Error ensuring SOPInstanceUID in {plan_file_path}: {str(e)}")
-                    # Fall back to simple move if the above fails
+                    os.replace(plan_file_path, dest_path)
+                except OSError:
+                    # Temp-Ordner liegt auf einem anderen Laufwerk
                     shutil.move(plan_file_path, dest_path)
+                moved_files.add(plan_file_path)
                 # Dosis-Dateien
-                plan_sop_uid = getattr(plan_ds, "SOPInstanceUID", "unknown")
-                if plan_sop_uid in plan_ref_map:
-                    for dose_file_path in plan_ref_map[plan_sop_uid]:
-                        dose_ds = file_data[dose_file_path]['ds']
+                plan_sop_uid = plan_data['sop_instance_uid']
+                if plan_sop_uid in dose_by_plan:
+                    for dose_file_path in dose_by_plan[plan_sop_uid]:
                         dose_filename = f"RTDOSE_{safe_plan_name}.dcm"
                         dose_dest_path = os.path.join(plan_folder, dose_filename)
-                        if os.path.exists(dose_dest_path):
-                            os.remove(dose_dest_path)
                             
                         # For RTDOSE files, use direct file copy to preserve all data exactly as received
                         try:
                             # First, read just the header to check/fix SOPInstanceUID
-                            ds = pydicom.dcmread(dose_file_path, force=True, stop_before_pixels=True)
+                            ds = _dcmread(dose_file_path, stop_before_pixels=True)
                             
                             # Check if SOPInstanceUID is present
                             sop_uid_fixed = False
@@ -400,169 +1031,64 @@ class DicomProcessor:
                             if sop_uid_fixed:
                                 logger.warning(f"RTDOSE file {dose_file_path} has UID issues, but using direct copy to preserve pixel data")
                             
-                            # Use direct file copy to preserve all data exactly as received
-                            shutil.copy2(dose_file_path, dose_dest_path)
+                            # Datei unverändert verschieben, um alle Daten exakt wie empfangen zu erhalten
+                            self._move_dose_file(dose_file_path, dose_dest_path)
+                            moved_files.add(dose_file_path)
                             
-                            # Log file sizes to help diagnose issues
-                            src_size = os.path.getsize(dose_file_path)
+                            # Log file size to help diagnose issues
                             dest_size = os.path.getsize(dose_dest_path)
-                            logger.info(f"RTDOSE copied: {dose_file_path} ({src_size} bytes) -> {dose_dest_path} ({dest_size} bytes)")
-                            
-                            # Remove original file after successful copy
-                            os.remove(dose_file_path)
+                            logger.info(f"RTDOSE moved: {dose_file_path} -> {dose_dest_path} ({dest_size} bytes)")
                         except Exception as e:
-                            logger.error(f"Error copying RTDOSE file {dose_file_path}: {str(e)}")
-                            # Fall back to simple copy if the above fails
-                            try:
-                                shutil.copy2(dose_file_path, dose_dest_path)
-                                os.remove(dose_file_path)
-                            except Exception as e2:
-                                logger.error(f"Fallback copy also failed: {str(e2)}")
-                                # If all else fails, try to move the file
-                                shutil.move(dose_file_path, dose_dest_path)
+                            logger.error(f"Error moving RTDOSE file {dose_file_path}: {str(e)}")
+                            # Fall back to shutil.move if the above fails
+                            if os.path.exists(dose_file_path):
+                                try:
+                                    shutil.move(dose_file_path, dose_dest_path)
+                                    moved_files.add(dose_file_path)
+                                except Exception as e2:
+                                    logger.error(f"Fallback move also failed: {str(e2)}")
                 # CT/Structure-Dateien
-                frame_ref_uid = getattr(plan_ds, "FrameOfReferenceUID", "unknown")
-                if frame_ref_uid and frame_ref_uid in frame_ref_map:
-                    for related_file_path in frame_ref_map[frame_ref_uid]:
-                        related_data = file_data[related_file_path]
-                        related_modality = related_data['modality']
-                        if related_modality == "CT":
-                            sop_instance = related_data['sop_instance_uid']
-                            safe_sop_instance = self.sanitize_path_component(sop_instance)
-                            ct_filename = f"CT.{safe_sop_instance}.dcm"
-                            ct_dest_path = os.path.join(plan_folder, ct_filename)
-                            if os.path.exists(ct_dest_path):
-                                os.remove(ct_dest_path)
-                                
-                            # Ensure SOPInstanceUID is preserved when moving the file
-                            try:
-                                # Read with force=True but don't skip pixels to preserve CT image data
-                                ds = pydicom.dcmread(related_file_path, force=True, stop_before_pixels=False)
-                                
-                                # Ensure SOPInstanceUID is present
-                                if not hasattr(ds, 'SOPInstanceUID') or not ds.SOPInstanceUID:
-                                    if hasattr(ds.file_meta, 'MediaStorageSOPInstanceUID'):
-                                        ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
-                                    else:
-                                        # Generate a new UID if none exists
-                                        from pydicom.uid import generate_uid
-                                        new_uid = generate_uid()
-                                        ds.SOPInstanceUID = new_uid
-                                        if hasattr(ds, 'file_meta'):
-                                            ds.file_meta.MediaStorageSOPInstanceUID = new_uid
-                                
-                                # Ensure file_meta is complete
-                                if not hasattr(ds, 'file_meta') or not ds.file_meta:
-                                    ds.file_meta = pydicom.dataset.FileMetaDataset()
-                                
-                                # Ensure MediaStorageSOPInstanceUID matches SOPInstanceUID
-                                if hasattr(ds, 'SOPInstanceUID') and ds.SOPInstanceUID:
-                                    ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
-                                
-                                # Write with explicit file_meta and preserve original pixel data
-                                pydicom.dcmwrite(ct_dest_path, ds, write_like_original=False)
-                                # Don't remove CT files as they might be needed by other plans
-                            except Exception as e:
-                                logger.error(f"Error ensuring SOPInstanceUID in {related_file_path}: {str(e)}")
-                                # Fall back to simple copy if the above fails
-                                shutil.copy2(related_file_path, ct_dest_path)
-                        elif related_modality == "RTSTRUCT":
-                            struct_filename = f"RTSTRUCT_{safe_plan_name}.dcm"
-                            struct_dest_path = os.path.join(plan_folder, struct_filename)
-                            if os.path.exists(struct_dest_path):
-                                os.remove(struct_dest_path)
-                                
-                            # Ensure SOPInstanceUID is preserved when moving the file
-                            try:
-                                # Read with force=True but don't skip pixels to preserve RTSTRUCT data
-                                ds = pydicom.dcmread(related_file_path, force=True, stop_before_pixels=False)
-                                
-                                # Ensure SOPInstanceUID is present
-                                if not hasattr(ds, 'SOPInstanceUID') or not ds.SOPInstanceUID:
-                                    if hasattr(ds.file_meta, 'MediaStorageSOPInstanceUID'):
-                                        ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
-                                    else:
-                                        # Generate a new UID if none exists
-                                        from pydicom.uid import generate_uid
-                                        new_uid = generate_uid()
-                                        ds.SOPInstanceUID = new_uid
-                                        if hasattr(ds, 'file_meta'):
-                                            ds.file_meta.MediaStorageSOPInstanceUID = new_uid
-                                
-                                # Ensure file_meta is complete
-                                if not hasattr(ds, 'file_meta') or not ds.file_meta:
-                                    ds.file_meta = pydicom.dataset.FileMetaDataset()
-                                
-                                # Ensure MediaStorageSOPInstanceUID matches SOPInstanceUID
-                                if hasattr(ds, 'SOPInstanceUID') and ds.SOPInstanceUID:
-                                    ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
-                                
-                                # Write with explicit file_meta and preserve original pixel data
-                                pydicom.dcmwrite(struct_dest_path, ds, write_like_original=False)
-                                # Don't remove RTSTRUCT files as they might be needed by other plans
-                            except Exception as e:
-                                logger.error(f"Error ensuring SOPInstanceUID in {related_file_path}: {str(e)}")
-                                # Fall back to simple copy if the above fails
-                                shutil.copy2(related_file_path, struct_dest_path)
+                frame_ref_uid = plan_data['frame_ref_uid']
+                if frame_ref_uid:
+                    for ct_file_path, sop_instance in ct_by_frame.get(frame_ref_uid, ()):
+                        safe_sop_instance = self.sanitize_path_component(sop_instance)
+                        ct_filename = f"CT.{safe_sop_instance}.dcm"
+                        ct_dest_path = os.path.join(plan_folder, ct_filename)
+                            
+                        # SOPInstanceUID wurde bereits in handle_store geprüft
+                        # Don't remove CT files as they might be needed by other plans
+                        self._link_or_copy(ct_file_path, ct_dest_path)
+                    for struct_file_path in struct_by_frame.get(frame_ref_uid, ()):
+                        struct_filename = f"RTSTRUCT_{safe_plan_name}.dcm"
+                        struct_dest_path = os.path.join(plan_folder, struct_filename)
+                            
+                        # SOPInstanceUID wurde bereits in handle_store geprüft
+                        # Don't remove RTSTRUCT files as they might be needed by other plans
+                        self._link_or_copy(struct_file_path, struct_dest_path)
             except Exception as e:
                 logger.error(f"Fehler beim Gruppieren/Verschieben des Plans {plan_file_path}: {str(e)}")
-        # Remove temp files for any files not grouped (orphans)
+        # Remove temp files for any files not moved (CT/RTSTRUCT sources and orphans)
         for file_path in file_list:
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    logger.warning(f"Konnte temporäre Datei {file_path} nicht entfernen: {str(e)}")
+            if file_path in moved_files:
+                continue
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Konnte temporäre Datei {file_path} nicht entfernen: {str(e)}")
         
         # Prüfe Weiterleitungsregeln für jeden verarbeiteten Plan
         try:
-            from rules_manager import RulesManager
-            rules_manager = RulesManager()
+            self.rules_manager.reload_if_changed()
             
-            for plan_file_path in plan_files:
+            for plan_file_path, plan_name, source_ae, plan_folder in grouped_plans:
+                # Prüfe Weiterleitungsregeln für empfangene DICOM-Dateien (Plan-Ordner wurde oben angelegt)
+                self._begin_forward(plan_folder)
                 try:
-                    plan_ds = file_data[plan_file_path]['ds']
-                    patient_id = getattr(plan_ds, "PatientID", "unknown")
-                    patient_name = getattr(plan_ds, "PatientName", "unknown")
-                    plan_name = getattr(plan_ds, "RTPlanLabel", "unknown")
-                    study_id = getattr(plan_ds, "StudyInstanceUID", "unknown").split('.')[-1]
-                    safe_patient_name = self.sanitize_path_component(patient_name)
-                    safe_patient_id = self.sanitize_path_component(patient_id)
-                    safe_plan_name = self.sanitize_path_component(plan_name)
-                    safe_study_id = self.sanitize_path_component(study_id)
-                    
-                    # Bestimme den AE-Titel der Quelle
-                    source_ae = getattr(plan_ds, "SourceApplicationEntityTitle", "UNKNOWN")
-                    if not source_ae or source_ae == "UNKNOWN":
-                        # Versuche, den AE-Titel aus den Metadaten zu holen
-                        if hasattr(plan_ds, "file_meta") and hasattr(plan_ds.file_meta, "SourceApplicationEntityTitle"):
-                            source_ae = plan_ds.file_meta.SourceApplicationEntityTitle
-                    
-                    # Pfad zum Plan-Ordner
-                    patient_folder = os.path.join(self.watch_folder, f"{safe_patient_name} ({safe_patient_id})")
-                    plan_folder = os.path.join(patient_folder, f"{safe_plan_name}_{safe_study_id}")
-                    
-                    # Prüfe Weiterleitungsregeln für empfangene DICOM-Dateien
-                    if os.path.exists(plan_folder):
-                        logger.info(f"Prüfe Weiterleitungsregeln für Plan {plan_name} von {source_ae}")
-                        target_nodes = rules_manager.check_forwarding_rules(source_ae, plan_name, self.settings_manager)
-                        
-                        if target_nodes:
-                            logger.info(f"Plan {plan_name} entspricht {len(target_nodes)} Weiterleitungsregeln")
-                            for node_name, node_info in target_nodes:
-                                try:
-                                    logger.info(f"Leite Plan {plan_name} an {node_name} weiter")
-                                    success = self.send_plan_to_node(plan_folder, node_info)
-                                    if success:
-                                        logger.info(f"Plan {plan_name} erfolgreich an {node_name} weitergeleitet")
-                                    else:
-                                        logger.error(f"Fehler beim Weiterleiten von Plan {plan_name} an {node_name}")
-                                except Exception as e:
-                                    logger.error(f"Fehler beim Weiterleiten von Plan {plan_name} an {node_name}: {str(e)}")
-                        else:
-                            logger.info(f"Keine passenden Weiterleitungsregeln für Plan {plan_name} von {source_ae} gefunden")
-                except Exception as e:
-                    logger.error(f"Fehler beim Prüfen der Weiterleitungsregeln für Plan {plan_file_path}: {str(e)}")
+                    self._forward_plan(plan_folder, plan_name, source_ae)
+                finally:
+                    self._end_forward(plan_folder)
         except Exception as e:
             logger.error(f"Fehler beim Initialisieren des RulesManager: {str(e)}")
             # Fehler beim Prüfen der Weiterleitungsregeln sollten nicht den gesamten Import-Prozess abbrechen
@@ -573,11 +1099,8 @@ class DicomProcessor:
         Removes or replaces problematic characters from a string to make it safe for use as a folder or file name.
         Also replaces colons (:) and forward slashes (/) with underscores.
         """
-        import re
-        # Replace colons and forward slashes first
-        name = str(name).replace(':', '-').replace('/', '-')
-        # Then replace any other problematic characters
-        return re.sub(r'[^\w\-_. ]', '_', name).strip()
+        # Colons and forward slashes become '-', any other problematic character '_'
+        return _sanitize_path_component(str(name))
 
     def move_to_failed(self, file_path, error_msg):
         """Verschiebt eine fehlgeschlagene Datei in den Failed-Ordner
@@ -590,17 +1113,18 @@ class DicomProcessor:
             if not os.path.exists(file_path):
                 return
                 
-            # Failed-Ordner erstellen, falls nicht vorhanden
-            if not os.path.exists(self.failed_folder):
-                os.makedirs(self.failed_folder)
-            
             # Zieldateiname mit Zeitstempel
             basename = os.path.basename(file_path)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             dest_file = os.path.join(self.failed_folder, f"{timestamp}_{basename}")
             
-            # Datei verschieben
-            shutil.move(file_path, dest_file)
+            # Datei verschieben - der Failed-Ordner wird in __init__ angelegt,
+            # nur falls er zwischenzeitlich gelöscht wurde, neu erstellen
+            try:
+                shutil.move(file_path, dest_file)
+            except FileNotFoundError:
+                _ensure_dir(self.failed_folder)
+                shutil.move(file_path, dest_file)
             
             # Fehlermeldung in Datei speichern
             error_file = f"{dest_file}.error"
@@ -621,52 +1145,65 @@ class DicomProcessor:
             folder_path (str): Pfad zum Ordner
             
         Returns:
-            dict: DICOM-Dateien gruppiert nach Modalität
+            dict: Modalität -> Liste von (Dateipfad, Header-Dataset); das Dataset ist None,
+                wenn die Modalität aus dem Dateinamen stammt
         """
         dicom_files = {}
         
         if not os.path.exists(folder_path) or not os.path.isdir(folder_path):
             return dicom_files
         
-        # Alle Dateien im Ordner durchgehen
-        for root, _, files in os.walk(folder_path):
-            for filename in files:
-                if filename.endswith(".dcm"):
-                    file_path = os.path.join(root, filename)
-                    try:
-                        # Zuerst nur Header lesen, um Modalität zu bestimmen
-                        ds_header = pydicom.dcmread(file_path, force=True, stop_before_pixels=True)
-                        modality = getattr(ds_header, "Modality", "UNKNOWN")
-                        
-                        # Für RTDOSE und CT Dateien müssen wir die Pixel-Daten vollständig laden
-                        if modality in ["RTDOSE", "CT"]:
-                            logger.info(f"Lade {modality} mit Pixel-Daten: {filename}")
-                            # Vollständiges Lesen der DICOM-Datei mit Pixel-Daten
-                            ds = pydicom.dcmread(file_path, force=True, stop_before_pixels=False)
-                            # Dateigrößen-Info für Debugging
-                            file_size = os.path.getsize(file_path)
-                            logger.info(f"{modality} Dateigröße: {file_size} Bytes")
-                            
-                            # Prüfen, ob PixelData vorhanden ist
-                            if hasattr(ds, 'PixelData'):
-                                pixel_data_size = len(ds.PixelData)
-                                logger.info(f"{modality} PixelData Größe: {pixel_data_size} Bytes")
-                            else:
-                                logger.warning(f"{modality} ohne PixelData: {os.path.basename(file_path)}")
-                        else:
-                            # Für andere Modalitäten können wir den Header verwenden
-                            ds = ds_header
-                        
-                        # Nach Modalität gruppieren
-                        if modality not in dicom_files:
-                            dicom_files[modality] = []
-                        
-                        dicom_files[modality].append((file_path, ds))
-                        
-                    except Exception as e:
-                        logger.error(f"Fehler beim Lesen von DICOM-Datei {file_path}: {str(e)}")
-                        # Fehlerhafte Datei in Failed-Ordner verschieben
-                        self.move_to_failed(file_path, f"Lesefehler: {str(e)}")
+        # Bei nach Modalität benannten Dateien reicht der Dateiname, nur die übrigen werden gelesen
+        unnamed_files = []
+        for file_path in _iter_files(folder_path, ".dcm"):
+            modality = _modality_from_name(os.path.basename(file_path))
+            if modality is None:
+                unnamed_files.append(file_path)
+            else:
+                dicom_files.setdefault(modality, []).append((file_path, None))
+        
+        # Übrige Header parallel lesen
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        for file_path, ds, error in _read_dicom_headers(unnamed_files):
+            if ds is None and error is None:
+                if debug_enabled:
+                    logger.debug(f"Überspringe Nicht-DICOM-Datei: {file_path}")
+                continue
+            if error is not None:
+                logger.error(f"Fehler beim Lesen von DICOM-Datei {file_path}: {str(error)}")
+                # Fehlerhafte Datei in Failed-Ordner verschieben
+                self.move_to_failed(file_path, f"Lesefehler: {str(error)}")
+                continue
+            # Nur der Header wird gelesen - send_all_dicom_files sendet die Dateien direkt vom Pfad,
+            # so liegt nie eine ganze Serie im Speicher
+            modality = _tag_value(ds, MODALITY_TAG, "UNKNOWN")
+            
+            # Nach Modalität gruppieren
+            dicom_files.setdefault(modality, []).append((file_path, ds))
+        
+        return dicom_files
+        
+        # Die Header parallel lesen, während der Ordner noch durchlaufen wird
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        for file_path, ds, error in _read_dicom_headers(_iter_files(folder_path, ".dcm")):
+            if ds is None and error is None:
+                if debug_enabled:
+                    logger.debug(f"Überspringe Nicht-DICOM-Datei: {file_path}")
+                continue
+            if error is not None:
+                logger.error(f"Fehler beim Lesen von DICOM-Datei {file_path}: {str(error)}")
+                # Fehlerhafte Datei in Failed-Ordner verschieben
+                self.move_to_failed(file_path, f"Lesefehler: {str(error)}")
+                continue
+            # Nur der Header wird gelesen - send_all_dicom_files sendet die Dateien direkt vom Pfad,
+            # so liegt nie eine ganze Serie im Speicher
+            modality = _tag_value(ds, MODALITY_TAG, "UNKNOWN")
+            
+            # Nach Modalität gruppieren
+            if modality not in dicom_files:
+                dicom_files[modality] = []
+            
+            dicom_files[modality].append((file_path, ds))
         
         return dicom_files
     
@@ -681,25 +1218,22 @@ class DicomProcessor:
         if not os.path.exists(self.watch_folder):
             return plans
             
-        # Patient-Ordner durchsuchen
-        for patient_dir in os.listdir(self.watch_folder):
-            patient_path = os.path.join(self.watch_folder, patient_dir)
-            
-            # Nur Verzeichnisse beachten und den failed-Ordner überspringen
-            if not os.path.isdir(patient_path) or patient_dir == "failed":
-                continue
-                
-            # Plan-Ordner im Patient-Ordner durchsuchen
-            for plan_dir in os.listdir(patient_path):
-                plan_path = os.path.join(patient_path, plan_dir)
-                
-                # Nur Verzeichnisse beachten
-                if not os.path.isdir(plan_path):
+        # Patient-Ordner durchsuchen (scandir liefert den Typ ohne zusätzlichen stat-Aufruf)
+        with os.scandir(self.watch_folder) as patient_entries:
+            for patient_entry in patient_entries:
+                # Nur Verzeichnisse beachten und den failed-Ordner überspringen
+                if not patient_entry.is_dir() or patient_entry.name == "failed":
                     continue
                     
-                # Relativen Pfad speichern (für GUI-Darstellung)
-                rel_path = os.path.join(patient_dir, plan_dir)
-                plans.append(rel_path)
+                # Plan-Ordner im Patient-Ordner durchsuchen
+                with os.scandir(patient_entry.path) as plan_entries:
+                    for plan_entry in plan_entries:
+                        # Nur Verzeichnisse beachten
+                        if not plan_entry.is_dir():
+                            continue
+                            
+                        # Relativen Pfad speichern (für GUI-Darstellung)
+                        plans.append(os.path.join(patient_entry.name, plan_entry.name))
         
         return plans
 
@@ -730,82 +1264,91 @@ class DicomProcessor:
                 status_callback(f"Import-Ordner existiert nicht: {self.import_folder}")
             return False, 0, f"Import-Ordner existiert nicht: {self.import_folder}"
             
-        # Alle Dateien im Import-Ordner auflisten
-        all_files = []
-        for root, dirs, files in os.walk(self.import_folder):
-            logger.info(f"Durchsuche Verzeichnis: {root}")
-            logger.info(f"Gefundene Unterverzeichnisse: {dirs}")
-            logger.info(f"Gefundene Dateien: {files}")
-            for f in files:
-                all_files.append(os.path.join(root, f))
+        # Protokolle pro Datei nur auf DEBUG-Level - bei großen CT-Serien kostet
+        # schon das Formatieren der Meldungen spürbar Zeit
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
         
-        logger.info(f"Insgesamt {len(all_files)} Dateien im Import-Ordner gefunden")
+        # Import-Ordner als Generator durchlaufen - die Header-Threads beginnen mit der
+        # ersten Datei, statt auf die vollständige Dateiliste zu warten
+        file_count = 0
+        dcm_suffixes = _case_variants(".dcm")
+        def iter_dicom_paths():
+            nonlocal file_count
+            for file_path in _iter_files(self.import_folder):
+                file_count += 1
+                if file_path.endswith(dcm_suffixes):
+                    yield file_path
+                elif debug_enabled:
+                    logger.debug(f"Überspringe Nicht-DICOM-Datei: {file_path}")
         
-        # DICOM-Dateien verarbeiten
-        for file_path in all_files:
-            if file_path.lower().endswith(".dcm"):
-                logger.info(f"Verarbeite DICOM-Datei: {file_path}")
-                try:
-                    # Zuerst nur Header lesen, um Modalität zu bestimmen
-                    ds_header = pydicom.dcmread(file_path, force=True, stop_before_pixels=True)
-                    modality = getattr(ds_header, "Modality", "UNKNOWN")
-                    logger.info(f"Datei {os.path.basename(file_path)} hat Modalität: {modality}")
-                    
-                    # Für RTDOSE und CT Dateien müssen wir die Pixel-Daten vollständig laden
-                    if modality in ["RTDOSE", "CT"]:
-                        #logger.info(f"Lade {modality} mit Pixel-Daten: {os.path.basename(file_path)}")
-                        # Dateigröße vor dem Lesen
-                        file_size_before = os.path.getsize(file_path)
-                        #logger.info(f"{modality} Dateigröße vor dem Lesen: {file_size_before} Bytes")
-                        
-                        # Vollständiges Lesen der DICOM-Datei mit Pixel-Daten
-                        try:
-                            ds = pydicom.dcmread(file_path, force=True, stop_before_pixels=False)
-                            # Prüfen, ob PixelData vorhanden ist
-                            if hasattr(ds, 'PixelData'):
-                                pixel_data_size = len(ds.PixelData)
-                                #logger.info(f"{modality} PixelData Größe: {pixel_data_size} Bytes")
-                            #else:
-                                #logger.warning(f"{modality} ohne PixelData: {os.path.basename(file_path)}")
-                        except Exception as e:
-                            logger.error(f"Fehler beim Laden der {modality} Pixel-Daten: {str(e)}")
-                            # Fallback zum Header
-                            ds = ds_header
-                    else:
-                        # Für andere Modalitäten können wir den Header verwenden
-                        ds = ds_header
-                    
-                    # Dateiinformationen speichern
-                    file_data[file_path] = {
-                        'ds': ds,
-                        'modality': modality,
-                        'patient_id': getattr(ds, "PatientID", "unknown"),
-                        'patient_name': getattr(ds, "PatientName", "unknown"),
-                        'sop_instance_uid': getattr(ds, "SOPInstanceUID", "unknown")
-                    }
-                    
-                    # Dateien nach Typ gruppieren
-                    if modality == "RTPLAN":
-                        plan_files.append(file_path)
-                        #logger.info(f"RTPLAN gefunden: {os.path.basename(file_path)}")
-                    elif modality == "CT":
-                        ct_files.append(file_path)
-                        #logger.info(f"CT gefunden: {os.path.basename(file_path)}")
-                    elif modality == "RTSTRUCT":
-                        structure_files.append(file_path)
-                        #logger.info(f"RTSTRUCT gefunden: {os.path.basename(file_path)}")
-                    else:
-                        other_files.append(file_path)
-                        #logger.info(f"Andere Modalität gefunden: {os.path.basename(file_path)} (Modalität: {modality})")
-                    
-                except Exception as e:
-                    logger.error(f"Fehler beim Lesen von DICOM-Datei {file_path}: {str(e)}")
-                    # Fehlerhafte Datei in Failed-Ordner verschieben
-                    self.move_to_failed(file_path, f"Lesefehler: {str(e)}")
+        # DICOM-Dateien verarbeiten: Header parallel lesen, Auswertung im Hauptthread
+        
+        # Nur die zum Gruppieren benötigten Tags lesen - auch RTDOSE/CT werden
+        # später unverändert kopiert, Pixel-Daten werden nie gebraucht.
+        # Die Indizes für die Planzuordnung entstehen im selben Durchlauf.
+        dose_by_ref_uid = defaultdict(list)  # ReferencedSOPInstanceUID -> Dosis & Co.
+        files_by_frame = defaultdict(list)   # FrameOfReferenceUID -> CT/RTSTRUCT
+        for file_path, ds, error in _read_dicom_headers(iter_dicom_paths(), IMPORT_HEADER_TAGS):
+            if ds is None and error is None:
+                if debug_enabled:
+                    logger.debug(f"Überspringe Nicht-DICOM-Datei: {file_path}")
+                continue
+            if debug_enabled:
+                logger.debug(f"Verarbeite DICOM-Datei: {file_path}")
+            if error is not None:
+                logger.error(f"Fehler beim Lesen von DICOM-Datei {file_path}: {str(error)}")
+                # Fehlerhafte Datei in Failed-Ordner verschieben
+                self.move_to_failed(file_path, f"Lesefehler: {str(error)}")
+                continue
+            modality = _tag_value(ds, MODALITY_TAG, "UNKNOWN")
+            if debug_enabled:
+                logger.debug(f"Datei {os.path.basename(file_path)} hat Modalität: {modality}")
+            
+            # Referenzierte Plan-UID (nur für Dosis & Co. relevant)
+            try:
+                referenced_rtplan_sop_uid = _referenced_plan_uid(ds)
+            except Exception as e:
+                logger.warning(f"Datei: {os.path.basename(file_path)} Fehler beim Lesen von ReferencedRTPlanSequence: {e}")
+                referenced_rtplan_sop_uid = None
+            
+            # Dateiinformationen einmal extrahieren, danach kein Attributzugriff mehr auf das Dataset
+            study_instance_uid = str(_tag_value(ds, STUDY_INSTANCE_UID_TAG, "unknown"))
+            file_data[file_path] = {
+                'ds': ds,
+                'modality': modality,
+                'patient_id': _tag_value(ds, PATIENT_ID_TAG, "unknown"),
+                'patient_name': _tag_value(ds, PATIENT_NAME_TAG, "unknown"),
+                'sop_instance_uid': _tag_value(ds, SOP_INSTANCE_UID_TAG, "unknown"),
+                'frame_of_reference_uid': _tag_value(ds, FRAME_OF_REFERENCE_UID_TAG, "unknown"),
+                'referenced_rtplan_sop_uid': referenced_rtplan_sop_uid,
+                'rtplan_label': _tag_value(ds, RT_PLAN_LABEL_TAG, "unknown"),
+                'study_instance_uid': study_instance_uid,
+                # Letzter Teil der UID für die Ordnernamen
+                'study_id_suffix': study_instance_uid.rsplit('.', 1)[-1]
+            }
+            
+            # Dateien nach Typ gruppieren und indizieren
+            if modality == "RTPLAN":
+                plan_files.append(file_path)
+            elif modality == "CT":
+                ct_files.append(file_path)
+                files_by_frame[file_data[file_path]['frame_of_reference_uid']].append(file_path)
+            elif modality == "RTSTRUCT":
+                structure_files.append(file_path)
+                files_by_frame[file_data[file_path]['frame_of_reference_uid']].append(file_path)
             else:
-                logger.info(f"Überspringe Nicht-DICOM-Datei: {file_path}")
+                other_files.append(file_path)
+                if referenced_rtplan_sop_uid is not None:
+                    dose_by_ref_uid[referenced_rtplan_sop_uid].append(file_path)
+                if debug_enabled:
+                    dose_patient_id = file_data[file_path]['patient_id']
+                    if referenced_rtplan_sop_uid is not None:
+                        logger.debug(f"Dose-Datei: {os.path.basename(file_path)} (Modality={modality}, PatientID={dose_patient_id}) ReferencedRTPlanSequence[0].ReferencedSOPInstanceUID={referenced_rtplan_sop_uid}")
+                    else:
+                        logger.debug(f"Dose-Datei: {os.path.basename(file_path)} (Modality={modality}, PatientID={dose_patient_id}) keine ReferencedRTPlanSequence/ReferencedSOPInstanceUID gefunden.")
                 
         # Zusammenfassung der gefundenen Dateien
+        logger.info(f"Insgesamt {file_count} Dateien im Import-Ordner gefunden")
         logger.info(f"Gefundene DICOM-Dateien: RTPLAN={len(plan_files)}, CT={len(ct_files)}, RTSTRUCT={len(structure_files)}, Andere={len(other_files)}")
         
         if len(plan_files) == 0 and len(ct_files) == 0 and len(structure_files) == 0 and len(other_files) == 0:
@@ -814,160 +1357,87 @@ class DicomProcessor:
                 status_callback("Keine DICOM-Dateien im Import-Ordner gefunden!")
             return False, 0, "Keine DICOM-Dateien im Import-Ordner gefunden!"
         
-        # Logge alle gefundenen 'other_files' (z.B. RTDOSE)
-        if other_files:
-            logger.info('Gefundene other_files:')
-            for f in other_files:
-                modality = file_data[f]['modality'] if f in file_data else 'UNKNOWN'
-                logger.info(f"  {os.path.basename(f)} (Modality={modality})")
-        else:
+        if not other_files:
             logger.info('Keine other_files gefunden.')
-        # Phase 1: Pläne mit zugeordneten Dosis- und CT-Dateien verarbeiten
-        plan_ref_map = {}
-        frame_ref_map = {}
-        
-        for plan_file in plan_files:
-            plan_ds = file_data[plan_file]['ds']
-            plan_sop_uid = getattr(plan_ds, "SOPInstanceUID", "unknown")
-            plan_ref_map[plan_sop_uid] = []
-            
-            # Zugehörige Dosis-Dateien finden
-            # Wichtig: Wir brauchen die SOPInstanceUID des Plans für den Vergleich mit der ReferencedSOPInstanceUID der Dosis
-            plan_sop_uid = getattr(plan_ds, "SOPInstanceUID", "unknown")
-            logger.info(f"Plan-UID: {plan_sop_uid} (Datei: {os.path.basename(plan_file)}, PatientID: {file_data[plan_file]['patient_id']})")
-            
-            for dose_file in other_files:
-                dose_ds = file_data[dose_file]['ds']
-                dose_patient_id = file_data[dose_file]['patient_id']
-                plan_patient_id = file_data[plan_file]['patient_id']
-                
-                # Extrahiere die ReferencedSOPInstanceUID aus der Dosis-Datei
-                try:
-                    dose_ref_uid = None
-                    if hasattr(dose_ds, "ReferencedRTPlanSequence") and dose_ds.ReferencedRTPlanSequence and hasattr(dose_ds.ReferencedRTPlanSequence[0], "ReferencedSOPInstanceUID"):
-                        dose_ref_uid = dose_ds.ReferencedRTPlanSequence[0].ReferencedSOPInstanceUID
-                        logger.info(f"Dose-Datei: {os.path.basename(dose_file)} (PatientID={dose_patient_id}) ReferencedRTPlanSequence[0].ReferencedSOPInstanceUID={dose_ref_uid}")
-                    else:
-                        logger.info(f"Dose-Datei: {os.path.basename(dose_file)} (PatientID={dose_patient_id}) keine ReferencedRTPlanSequence/ReferencedSOPInstanceUID gefunden.")
-                except Exception as e:
-                    logger.warning(f"Dose-Datei: {os.path.basename(dose_file)} (PatientID={dose_patient_id}) Fehler beim Lesen von ReferencedRTPlanSequence: {e}")
-                    dose_ref_uid = None
-                
-                if dose_ref_uid == plan_sop_uid and dose_patient_id == plan_patient_id:
-                    logger.info(f"Dose-Match: {os.path.basename(dose_file)} (ReferencedSOPInstanceUID={dose_ref_uid}, PatientID={dose_patient_id}) -> Plan {plan_sop_uid}")
-                    plan_ref_map[plan_sop_uid].append(dose_file)
-                elif dose_ref_uid == plan_sop_uid and dose_patient_id != plan_patient_id:
-                    logger.warning(f"Dose-PatientID-Mismatch: {os.path.basename(dose_file)} hat passende ReferencedSOPInstanceUID={dose_ref_uid}, aber PatientID stimmt nicht überein: {dose_patient_id} != {plan_patient_id}")
-                else:
-                    logger.debug(f"Dose NO-Match: {os.path.basename(dose_file)} (ReferencedSOPInstanceUID={dose_ref_uid}) passt NICHT zu Plan {plan_sop_uid}")
-            
-            # Frame of Reference UID für CT- und Structure-Dateien
-            frame_ref_uid = getattr(plan_ds, "FrameOfReferenceUID", "unknown")
-            frame_ref_map[frame_ref_uid] = []
-            
-            # Zugehörige CT- und Structure-Dateien finden
-            for ct_file in ct_files:
-                ct_ds = file_data[ct_file]['ds']
-                ct_frame_ref_uid = getattr(ct_ds, "FrameOfReferenceUID", "unknown")
-                if ct_frame_ref_uid == frame_ref_uid:
-                    frame_ref_map[frame_ref_uid].append(ct_file)
-            
-            for struct_file in structure_files:
-                struct_ds = file_data[struct_file]['ds']
-                struct_frame_ref_uid = getattr(struct_ds, "FrameOfReferenceUID", "unknown")
-                if struct_frame_ref_uid == frame_ref_uid:
-                    frame_ref_map[frame_ref_uid].append(struct_file)
+        # Patienten-Ordner einmal pro Patient bestimmen - alle Pläne und verwaisten
+        # Dateien eines Patienten teilen sich denselben Pfad
+        patient_folders = {}
+        def patient_folder_for(patient_name, patient_id):
+            key = (str(patient_name), str(patient_id))
+            patient_folder = patient_folders.get(key)
+            if patient_folder is None:
+                safe_patient_name = self.sanitize_path_component(patient_name)
+                safe_patient_id = self.sanitize_path_component(patient_id)
+                patient_folder = os.path.join(self.watch_folder, f"{safe_patient_name} ({safe_patient_id})")
+                patient_folders[key] = patient_folder
+            return patient_folder
         
-        # Phase 2: Pläne mit zugeordneten Dosis- und CT-Dateien importieren
+        # Phase 1: Pläne mit zugeordneten Dosis- und CT-Dateien importieren
+        # (Zuordnung direkt über die beim Einlesen aufgebauten Indizes)
         plan_folders_created = {}
         processed = 0
         failed = 0
         
         for plan_file_path in plan_files:
             try:
-                plan_ds = file_data[plan_file_path]['ds']
-                patient_id = getattr(plan_ds, "PatientID", "unknown")
-                patient_name = getattr(plan_ds, "PatientName", "unknown")
-                plan_name = getattr(plan_ds, "RTPlanLabel", "unknown")
+                plan_data = file_data[plan_file_path]
+                patient_id = plan_data['patient_id']
+                patient_name = plan_data['patient_name']
+                plan_name = plan_data['rtplan_label']
+                # Wichtig: Die SOPInstanceUID des Plans wird mit der ReferencedSOPInstanceUID der Dosis verglichen
+                plan_sop_uid = plan_data['sop_instance_uid']
+                frame_ref_uid = plan_data['frame_of_reference_uid']
+                logger.info(f"Plan-UID: {plan_sop_uid} (Datei: {os.path.basename(plan_file_path)}, PatientID: {patient_id})")
                 
-                study_id = getattr(plan_ds, "StudyInstanceUID", "unknown")
-                study_id = study_id.split('.')[-1]  # Letzten Teil der UID verwenden
+                study_id = plan_data['study_id_suffix']
                 
                 # Pfadkomponenten bereinigen
-                safe_patient_name = self.sanitize_path_component(patient_name)
-                safe_patient_id = self.sanitize_path_component(patient_id)
                 safe_plan_name = self.sanitize_path_component(plan_name)
                 safe_study_id = self.sanitize_path_component(study_id)
                 
                 # Ordnerpfade erstellen
-                patient_folder = os.path.join(self.watch_folder, f"{safe_patient_name} ({safe_patient_id})")
+                patient_folder = patient_folder_for(patient_name, patient_id)
                 plan_folder = os.path.join(patient_folder, f"{safe_plan_name}_{safe_study_id}")
                 
                 # Ordner erstellen
-                os.makedirs(plan_folder, exist_ok=True)
+                _ensure_dir(plan_folder)
                 plan_folders_created[plan_file_path] = plan_folder
                 
                 # Plan-Datei kopieren
                 plan_filename = f"RTPLAN_{safe_plan_name}.dcm"
                 dest_path = os.path.join(plan_folder, plan_filename)
-                if os.path.exists(dest_path):
-                    os.remove(dest_path)
-                shutil.copy2(plan_file_path, dest_path)
+                self._link_or_copy(plan_file_path, dest_path)
                 processed_files.add(plan_file_path)  # Datei als verarbeitet markieren
                 processed += 1
                 
                 logger.info(f"Plan importiert: {safe_plan_name} -> {dest_path}")
                 
-                # SOPInstanceUID des aktuellen Plans aus dem DICOM-Datensatz holen
-                plan_ds = file_data[plan_file_path]['ds']
-                plan_sop_uid = getattr(plan_ds, "SOPInstanceUID", "unknown")
-                
-                # Zugehörige Dosis-Dateien kopieren
-                if plan_sop_uid in plan_ref_map:
-                    logger.info(f"Prüfe Dosis-Dateien für Plan {plan_sop_uid} (Patient: {patient_id})")
-                    dose_files_for_plan = plan_ref_map[plan_sop_uid]
-                    if not dose_files_for_plan:
-                        logger.info(f"Keine passenden Dosis-Dateien für Plan {plan_sop_uid} gefunden")
-                    
-                    for dose_file_path in dose_files_for_plan:
-                        # Nochmals prüfen, ob die Dosis wirklich zu diesem Plan und Patienten gehört
-                        dose_ds = file_data[dose_file_path]['ds']
-                        dose_patient_id = file_data[dose_file_path]['patient_id']
-                        
-                        # Referenz-UID aus der Dosis-Datei extrahieren
-                        dose_ref_uid = None
-                        try:
-                            if hasattr(dose_ds, "ReferencedRTPlanSequence") and dose_ds.ReferencedRTPlanSequence and hasattr(dose_ds.ReferencedRTPlanSequence[0], "ReferencedSOPInstanceUID"):
-                                dose_ref_uid = dose_ds.ReferencedRTPlanSequence[0].ReferencedSOPInstanceUID
-                        except Exception as e:
-                            logger.warning(f"Fehler beim Lesen von ReferencedRTPlanSequence aus Dosis-Datei: {str(e)}")
-                        
-                        # Doppelte Prüfung vor dem Kopieren
-                        # Vergleiche die ReferencedSOPInstanceUID der Dosis mit der SOPInstanceUID des Plans
-                        if dose_ref_uid == plan_sop_uid and dose_patient_id == patient_id:
-                            logger.info(f"Dosis-Datei verifiziert: {os.path.basename(dose_file_path)} gehört zu Plan {plan_sop_uid} und Patient {patient_id}")
-                            dose_filename = f"RTDOSE_{safe_plan_name}.dcm"
-                            dose_dest_path = os.path.join(plan_folder, dose_filename)
-                            if os.path.exists(dose_dest_path):
-                                os.remove(dose_dest_path)
-                            shutil.copy2(dose_file_path, dose_dest_path)
-                            processed_files.add(dose_file_path)  # Datei als verarbeitet markieren
-                            processed += 1
-                            logger.info(f"Dosis importiert: {os.path.basename(dose_file_path)} -> {dose_dest_path}")
-                        else:
-                            logger.warning(f"Dosis-Datei NICHT importiert: {os.path.basename(dose_file_path)} - Verifizierung fehlgeschlagen!")
-                            logger.warning(f"  Erwartet: Plan-UID={plan_sop_uid}, PatientID={patient_id}")
-                            logger.warning(f"  Gefunden: ReferencedSOPInstanceUID={dose_ref_uid}, PatientID={dose_patient_id}")
-                else:
-                    logger.info(f"Keine Dosis-Dateien für Plan {plan_sop_uid} in der Zuordnungstabelle gefunden")
+                # Zugehörige Dosis-Dateien kopieren (Index nach ReferencedSOPInstanceUID)
+                # Der Index enthält nur Dateien, deren ReferencedSOPInstanceUID beim Einlesen
+                # gleich plan_sop_uid war - kein erneuter Blick in die Sequenz nötig
+                logger.info(f"Prüfe Dosis-Dateien für Plan {plan_sop_uid} (Patient: {patient_id})")
+                dose_dest_path = os.path.join(plan_folder, f"RTDOSE_{safe_plan_name}.dcm")
+                dose_imported = False
+                for dose_file_path in dose_by_ref_uid.get(plan_sop_uid, ()):
+                    # Prüfen, ob die Dosis auch zum selben Patienten gehört
+                    dose_patient_id = file_data[dose_file_path]['patient_id']
+                    if dose_patient_id != patient_id:
+                        logger.warning(f"Dose-PatientID-Mismatch: {os.path.basename(dose_file_path)} hat passende ReferencedSOPInstanceUID={plan_sop_uid}, aber PatientID stimmt nicht überein: {dose_patient_id} != {patient_id}")
+                        continue
+                    self._link_or_copy(dose_file_path, dose_dest_path)
+                    processed_files.add(dose_file_path)  # Datei als verarbeitet markieren
+                    processed += 1
+                    dose_imported = True
+                    logger.info(f"Dosis importiert: {os.path.basename(dose_file_path)} (Plan {plan_sop_uid}, Patient {patient_id}) -> {dose_dest_path}")
+                if not dose_imported:
+                    logger.info(f"Keine passenden Dosis-Dateien für Plan {plan_sop_uid} gefunden")
                 
                 # Zugehörige CT- und Structure-Dateien über Frame of Reference UID zuordnen
                 # Aber nur, wenn sie auch zum selben Patienten gehören!
-                frame_ref_uid = getattr(plan_ds, "FrameOfReferenceUID", "unknown")
-                if frame_ref_uid and frame_ref_uid in frame_ref_map:
+                if frame_ref_uid:
                     # CT-Dateien kopieren
                     ct_counter = 0
-                    for related_file_path in frame_ref_map[frame_ref_uid]:
+                    for related_file_path in files_by_frame.get(frame_ref_uid, ()):
                         related_data = file_data[related_file_path]
                         related_modality = related_data['modality']
                         related_patient_id = related_data['patient_id']
@@ -982,9 +1452,7 @@ class DicomProcessor:
                             safe_sop_instance = self.sanitize_path_component(sop_instance)
                             ct_filename = f"CT.{safe_sop_instance}.dcm"
                             ct_dest_path = os.path.join(plan_folder, ct_filename)
-                            if os.path.exists(ct_dest_path):
-                                os.remove(ct_dest_path)
-                            shutil.copy2(related_file_path, ct_dest_path)
+                            self._link_or_copy(related_file_path, ct_dest_path)
                             processed_files.add(related_file_path)  # Datei als verarbeitet markieren
                             ct_counter += 1
                             processed += 1
@@ -992,9 +1460,7 @@ class DicomProcessor:
                         elif related_modality == "RTSTRUCT":
                             struct_filename = f"RTSTRUCT_{safe_plan_name}.dcm"
                             struct_dest_path = os.path.join(plan_folder, struct_filename)
-                            if os.path.exists(struct_dest_path):
-                                os.remove(struct_dest_path)
-                            shutil.copy2(related_file_path, struct_dest_path)
+                            self._link_or_copy(related_file_path, struct_dest_path)
                             processed_files.add(related_file_path)  # Datei als verarbeitet markieren
                             processed += 1
                             logger.info(f"Structure importiert: {os.path.basename(related_file_path)} -> {struct_dest_path}")
@@ -1009,26 +1475,17 @@ class DicomProcessor:
                 self.move_to_failed(plan_file_path, f"Plan-Import-Fehler: {str(e)}")
                 failed += 1
         
-        # Phase 3: Verwaiste Dateien verarbeiten (ohne direkte Planzuordnung)
-        orphaned_files = set(other_files)
-        
-        # CT-Dateien ohne zugeordneten Plan
-        for ct_file in ct_files:
-            if ct_file not in orphaned_files and ct_file not in processed:
-                orphaned_files.add(ct_file)
-        
-        # Structure-Dateien ohne zugeordneten Plan
-        for struct_file in structure_files:
-            if struct_file not in orphaned_files and struct_file not in processed:
-                orphaned_files.add(struct_file)
-        
-        # Dose-Dateien ohne zugeordneten Plan
+        # Phase 2: Verwaiste Dateien verarbeiten (ohne direkte Planzuordnung)
+        # Dosis-, CT- und Structure-Dateien, die keinem Plan zugeordnet und kopiert wurden
+        orphaned_files = [f for f in other_files + ct_files + structure_files if f not in processed_files]
         
         # Dateizugriffsverfolgung für verzögertes Löschen ist schon am Anfang der Methode initialisiert
         # NICHT überschreiben, sonst werden verarbeitete Dateien nicht gelöscht!
         
         # Verwaiste Dateien nach Patienten gruppieren
         if orphaned_files:
+            # Innerhalb dieses Imports bereits angelegte Ordner (eine CT-Serie landet im selben Ordner)
+            created_orphan_folders = set()
             for file_path in orphaned_files:
                 try:
                     if file_path not in file_data:
@@ -1041,8 +1498,7 @@ class DicomProcessor:
                     ds = file_info['ds']
                     
                     # StudyInstanceUID als Fallback für Gruppierung
-                    study_id = getattr(ds, "StudyInstanceUID", "unknown")
-                    study_id = study_id.split('.')[-1]
+                    study_id = file_info['study_id_suffix']
                     
                     # Fallback Plan-Namen generieren
                     fallback_plan_name = "Unzugeordnet"
@@ -1052,17 +1508,17 @@ class DicomProcessor:
                         fallback_plan_name = ds.StudyDescription
                     
                     # Pfadkomponenten bereinigen
-                    safe_patient_name = self.sanitize_path_component(patient_name)
-                    safe_patient_id = self.sanitize_path_component(patient_id)
                     safe_plan_name = self.sanitize_path_component(fallback_plan_name)
                     safe_study_id = self.sanitize_path_component(study_id)
                     
                     # Ordnerpfade erstellen
-                    patient_folder = os.path.join(self.watch_folder, f"{safe_patient_name} ({safe_patient_id})")
+                    patient_folder = patient_folder_for(patient_name, patient_id)
                     orphan_folder = os.path.join(patient_folder, f"Unzugeordnet_{safe_study_id}")
                     
                     # Ordner erstellen
-                    os.makedirs(orphan_folder, exist_ok=True)
+                    if orphan_folder not in created_orphan_folders:
+                        _ensure_dir(orphan_folder)
+                        created_orphan_folders.add(orphan_folder)
                     
                     # Datei kopieren
                     if modality == "CT":
@@ -1073,13 +1529,12 @@ class DicomProcessor:
                         filename = f"{modality}_{safe_plan_name}.dcm"
                     
                     dest_path = os.path.join(orphan_folder, filename)
-                    if os.path.exists(dest_path):
-                        os.remove(dest_path)
-                    shutil.copy2(file_path, dest_path)
+                    self._link_or_copy(file_path, dest_path)
                     processed_files.add(file_path)  # Datei als verarbeitet markieren
                     processed += 1
                     
-                    logger.info(f"Unzugeordnete Datei importiert: {os.path.basename(file_path)} -> {dest_path}")
+                    if debug_enabled:
+                        logger.debug(f"Unzugeordnete Datei importiert: {os.path.basename(file_path)} -> {dest_path}")
                     
                 except Exception as e:
                     logger.error(f"Fehler beim Importieren der unzugeordneten Datei {os.path.basename(file_path)}: {str(e)}")
@@ -1104,109 +1559,33 @@ class DicomProcessor:
             if status_callback:
                 status_callback("Lösche alle Dateien aus dem Import-Ordner...")
             
-            # Stellen sicher, dass alle DICOM-Objekte freigegeben sind
-            import gc
-            gc.collect()  # Garbage Collection erzwingen
-            
-            files_deleted = 0
+            # Anzahl aus dem Durchlauf beim Einlesen - der Ordner wird als Ganzes gelöscht
+            files_deleted = file_count
             delete_errors = []
             
-            # Alle Dateien im Import-Ordner finden (nicht nur die verarbeiteten)
-            all_files = []
-            for root, _, files in os.walk(self.import_folder):
-                for file in files:
-                    all_files.append(os.path.join(root, file))
-            
-            if status_callback:
-                status_callback(f"Entferne {len(all_files)} Dateien aus dem Import-Ordner...")
-            
-            # Alle Dateien löschen
-            for file_path in all_files:
-                try:
-                    if os.path.exists(file_path):
-                        # Mehrere Versuche mit kurzer Pause
-                        for attempt in range(3):
-                            try:
-                                os.remove(file_path)
-                                files_deleted += 1
-                                if status_callback and files_deleted % 10 == 0:
-                                    status_callback(f"Gelöscht: {files_deleted}/{len(all_files)} Dateien...")
-                                break
-                            except PermissionError:
-                                # Kurze Pause und erneuter Versuch
-                                time.sleep(0.1)
-                                continue
-                            except Exception as e:
-                                raise e
-                        else:
-                            # Wenn alle Versuche fehlgeschlagen sind
-                            delete_errors.append((file_path, "Datei konnte nicht gelöscht werden nach mehreren Versuchen"))
-                except Exception as e:
-                    error_msg = f"Konnte Datei {file_path} nicht löschen: {str(e)}"
-                    logger.warning(error_msg)
-                    delete_errors.append((file_path, error_msg))
-            
-            # Auch alle Unterordner löschen
-            if status_callback:
-                status_callback("Lösche alle Unterordner im Import-Ordner...")
-                
-            # Alle Unterordner finden und sortieren (tiefste zuerst)
-            all_dirs = []
-            for root, dirs, _ in os.walk(self.import_folder):
-                for dir_name in dirs:
-                    dir_path = os.path.join(root, dir_name)
-                    all_dirs.append(dir_path)
-            
-            # Sortiere Verzeichnisse nach Tiefe (tiefste zuerst)
-            all_dirs.sort(key=lambda x: x.count(os.sep), reverse=True)
-            
-            # Verzeichnisse löschen
-            for dir_path in all_dirs:
-                try:
-                    if os.path.exists(dir_path) and os.path.isdir(dir_path):
-                        # Mehrere Versuche mit kurzer Pause
-                        for attempt in range(3):
-                            try:
-                                os.rmdir(dir_path)  # Nur leere Verzeichnisse löschen
-                                logger.info(f"Verzeichnis gelöscht: {dir_path}")
-                                break
-                            except OSError as e:
-                                if "Directory not empty" in str(e):
-                                    # Verzeichnis ist nicht leer, Inhalt auflisten
-                                    remaining = os.listdir(dir_path)
-                                    logger.warning(f"Verzeichnis nicht leer: {dir_path}, enthält: {remaining}")
-                                    # Versuche, verbliebene Dateien zu löschen
-                                    for item in remaining:
-                                        item_path = os.path.join(dir_path, item)
-                                        try:
-                                            if os.path.isfile(item_path):
-                                                os.remove(item_path)
-                                            elif os.path.isdir(item_path):
-                                                # Rekursives Löschen für Unterverzeichnisse
-                                                shutil.rmtree(item_path, ignore_errors=True)
-                                        except Exception as inner_e:
-                                            logger.error(f"Fehler beim Löschen von {item_path}: {str(inner_e)}")
-                                    # Erneut versuchen, das Verzeichnis zu löschen
-                                    continue
-                                else:
-                                    # Andere Fehler
-                                    logger.error(f"Fehler beim Löschen von Verzeichnis {dir_path}: {str(e)}")
-                                    break
-                            except Exception as e:
-                                logger.error(f"Unerwarteter Fehler beim Löschen von Verzeichnis {dir_path}: {str(e)}")
-                                break
-                except Exception as e:
-                    logger.error(f"Fehler beim Löschen von Verzeichnis {dir_path}: {str(e)}")
-            
-            # Versuche auch, den Import-Ordner selbst zu leeren mit shutil.rmtree und neu zu erstellen
+            # Den gesamten Import-Ordner mit shutil.rmtree löschen und neu erstellen
             try:
                 # Sichere den Pfad
                 import_folder_path = self.import_folder
                 
-                # Lösche den gesamten Ordner mit shutil.rmtree
                 if os.path.exists(import_folder_path):
                     logger.info(f"Lösche kompletten Import-Ordner: {import_folder_path}")
-                    shutil.rmtree(import_folder_path, ignore_errors=True)
+                    if status_callback:
+                        status_callback(f"Entferne {files_deleted} Dateien aus dem Import-Ordner...")
+                    # Mehrere Versuche mit kurzer Pause (Windows: Dateien evtl. noch kurz gesperrt)
+                    for attempt in range(3):
+                        try:
+                            _fast_rmtree(import_folder_path)
+                            break
+                        except FileNotFoundError:
+                            break
+                        except PermissionError:
+                            time.sleep(0.1)
+                    else:
+                        error_msg = "Import-Ordner konnte nach mehreren Versuchen nicht vollständig gelöscht werden"
+                        logger.warning(error_msg)
+                        delete_errors.append((import_folder_path, error_msg))
+                        shutil.rmtree(import_folder_path, ignore_errors=True)
                 
                 # Erstelle den Ordner neu
                 os.makedirs(import_folder_path, exist_ok=True)
@@ -1223,93 +1602,49 @@ class DicomProcessor:
             if status_callback:
                 status_callback(f"Entferne {len(processed_files)} erfolgreich verarbeitete Dateien aus dem Import-Ordner...")
             
-            # Stellen sicher, dass alle DICOM-Objekte freigegeben sind
-            import gc
-            gc.collect()  # Garbage Collection erzwingen
-            
             files_deleted = 0
             delete_errors = []
             
-            for file_path in processed_files:
-                try:
-                    if os.path.exists(file_path):
-                        # Mehrere Versuche mit kurzer Pause
-                        for attempt in range(3):
-                            try:
-                                os.remove(file_path)
-                                files_deleted += 1
-                                if status_callback and files_deleted % 10 == 0:
-                                    status_callback(f"Gelöscht: {files_deleted}/{len(processed_files)} Dateien...")
-                                break
-                            except PermissionError:
-                                # Kurze Pause und erneuter Versuch
-                                time.sleep(0.1)
-                                continue
-                            except Exception as e:
-                                raise e
-                        else:
-                            # Wenn alle Versuche fehlgeschlagen sind
-                            delete_errors.append((file_path, "Datei konnte nicht gelöscht werden nach mehreren Versuchen"))
-                except Exception as e:
-                    error_msg = f"Konnte Datei {file_path} nicht löschen: {str(e)}"
+            # Löschen ist reine Metadaten-I/O - parallel deutlich schneller, v.a. auf Netzlaufwerken
+            try:
+                delete_workers = self.settings_manager.config.getint('General', 'delete_parallelism', fallback=DELETE_WORKERS)
+            except ValueError:
+                delete_workers = DELETE_WORKERS
+            for file_path, deleted, error_msg in _unlink_many(processed_files, delete_workers):
+                if deleted:
+                    files_deleted += 1
+                    if status_callback and files_deleted % 10 == 0:
+                        status_callback(f"Gelöscht: {files_deleted}/{len(processed_files)} Dateien...")
+                elif error_msg:
                     logger.warning(error_msg)
                     delete_errors.append((file_path, error_msg))
-        
-        # Leere Ordner im Import-Ordner entfernen
-        if status_callback:
-            status_callback("Räume leere Unterordner auf...")
             
-        try:
-            # Verwende rekursiven Ansatz von unten nach oben (topdown=False), um zuerst tiefere Ordner zu löschen
-            for root, dirs, files in os.walk(self.import_folder, topdown=False):
-                # Hauptimport-Ordner selbst nicht löschen, nur Unterordner
-                if root == self.import_folder:
-                    continue
-                    
-                # Wenn der aktuelle Ordner keine Dateien mehr hat, versuchen zu löschen
-                if not files and not dirs:  # Wenn keine Dateien und keine Unterordner mehr
-                    try:
-                        os.rmdir(root)
-                        logger.info(f"Leerer Ordner entfernt: {root}")
-                    except Exception as e:
-                        logger.warning(f"Konnte leeren Ordner {root} nicht entfernen: {str(e)}")
-                        
-                # Einzelne Unterordner versuchen zu löschen
-                for dir_name in dirs:
-                    dir_path = os.path.join(root, dir_name)
-                    if os.path.exists(dir_path) and not os.listdir(dir_path):  # Wenn Ordner existiert und leer ist
-                        try:
-                            os.rmdir(dir_path)
-                            logger.info(f"Leerer Ordner entfernt: {dir_path}")
-                        except Exception as e:
-                            logger.warning(f"Konnte leeren Ordner {dir_path} nicht entfernen: {str(e)}")
-        except Exception as e:
-            logger.warning(f"Fehler beim Aufräumen leerer Ordner: {str(e)}")
+            # Leere Ordner im Import-Ordner entfernen (nach rmtree oben gibt es keine)
+            if status_callback:
+                status_callback("Räume leere Unterordner auf...")
+                
+            try:
+                # Von unten nach oben, der Hauptimport-Ordner selbst bleibt bestehen
+                _remove_empty_dirs(self.import_folder)
+            except Exception as e:
+                logger.warning(f"Fehler beim Aufräumen leerer Ordner: {str(e)}")
         
         # Prüfe Weiterleitungsregeln für alle importierten Pläne
         try:
-            from rules_manager import RulesManager
-            rules_manager = RulesManager()
+            self.rules_manager.reload_if_changed()
             
             # Sammle alle erfolgreich importierten Plan-Ordner
             imported_plan_folders = []
             for plan_file_path in plan_files:
                 try:
-                    plan_ds = file_data[plan_file_path]['ds']
-                    patient_id = getattr(plan_ds, "PatientID", "unknown")
-                    patient_name = getattr(plan_ds, "PatientName", "unknown")
-                    plan_name = getattr(plan_ds, "RTPlanLabel", "unknown")
-                    study_id = getattr(plan_ds, "StudyInstanceUID", "unknown").split('.')[-1]
-                    safe_patient_name = self.sanitize_path_component(patient_name)
-                    safe_patient_id = self.sanitize_path_component(patient_id)
-                    safe_plan_name = self.sanitize_path_component(plan_name)
-                    safe_study_id = self.sanitize_path_component(study_id)
+                    plan_data = file_data[plan_file_path]
+                    plan_ds = plan_data['ds']
+                    plan_name = plan_data['rtplan_label']
                     
-                    # Pfad zum Plan-Ordner
-                    patient_folder = os.path.join(self.watch_folder, f"{safe_patient_name} ({safe_patient_id})")
-                    plan_folder = os.path.join(patient_folder, f"{safe_plan_name}_{safe_study_id}")
+                    # Pfad zum Plan-Ordner (beim Import bereits bestimmt)
+                    plan_folder = plan_folders_created.get(plan_file_path)
                     
-                    if os.path.exists(plan_folder):
+                    if plan_folder and os.path.exists(plan_folder):
                         # Bestimme den AE-Titel der Quelle (bei Import-Ordner ist dies meist unbekannt)
                         source_ae = getattr(plan_ds, "SourceApplicationEntityTitle", "IMPORT_FOLDER")
                         if not source_ae or source_ae == "UNKNOWN":
@@ -1324,39 +1659,15 @@ class DicomProcessor:
                 except Exception as e:
                     logger.error(f"Fehler beim Sammeln von Plan-Informationen für Weiterleitungsregeln: {str(e)}")
             
-            # Prüfe Weiterleitungsregeln für jeden importierten Plan
-            forwarded_plans = 0
-            if status_callback:
-                status_callback("Prüfe Weiterleitungsregeln für importierte Pläne...")
-                
+            # Weiterleitungsregeln im Hintergrund prüfen und senden - der Import ist hier fertig,
+            # Pläne an verschiedene Knoten werden parallel gesendet
+            if imported_plan_folders and status_callback:
+                status_callback(f"Prüfe Weiterleitungsregeln für {len(imported_plan_folders)} importierte Pläne im Hintergrund...")
+            # Der Plan-Ordner gilt bis zum Ende der Weiterleitung als belegt (siehe delete_plan_files)
             for plan_folder, plan_name, source_ae in imported_plan_folders:
-                try:
-                    logger.info(f"Prüfe Weiterleitungsregeln für Plan {plan_name} von {source_ae}")
-                    target_nodes = rules_manager.check_forwarding_rules(source_ae, plan_name, self.settings_manager)
-                    
-                    if target_nodes:
-                        logger.info(f"Plan {plan_name} entspricht {len(target_nodes)} Weiterleitungsregeln")
-                        for node_name, node_info in target_nodes:
-                            try:
-                                if status_callback:
-                                    status_callback(f"Leite Plan {plan_name} an {node_name} weiter...")
-                                    
-                                logger.info(f"Leite Plan {plan_name} an {node_name} weiter")
-                                success = self.send_plan_to_node(plan_folder, node_info)
-                                if success:
-                                    logger.info(f"Plan {plan_name} erfolgreich an {node_name} weitergeleitet")
-                                    forwarded_plans += 1
-                                else:
-                                    logger.error(f"Fehler beim Weiterleiten von Plan {plan_name} an {node_name}")
-                            except Exception as e:
-                                logger.error(f"Fehler beim Weiterleiten von Plan {plan_name} an {node_name}: {str(e)}")
-                    else:
-                        logger.info(f"Keine passenden Weiterleitungsregeln für Plan {plan_name} von {source_ae} gefunden")
-                except Exception as e:
-                    logger.error(f"Fehler beim Prüfen der Weiterleitungsregeln für Plan {plan_name}: {str(e)}")
-            
-            if forwarded_plans > 0 and status_callback:
-                status_callback(f"{forwarded_plans} Pläne gemäß Weiterleitungsregeln gesendet")
+                self._begin_forward(plan_folder)
+                future = self._forward_executor.submit(self._forward_plan, plan_folder, plan_name, source_ae, status_callback)
+                future.add_done_callback(lambda _future, folder=plan_folder: self._end_forward(folder))
                 
         except Exception as e:
             logger.error(f"Fehler beim Initialisieren des RulesManager: {str(e)}")
@@ -1368,6 +1679,61 @@ class DicomProcessor:
             return True, processed, f"{processed} Dateien importiert ({files_deleted} entfernt), {failed} fehlgeschlagen"
         return True, processed, f"{processed} Dateien erfolgreich importiert, {files_deleted} Dateien entfernt"
     
+    def _begin_forward(self, plan_folder):
+        """Markiert einen Plan-Ordner als in Weiterleitung"""
+        with self._forwards_lock:
+            self._forwards_in_flight[os.path.normcase(os.path.abspath(plan_folder))] += 1
+    
+    def _end_forward(self, plan_folder):
+        """Gibt einen Plan-Ordner nach der Weiterleitung wieder frei"""
+        key = os.path.normcase(os.path.abspath(plan_folder))
+        with self._forwards_lock:
+            self._forwards_in_flight[key] -= 1
+            if self._forwards_in_flight[key] <= 0:
+                del self._forwards_in_flight[key]
+    
+    def is_forward_in_flight(self, plan_path):
+        """Gibt zurück, ob ein Plan-Ordner gerade weitergeleitet wird und daher nicht gelöscht werden darf"""
+        with self._forwards_lock:
+            return self._forwards_in_flight[os.path.normcase(os.path.abspath(plan_path))] > 0
+    
+    def _forward_plan(self, plan_folder, plan_name, source_ae, status_callback=None):
+        """Prüft die Weiterleitungsregeln für einen Plan-Ordner und sendet ihn an alle passenden Knoten
+        
+        Returns:
+            int: Anzahl erfolgreicher Weiterleitungen
+        """
+        forwarded = 0
+        try:
+            logger.info(f"Prüfe Weiterleitungsregeln für Plan {plan_name} von {source_ae}")
+            target_nodes = self.rules_manager.check_forwarding_rules(source_ae, plan_name, self.settings_manager)
+            
+            if not target_nodes:
+                logger.info(f"Keine passenden Weiterleitungsregeln für Plan {plan_name} von {source_ae} gefunden")
+                return forwarded
+            
+            logger.info(f"Plan {plan_name} entspricht {len(target_nodes)} Weiterleitungsregeln")
+            for node_name, node_info in target_nodes:
+                try:
+                    if status_callback:
+                        status_callback(f"Leite Plan {plan_name} an {node_name} weiter...")
+                        
+                    logger.info(f"Leite Plan {plan_name} an {node_name} weiter")
+                    success = self.send_plan_to_node(plan_folder, node_info)
+                    if success:
+                        logger.info(f"Plan {plan_name} erfolgreich an {node_name} weitergeleitet")
+                        forwarded += 1
+                    else:
+                        logger.error(f"Fehler beim Weiterleiten von Plan {plan_name} an {node_name}")
+                except Exception as e:
+                    logger.error(f"Fehler beim Weiterleiten von Plan {plan_name} an {node_name}: {str(e)}")
+            
+            if forwarded > 0 and status_callback:
+                status_callback(f"Plan {plan_name} gemäß Weiterleitungsregeln an {forwarded} Knoten gesendet")
+        except Exception as e:
+            logger.error(f"Fehler beim Prüfen der Weiterleitungsregeln für Plan {plan_name}: {str(e)}")
+        return forwarded
+
     def send_plan_to_node(self, plan_path, node_info, progress_callback=None, delete_after=False):
         """Sendet einen Plan an einen DICOM-Knoten
         
@@ -1388,21 +1754,16 @@ class DicomProcessor:
                 logger.warning(f"Keine DICOM-Dateien im Ordner {plan_path} gefunden")
                 return False
             
-            # Alle Dateien in einer Liste zusammenfassen, nach Modalität sortiert
-            ordered_files = []
-            
-            # Bekannte Modalitäten in definierter Reihenfolge
-            for modality in ["CT", "RTSTRUCT", "RTPLAN", "RTDOSE"]:
-                if modality in dicom_files_by_modality:
-                    ordered_files.extend(dicom_files_by_modality[modality])
-                    del dicom_files_by_modality[modality]
-            
-            # Alle anderen Modalitäten hinzufügen
-            for modality, files in dicom_files_by_modality.items():
-                ordered_files.extend(files)
+            # Alle Dateien in einer Liste zusammenfassen, nach Modalität sortiert:
+            # bekannte Modalitäten in definierter Reihenfolge, danach alle anderen
+            priority = ("CT", "RTSTRUCT", "RTPLAN", "RTDOSE")
+            ordered_modalities = list(priority) + [m for m in dicom_files_by_modality if m not in priority]
+            ordered_files = [(file_path, modality, ds)
+                             for modality in ordered_modalities
+                             for file_path, ds in dicom_files_by_modality.get(modality, ())]
             
             # Alle Dateien in einer einzigen Association senden
-            return self.send_all_dicom_files(
+            success = self.send_all_dicom_files(
                 ordered_files, 
                 node_info,
                 folder_name=os.path.basename(plan_path),
@@ -1410,48 +1771,70 @@ class DicomProcessor:
                 delete_after=delete_after
             )
             
+            # Nach erfolgreichem Senden auch den (jetzt leeren) Plan-Ordner entfernen
+            if delete_after and success:
+                self.delete_plan_files(plan_path)
+                
+            return success
+            
         except Exception as e:
             logger.error(f"Fehler beim Senden des Plans {plan_path}: {str(e)}")
             return False
     
-    def send_all_dicom_files(self, file_dataset_pairs, node_info, folder_name="", 
-                           progress_callback=None, delete_after=False):
+    def _get_send_ae(self):
+        """Gibt die Application Entity für ausgehende Associations zurück
+        
+        Einmal aufgebaut und danach wiederverwendet - neu nur, wenn der lokale AE-Titel in den Einstellungen geändert wurde.
+        """
+        local_ae_title = self.settings_manager.config.get('LocalNode', 'AET', fallback='DICOM-RT-KAFFEE')
+        with self._send_ae_lock:
+            if self._send_ae is None or self._send_ae_title != local_ae_title:
+                logger.info(f"Verwende lokalen AE Title: {local_ae_title}")
+                ae = AE(ae_title=local_ae_title.encode('ascii'))
+                
+                # Kontext für alle Storage SOP Classes hinzufügen (KORREKT!)
+                ae.add_requested_context(CTImageStorage)
+                ae.add_requested_context(RTStructureSetStorage)
+                ae.add_requested_context(RTPlanStorage)
+                ae.add_requested_context(RTDoseStorage)
+                ae.add_requested_context(RTIonPlanStorage)
+                ae.add_requested_context(RTBeamsTreatmentRecordStorage)
+                ae.add_requested_context(RTIonBeamsTreatmentRecordStorage)
+                # Private RTPLAN UID (z.B. Brainlab/SIEMENS)
+                ae.add_requested_context(MyPrivateRTPlanStorage, [ExplicitVRLittleEndian, ImplicitVRLittleEndian])
+                self._send_ae = ae
+                self._send_ae_title = local_ae_title
+            return self._send_ae
+
+    def send_all_dicom_files(self, file_entries, node_info, folder_name="", 
+                           progress_callback=None, delete_after=False, move_failed=False):
         """Sendet alle DICOM-Dateien in einer einzigen Association
         
         Args:
-            file_dataset_pairs (list): Liste von (Dateipfad, Dataset)-Paaren
+            file_entries (list): Liste von (Dateipfad, Modalität, Header-Dataset oder None)
             node_info (dict): Informationen zum Zielknoten
             folder_name (str): Name des Quellordners für Logging
             progress_callback (callable): Funktion für Fortschrittsmeldungen
             delete_after (bool): Dateien nach erfolgreichem Senden löschen (nur wenn letzter Node)
+            move_failed (bool): Nicht gesendete Dateien in den Failed-Ordner verschieben. Für Plan-Ordner
+                aus dem Archiv aus - bei nicht erreichbarem Ziel bleibt der Plan vollständig liegen
             
         Returns:
             bool: True wenn alle Dateien erfolgreich gesendet wurden, sonst False
         """
-        if not file_dataset_pairs:
+        if not file_entries:
             return True
             
-        file_count = len(file_dataset_pairs)
+        file_count = len(file_entries)
         success_count = 0
         failed_files = []
         
-        # Statistik nach Modalität
-        modality_stats = {}
+        # Statistik nach Modalität - vorab zählen, in der Schleife nur noch Erfolge
+        modality_totals = Counter(modality for _, modality, _ in file_entries)
+        modality_success = Counter()
         
         try:
-            # Application Entity erstellen
-            ae = AE(ae_title=b"DICOM-RT-KAFFEE")
-
-            # Kontext für alle Storage SOP Classes hinzufügen (KORREKT!)
-            ae.add_requested_context(CTImageStorage)
-            ae.add_requested_context(RTStructureSetStorage)
-            ae.add_requested_context(RTPlanStorage)
-            ae.add_requested_context(RTDoseStorage)
-            ae.add_requested_context(RTIonPlanStorage)
-            ae.add_requested_context(RTBeamsTreatmentRecordStorage)
-            ae.add_requested_context(RTIonBeamsTreatmentRecordStorage)
-            # Private RTPLAN UID (z.B. Brainlab/SIEMENS)
-            ae.add_requested_context(MyPrivateRTPlanStorage, [ExplicitVRLittleEndian, ImplicitVRLittleEndian])
+            ae = self._get_send_ae()
             
             # Eine einzige Association für alle Dateien herstellen
             target_aet = node_info.get('aet', 'ANY-SCP')
@@ -1462,48 +1845,35 @@ class DicomProcessor:
             assoc = ae.associate(target_ip, target_port, ae_title=target_aet.encode('ascii'))
             
             if assoc.is_established:
+                info_enabled = logger.isEnabledFor(logging.INFO)
                 # Alle Datasets in einer einzigen Association senden
-                for i, (file_path, ds) in enumerate(file_dataset_pairs):
+                for i, (file_path, modality, ds) in enumerate(file_entries):
                     try:
-                        modality = getattr(ds, 'Modality', 'UNKNOWN')
-                        
-                        # Statistik für diese Modalität aktualisieren
-                        if modality not in modality_stats:
-                            modality_stats[modality] = {'total': 0, 'success': 0}
-                        modality_stats[modality]['total'] += 1
-                        
                         # Fortschritt melden
                         if progress_callback:
                             progress_callback(i + 1, file_count)
                         
                         # Detaillierten Fortschritt nur für non-CT oder in Intervallen für CT ausgeben
-                        if modality != "CT" or i % 10 == 0:
-                            logger.info(f"Sende {modality}-Datei {i+1}/{file_count}: {os.path.basename(file_path)}")
+                        if info_enabled and (modality != "CT" or i % 10 == 0):
+                            logger.info("Sende %s-Datei %d/%d: %s", modality, i + 1, file_count, os.path.basename(file_path))
                         
-                        # Dataset senden - für RTDOSE und CT prüfen, ob PixelData vorhanden ist
-                        if modality in ["RTDOSE", "CT"]:
-                            if hasattr(ds, 'PixelData'):
-                                pixel_data_size = len(ds.PixelData)
-                                logger.info(f"Sende {modality} mit PixelData: {pixel_data_size} Bytes")
-                            else:
-                                logger.warning(f"{modality} ohne PixelData wird gesendet: {os.path.basename(file_path)}")
-                                # Versuchen, die Datei neu zu laden, falls PixelData fehlt
-                                try:
-                                    logger.info(f"Versuche {modality} neu zu laden mit Pixel-Daten")
-                                    ds_full = pydicom.dcmread(file_path, force=True, stop_before_pixels=False)
-                                    if hasattr(ds_full, 'PixelData'):
-                                        ds = ds_full  # Ersetze das Dataset mit dem vollständigen
-                                        logger.info(f"Erfolgreich {modality} mit PixelData neu geladen")
-                                except Exception as e:
-                                    logger.error(f"Fehler beim Nachladen von {modality}: {str(e)}")
-                                    # Weiter mit dem ursprünglichen Dataset
-                        
-                        # Dataset senden
-                        status = assoc.send_c_store(ds)
+                        # Nicht-standardmäßige RT-Plan SOP Class UID (z.B. anonymisierte Pläne) korrigieren -
+                        # nur dafür wird die Datei vollständig gelesen
+                        if modality == "RTPLAN" and ds is not None and _tag_value(ds, SOP_CLASS_UID_TAG, None) == MyPrivateRTPlanStorage:
+                            logger.info(f"Korrigiere nicht-standardmäßige RT-Plan SOP Class UID in {os.path.basename(file_path)}")
+                            ds_full = _dcmread(file_path)
+                            ds_full.SOPClassUID = RTPlanStorage
+                            if getattr(ds_full, 'file_meta', None) is not None:
+                                ds_full.file_meta.MediaStorageSOPClassUID = ds_full.SOPClassUID
+                            status = assoc.send_c_store(ds_full)
+                        else:
+                            # Datei direkt vom Pfad senden - der gescannte Header enthält keine PixelData,
+                            # pynetdicom liest die vollständige Datei (jede Modalität, inkl. MR/PT/RTIMAGE)
+                            status = assoc.send_c_store(file_path)
                         
                         if status and status.Status == 0x0000:  # Erfolg
                             success_count += 1
-                            modality_stats[modality]['success'] += 1
+                            modality_success[modality] += 1
                             
                             # Datei nach erfolgreicher Übertragung löschen, wenn gewünscht
                             # (nur wenn es der letzte Knoten ist)
@@ -1526,68 +1896,29 @@ class DicomProcessor:
                 
                 # Erfolgsstatistik ausgeben
                 logger.info(f"Übertragung abgeschlossen: {success_count} von {file_count} Dateien erfolgreich gesendet aus {folder_name}")
-                for modality, stats in modality_stats.items():
-                    logger.info(f"  - {modality}: {stats['success']} von {stats['total']} erfolgreich")
+                for modality, total in modality_totals.items():
+                    logger.info(f"  - {modality}: {modality_success[modality]} von {total} erfolgreich")
                     
             else:
                 error_msg = f"Verbindung zu {target_aet} konnte nicht hergestellt werden"
                 logger.error(error_msg)
                 # Alle Dateien als fehlgeschlagen markieren
-                failed_files = [(file_path, error_msg) for file_path, _ in file_dataset_pairs]
+                failed_files = [(file_path, error_msg) for file_path, _, _ in file_entries]
             
         except Exception as e:
             error_msg = f"Übertragungsfehler: {str(e)}"
             logger.error(error_msg)
             # Alle übrigen Dateien als fehlgeschlagen markieren
-            failed_files = [(file_path, error_msg) for file_path, _ in file_dataset_pairs]
+            failed_files = [(file_path, error_msg) for file_path, _, _ in file_entries]
         
-        # Fehlgeschlagene Dateien in den Failed-Ordner verschieben
-        for file_path, error_msg in failed_files:
-            self.move_to_failed(file_path, error_msg)
+        # Fehlgeschlagene Dateien nur auf Wunsch in den Failed-Ordner verschieben
+        if move_failed:
+            for file_path, error_msg in failed_files:
+                self.move_to_failed(file_path, error_msg)
         
         # Erfolg, wenn alle Dateien gesendet wurden
         return success_count == file_count
     
-    def send_plan_to_node(self, plan_path, node_info, delete_after=False):
-        """Sendet einen Plan an einen DICOM-Knoten
-        
-        Args:
-            plan_path (str): Pfad zum Plan-Ordner
-            node_info (dict): Informationen zum Zielknoten
-            delete_after (bool): Ob die Dateien nach dem Senden gelöscht werden sollen
-            
-        Returns:
-            bool: True bei Erfolg, False bei Fehler
-        """
-        try:
-            logger.info(f"Sende Plan {os.path.basename(plan_path)} an {node_info.get('name')}")
-            
-            # Alle DICOM-Dateien im Plan-Ordner finden
-            dicom_files = []
-            for root, _, files in os.walk(plan_path):
-                for file in files:
-                    if file.lower().endswith('.dcm'):
-                        dicom_files.append(os.path.join(root, file))
-            
-            if not dicom_files:
-                logger.error(f"Keine DICOM-Dateien im Plan-Ordner gefunden: {plan_path}")
-                return False
-            
-            # Dateien nach Modalität sortieren (CT, RTSTRUCT, RTPLAN, RTDOSE)
-            sorted_files = self._sort_files_by_modality(dicom_files)
-            
-            # Dateien an den Knoten senden
-            success = self._send_files_to_node(sorted_files, node_info)
-            
-            # Dateien löschen, wenn gewünscht und erfolgreich gesendet
-            if delete_after and success:
-                self.delete_plan_files(plan_path)
-                
-            return success
-        except Exception as e:
-            logger.error(f"Fehler beim Senden des Plans {plan_path}: {str(e)}")
-            return False
-    
     def delete_plan_files(self, plan_path):
         """Löscht alle Dateien eines Plans
         
@@ -1597,249 +1928,17 @@ class DicomProcessor:
         Returns:
             bool: True bei Erfolg, False bei Fehler
         """
+        if self.is_forward_in_flight(plan_path):
+            logger.warning(f"Plan-Dateien werden nicht gelöscht, Weiterleitung läuft noch: {plan_path}")
+            return False
         try:
             logger.info(f"Lösche Plan-Dateien: {plan_path}")
             
-            # Alle Dateien im Plan-Ordner löschen
-            for root, dirs, files in os.walk(plan_path, topdown=False):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    os.remove(file_path)
-                    logger.debug(f"Datei gelöscht: {file_path}")
-                
-                # Leere Unterverzeichnisse löschen
-                for dir in dirs:
-                    dir_path = os.path.join(root, dir)
-                    try:
-                        os.rmdir(dir_path)
-                        logger.debug(f"Verzeichnis gelöscht: {dir_path}")
-                    except OSError:
-                        # Verzeichnis ist nicht leer, ignorieren
-                        pass
-            
-            # Hauptverzeichnis löschen
-            try:
-                os.rmdir(plan_path)
-                logger.info(f"Plan-Verzeichnis gelöscht: {plan_path}")
-            except OSError as e:
-                logger.warning(f"Plan-Verzeichnis konnte nicht gelöscht werden: {plan_path} - {str(e)}")
+            # Plan-Ordner samt Inhalt löschen
+            _fast_rmtree(plan_path)
+            logger.info(f"Plan-Verzeichnis gelöscht: {plan_path}")
             
             return True
         except Exception as e:
             logger.error(f"Fehler beim Löschen der Plan-Dateien {plan_path}: {str(e)}")
             return False
-    
-    def _sort_files_by_modality(self, file_list):
-        """Sortiert DICOM-Dateien nach Modalität für optimale Sendreihenfolge
-        
-        Args:
-            file_list (list): Liste von DICOM-Dateipfaden
-            
-        Returns:
-            list: Sortierte Liste von Dateipfaden
-        """
-        # Modalitätsreihenfolge definieren, falls nicht vorhanden
-        if not hasattr(self, 'modality_order'):
-            self.modality_order = {
-                'CT': 1,       # CT zuerst senden
-                'RTSTRUCT': 2, # Dann Strukturen
-                'RTPLAN': 3,   # Dann Pläne
-                'RTDOSE': 4,   # Dann Dosen
-                'RTIMAGE': 5    # Dann Bilder
-            }
-            
-        file_modality_map = []
-        
-        for file_path in file_list:
-            try:
-                ds = pydicom.dcmread(file_path, force=True, stop_before_pixels=True)
-                modality = getattr(ds, "Modality", "UNKNOWN")
-                order = self.modality_order.get(modality, 99)  # Unbekannte Modalitäten am Ende
-                file_modality_map.append((file_path, order))
-            except Exception:
-                # Bei Fehler: Datei am Ende einordnen
-                file_modality_map.append((file_path, 100))
-        
-        # Nach Modalitätsreihenfolge sortieren
-        file_modality_map.sort(key=lambda x: x[1])
-        
-        # Nur die Dateipfade zurückgeben
-        return [item[0] for item in file_modality_map]
-        
-    def _send_files_to_node(self, file_list, node_info, progress_callback=None):
-        """Sendet eine Liste von DICOM-Dateien an einen DICOM-Knoten
-        
-        Args:
-            file_list (list): Liste von DICOM-Dateipfaden
-            node_info (dict): Informationen zum Zielknoten
-            progress_callback (callable, optional): Callback-Funktion für Fortschrittsanzeige
-            
-        Returns:
-            bool: True bei Erfolg, False bei Fehler
-        """
-        if not file_list:
-            logger.error("Keine Dateien zum Senden angegeben")
-            return False
-            
-        try:
-            # DICOM-Verbindungsparameter aus node_info extrahieren
-            ae_title = node_info.get('aet', 'UNKNOWN')
-            ip = node_info.get('ip', '127.0.0.1')
-            port = int(node_info.get('port', 104))
-            
-            logger.info(f"Verbinde mit DICOM-Knoten {ae_title}@{ip}:{port}")
-            
-            # DICOM-Verbindung aufbauen
-            from pynetdicom import AE, StoragePresentationContexts
-            from pynetdicom.sop_class import CTImageStorage, RTDoseStorage, RTPlanStorage, RTStructureSetStorage
-            
-            # Application Entity mit unserem AE Title erstellen
-            local_ae_title = self.settings_manager.config.get('LocalNode', 'AET', fallback='DICOM-RT-KAFFEE')
-            logger.info(f"Verwende lokalen AE Title: {local_ae_title}")
-            ae = AE(ae_title=local_ae_title.encode('ascii'))
-            
-            # Storage SOP Classes hinzufügen
-            ae.requested_contexts = StoragePresentationContexts
-            
-            # Verbindung herstellen (ae_title ist der Remote/Called AE Title)
-            assoc = ae.associate(ip, port, ae_title=ae_title)
-            
-            if not assoc.is_established:
-                logger.error(f"Verbindung zu {ae_title}@{ip}:{port} konnte nicht hergestellt werden")
-                return False
-                
-            # Dateien senden
-            success_count = 0
-            file_count = len(file_list)
-            failed_ct_count = 0  # Zähler für fehlgeschlagene CT-Dateien
-            
-            for i, file_path in enumerate(file_list):
-                try:
-                    # Fortschritt melden, wenn Callback vorhanden
-                    if progress_callback:
-                        progress_callback(i, file_count)
-                        
-                    # DICOM-Datei laden - mit file_meta erhalten
-                    ds = pydicom.dcmread(file_path, force=True)
-                    
-                    # Spezielle Logs für RTDOSE-Dateien
-                    is_rtdose = hasattr(ds, 'Modality') and ds.Modality == 'RTDOSE'
-                    if is_rtdose:
-                        logger.info(f"=== RTDOSE HEADER DEBUG für {os.path.basename(file_path)} ===")
-                        logger.info(f"Ursprüngliche file_meta vorhanden: {hasattr(ds, 'file_meta') and ds.file_meta is not None}")
-                        if hasattr(ds, 'file_meta') and ds.file_meta:
-                            logger.info(f"TransferSyntaxUID vorhanden: {hasattr(ds.file_meta, 'TransferSyntaxUID')}")
-                            if hasattr(ds.file_meta, 'TransferSyntaxUID'):
-                                logger.info(f"TransferSyntaxUID Wert: {ds.file_meta.TransferSyntaxUID}")
-                            logger.info(f"MediaStorageSOPClassUID vorhanden: {hasattr(ds.file_meta, 'MediaStorageSOPClassUID')}")
-                            logger.info(f"MediaStorageSOPInstanceUID vorhanden: {hasattr(ds.file_meta, 'MediaStorageSOPInstanceUID')}")
-                            # Alle 0002-Tags auflisten
-                            meta_elements = [elem for elem in ds.file_meta if elem.tag.group == 0x0002]
-                            logger.info(f"Anzahl 0002-Tags in file_meta: {len(meta_elements)}")
-                            for elem in meta_elements:
-                                logger.info(f"  {elem.tag}: {elem.keyword} = {elem.value}")
-                        else:
-                            logger.info("Keine file_meta-Informationen gefunden")
-                    
-                    # Originale file_meta aus der Datei lesen, falls nicht vorhanden
-                    if not hasattr(ds, 'file_meta') or not ds.file_meta or not hasattr(ds.file_meta, 'TransferSyntaxUID'):
-                        if is_rtdose:
-                            logger.info("Versuche file_meta aus Datei zu rekonstruieren...")
-                        # Versuche, die Datei erneut zu lesen, um file_meta zu erhalten
-                        try:
-                            with open(file_path, 'rb') as f:
-                                # Lese die ersten 132 Bytes (DICOM Preamble + DICM)
-                                preamble = f.read(132)
-                                if preamble[128:132] == b'DICM':
-                                    if is_rtdose:
-                                        logger.info("DICM-Marker gefunden, lese file_meta...")
-                                    # Lese file_meta explizit
-                                    ds_with_meta = pydicom.dcmread(file_path, force=True, defer_size=None)
-                                    if hasattr(ds_with_meta, 'file_meta') and ds_with_meta.file_meta:
-                                        ds.file_meta = ds_with_meta.file_meta
-                                        if is_rtdose:
-                                            logger.info(f"File meta aus Datei {os.path.basename(file_path)} wiederhergestellt")
-                                            # Erneut alle 0002-Tags auflisten
-                                            meta_elements = [elem for elem in ds.file_meta if elem.tag.group == 0x0002]
-                                            logger.info(f"Nach Wiederherstellung - Anzahl 0002-Tags: {len(meta_elements)}")
-                                            for elem in meta_elements:
-                                                logger.info(f"  {elem.tag}: {elem.keyword} = {elem.value}")
-                                        else:
-                                            logger.debug(f"File meta aus Datei {os.path.basename(file_path)} wiederhergestellt")
-                                    else:
-                                        if is_rtdose:
-                                            logger.info("Keine file_meta in ds_with_meta gefunden")
-                                else:
-                                    if is_rtdose:
-                                        logger.info("Kein DICM-Marker gefunden")
-                        except Exception as e:
-                            if is_rtdose:
-                                logger.info(f"Fehler beim Lesen der file_meta: {str(e)}")
-                            else:
-                                logger.debug(f"Konnte file_meta nicht aus {os.path.basename(file_path)} lesen: {str(e)}")
-                            pass
-                    
-                    # Stelle sicher, dass file_meta vorhanden und korrekt ist
-                    if not hasattr(ds, 'file_meta') or not ds.file_meta:
-                        ds.file_meta = pydicom.dataset.FileMetaDataset()
-                    
-                    # Transfer Syntax UID setzen, falls nicht vorhanden
-                    if not hasattr(ds.file_meta, 'TransferSyntaxUID') or not ds.file_meta.TransferSyntaxUID:
-                        from pydicom.uid import ImplicitVRLittleEndian
-                        ds.file_meta.TransferSyntaxUID = ImplicitVRLittleEndian
-                        logger.debug(f"Transfer Syntax UID für {os.path.basename(file_path)} gesetzt")
-                    
-                    # Media Storage SOP Class UID setzen
-                    if hasattr(ds, 'SOPClassUID'):
-                        ds.file_meta.MediaStorageSOPClassUID = ds.SOPClassUID
-                    
-                    # Media Storage SOP Instance UID setzen
-                    if hasattr(ds, 'SOPInstanceUID'):
-                        ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
-                    
-                    # Implementation Class UID setzen
-                    if not hasattr(ds.file_meta, 'ImplementationClassUID') or not ds.file_meta.ImplementationClassUID:
-                        ds.file_meta.ImplementationClassUID = '1.2.276.0.7230010.3.0.3.6.4'  # pydicom UID
-                    
-                    # Implementation Version Name setzen
-                    if not hasattr(ds.file_meta, 'ImplementationVersionName') or not ds.file_meta.ImplementationVersionName:
-                        ds.file_meta.ImplementationVersionName = 'PYDICOM'
-                    
-                    # Prüfen und korrigieren der SOP Class UID, falls es sich um einen anonymisierten RT-Plan handelt
-                    if hasattr(ds, 'SOPClassUID') and ds.SOPClassUID == '1.2.246.352.70.1.70':
-                        logger.info(f"Korrigiere nicht-standardmäßige RT-Plan SOP Class UID in {os.path.basename(file_path)}")
-                        ds.SOPClassUID = '1.2.840.10008.5.1.4.1.1.481.5'  # Standard RT-Plan SOP Class UID
-                        ds.file_meta.MediaStorageSOPClassUID = ds.SOPClassUID
-                    
-                    # C-STORE Request senden
-                    status = assoc.send_c_store(ds)
-                    
-                    if status and status.Status == 0:
-                        success_count += 1
-                        logger.debug(f"Datei {os.path.basename(file_path)} erfolgreich gesendet")
-                    else:
-                        status_code = status.Status if status else "unbekannt"
-                        # Für CT-Dateien: nur ersten Fehler loggen, dann zählen
-                        if hasattr(ds, 'Modality') and ds.Modality == 'CT':
-                            failed_ct_count += 1
-                            if failed_ct_count == 1:
-                                logger.error(f"Fehler beim Senden von CT-Dateien - Status: {status_code} (weitere CT-Fehler werden nur gezählt)")
-                        else:
-                            logger.error(f"Fehler beim Senden: {os.path.basename(file_path)} - Status: {status_code}")
-                        
-                except Exception as e:
-                    logger.error(f"Fehler beim Senden der DICOM-Datei {os.path.basename(file_path)}: {str(e)}")
-            
-            # Verbindung beenden
-            assoc.release()
-            
-            # Zusammenfassung für CT-Fehler
-            if failed_ct_count > 1:
-                logger.error(f"Insgesamt {failed_ct_count} CT-Dateien konnten nicht gesendet werden")
-            
-            # Erfolg, wenn alle Dateien gesendet wurden
-            return success_count == file_count
-            
-        except Exception as e:
-            logger.error(f"Fehler beim Senden der Dateien an {node_info.get('name', 'unbekannt')}: {str(e)}")
-            return False
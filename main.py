@@ -1048,6 +1048,11 @@ class MainWindow(QMainWindow):
             self.progress_bar.setValue(i + 1)
             QApplication.processEvents()  # Allow UI updates
             
+            if self.dicom_processor.is_forward_in_flight(plan_path):
+                logger.warning(f"Plan {plan_name} is still being forwarded, not deleted")
+                failed_plans.append((plan_name, "Forwarding still in progress"))
+                continue
+            
             try:
                 import shutil
                 if os.path.exists(plan_path):
@@ -1140,6 +1145,11 @@ class MainWindow(QMainWindow):
             self.progress_bar.setValue(i + 1)
             QApplication.processEvents()  # UI-Updates zulassen
             
+            if self.dicom_processor.is_forward_in_flight(plan_path):
+                logger.warning(f"Plan {plan_name} wird noch weitergeleitet, nicht gelöscht")
+                failed_plans.append((plan_name, "Weiterleitung läuft noch"))
+                continue
+            
             try:
                 import shutil
                 if os.path.exists(plan_path):
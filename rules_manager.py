@@ -10,6 +10,7 @@ Verwaltet Regeln für die automatische Weiterleitung von DICOM-Daten.
 import os
 import configparser
 import logging
+import threading
 
 logger = logging.getLogger("DICOM-Rules")
 
@@ -20,17 +21,21 @@ class RulesManager:
         """Initialisiert den RulesManager."""
         self.config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.ini')
         self.config = configparser.ConfigParser()
+        self.config_mtime = None
+        self._reload_lock = threading.Lock()
         self.create_default_rules_file()
         self.load_config()
     
-    def create_default_rules_file(self):
-        """Erstellt eine Default-rules.ini, falls sie fehlt."""
+    def create_default_rules_file(self, config=None):
+        """Erstellt eine Default-rules.ini, falls sie fehlt (in config, sonst self.config)."""
+        if config is None:
+            config = self.config
         if not os.path.exists(self.config_file):
-            self.config['General'] = {
+            config['General'] = {
                 'rules_enabled': 'False'
             }
             
-            self.config['Rule1'] = {
+            config['Rule1'] = {
                 'name': 'Beispiel-Regel',
                 'enabled': 'False',
                 'source_ae': 'TESTAE',
@@ -39,7 +44,7 @@ class RulesManager:
             }
             
             # Spezielle Regel für den Import-Ordner
-            self.config['Rule2'] = {
+            config['Rule2'] = {
                 'name': 'Import-Ordner Regel',
                 'enabled': 'True',  # Standardmäßig aktiviert
                 'source_ae': 'IMPORT_FOLDER',  # Spezieller AE-Titel für den Import-Ordner
@@ -48,7 +53,7 @@ class RulesManager:
             }
             
             with open(self.config_file, 'w') as configfile:
-                self.config.write(configfile)
+                config.write(configfile)
             
             logger.info(f"Default-Rules-Datei erstellt: {self.config_file}")
     
@@ -59,6 +64,34 @@ class RulesManager:
         
         # Stelle sicher, dass die IMPORT_FOLDER-Regel vorhanden ist
         self.ensure_import_folder_rule()
+        self.config_mtime = self.get_config_mtime()
+    
+    def get_config_mtime(self):
+        """Gibt den Änderungszeitpunkt der rules.ini zurück (None, wenn sie fehlt)."""
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload_if_changed(self):
+        """Lädt die rules.ini neu, wenn sie seit dem letzten Laden/Speichern geändert wurde.
+        
+        Returns:
+            bool: True, wenn neu geladen wurde
+        """
+        with self._reload_lock:
+            if self.get_config_mtime() == self.config_mtime:
+                return False
+            # Neuen Parser lokal füllen und erst dann austauschen - parallele Leser
+            # (Store-, Import- und Forward-Threads) sehen nie eine leere Konfiguration
+            config = configparser.ConfigParser()
+            self.create_default_rules_file(config)
+            config.read(self.config_file)
+            self.config = config
+            self.ensure_import_folder_rule()
+            self.config_mtime = self.get_config_mtime()
+        logger.info(f"Rules-Konfiguration neu geladen: {self.config_file}")
+        return True
     
     def ensure_import_folder_rule(self):
         """Stellt sicher, dass die spezielle IMPORT_FOLDER-Regel existiert."""
@@ -98,6 +131,7 @@ class RulesManager:
         """Speichert die aktuelle Konfiguration in rules.ini."""
         with open(self.config_file, 'w') as configfile:
             self.config.write(configfile)
+        self.config_mtime = self.get_config_mtime()
         logger.debug(f"Rules-Konfiguration gespeichert in: {self.config_file}")
     
     def get_rules_enabled(self):